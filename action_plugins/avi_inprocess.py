@@ -0,0 +1,168 @@
+"""
+# Created on Oct 18, 2026
+#
+# Action plugin that runs the avi_* modules of this role inside the Ansible
+# worker process instead of packaging them with AnsiballZ and starting a new
+# Python interpreter for every task. The action plugins of the modules are
+# symlinks to this file.
+#
+# In-process execution is enabled with the variable avi_inprocess: true and
+# only applies to tasks on the local or avi connection that are not async.
+# Other tasks run the module as usual.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import atexit
+import json
+import os
+import sys
+import traceback
+
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.six import StringIO
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+from ansible.utils.vars import merge_hash
+import ansible.module_utils
+from ansible.module_utils import basic
+
+ROLE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+LIBRARY_DIR = os.path.join(ROLE_DIR, 'library')
+MODULE_UTILS_DIR = os.path.join(ROLE_DIR, 'module_utils')
+# connections that run modules on the Ansible controller itself
+LOCAL_TRANSPORTS = ('local', 'avi')
+
+# The strategy loads this plugin in the main process before it forks the
+# workers of a task, so the heavy imports below are done once per run.
+if MODULE_UTILS_DIR not in ansible.module_utils.__path__:
+    ansible.module_utils.__path__.append(MODULE_UTILS_DIR)
+try:
+    import requests
+    import avi.sdk.avi_api
+    import avi.sdk.utils.ansible_utils
+    import ansible.module_utils.avi_ansible_utils
+    from ansible.module_utils.avi_profile import profile_main
+    HAS_AVI = True
+except ImportError:
+    HAS_AVI = False
+
+# modules loaded by this process by name
+_modules = {}
+
+
+def load_module(name):
+    """
+    :return: the python module of library/<name>.py or None
+    """
+    if name in _modules:
+        return _modules[name]
+    path = os.path.join(LIBRARY_DIR, '%s.py' % name)
+    if not os.path.exists(path):
+        return None
+    module_name = 'ansible.modules.avi_inprocess.%s' % name
+    try:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except ImportError:
+        import imp
+        module = imp.load_source(module_name, path)
+    _modules[name] = module
+    return module
+
+
+def run_module(module, module_args, environment=None):
+    """
+    Runs main() of the module with module_args the same way AnsiballZ does.
+    Functions the module registers with atexit are run once it exits since
+    the worker process exits without running them.
+    :param environment: environment of the task, set in os.environ while the
+        module runs
+    :return: dict with the result of the module
+    """
+    saved = (basic._ANSIBLE_ARGS, getattr(basic, '_ANSIBLE_PROFILE', None),
+             sys.stdout, atexit.register)
+    saved_environ = dict(os.environ)
+    exit_funcs = []
+
+    def register(func, *args, **kwargs):
+        exit_funcs.append((func, args, kwargs))
+        return func
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps(
+        {'ANSIBLE_MODULE_ARGS': module_args}))
+    if hasattr(basic, '_ANSIBLE_PROFILE'):
+        basic._ANSIBLE_PROFILE = 'legacy'
+    stdout = StringIO()
+    sys.stdout = stdout
+    atexit.register = register
+    os.environ.update((k, to_text(v)) for k, v in (environment or {}).items())
+    try:
+        profile_main(module.main)()
+    except SystemExit:
+        pass
+    except Exception as e:
+        return dict(failed=True, msg='Module %s failed: %s' % (
+            module.__name__, to_text(e)), exception=traceback.format_exc())
+    finally:
+        (basic._ANSIBLE_ARGS, profile, sys.stdout,
+         atexit.register) = saved
+        if hasattr(basic, '_ANSIBLE_PROFILE'):
+            basic._ANSIBLE_PROFILE = profile
+        for func, args, kwargs in reversed(exit_funcs):
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                pass
+        os.environ.clear()
+        os.environ.update(saved_environ)
+    output = stdout.getvalue().strip()
+    try:
+        # the result is the last line that the module writes
+        return json.loads(output.splitlines()[-1])
+    except (IndexError, ValueError):
+        return dict(failed=True, msg='Module did not return a result',
+                    module_stdout=output)
+
+
+class ActionModule(ActionBase):
+
+    _supports_check_mode = True
+    _supports_async = True
+
+    def use_inprocess(self, task_vars):
+        return (HAS_AVI and
+                boolean(task_vars.get('avi_inprocess', False), strict=False) and
+                not self._task.async_val and
+                getattr(self._connection, 'transport', None) in LOCAL_TRANSPORTS)
+
+    def run(self, tmp=None, task_vars=None):
+        if task_vars is None:
+            task_vars = dict()
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        module_name = self._task.action.split('.')[-1]
+        module = load_module(module_name) if self.use_inprocess(
+            task_vars) else None
+        if module is None:
+            # same as the normal action plugin
+            wrap_async = (self._task.async_val and
+                          not self._connection.has_native_async)
+            result = merge_hash(result, self._execute_module(
+                task_vars=task_vars, wrap_async=wrap_async))
+            if not wrap_async:
+                # remove a temporary path we created
+                self._remove_tmp_path(self._connection._shell.tmpdir)
+            return result
+        module_args = dict(self._task.args)
+        self._update_module_args(module_name, module_args, task_vars)
+        environment = {}
+        self._compute_environment_string(environment)
+        result.update(run_module(module, module_args, environment))
+        return result
@@ -0,0 +1 @@
+avi_inprocess.py
\ No newline at end of file
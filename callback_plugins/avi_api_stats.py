@@ -0,0 +1,156 @@
+"""
+# Created on Oct 18, 2026
+#
+# Aggregates the api_stats returned by the avi_* modules over a play into a
+# report of the objects whose tasks spent the most time in API calls.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+author: Avi Networks
+name: avi_api_stats
+type: aggregate
+short_description: Report of the slowest Avi objects of a play
+description:
+    - Sums the api_stats returned by the avi_* modules per host, module and object.
+    - At the end of the playbook shows the objects with the highest API latency and the requests per
+      method of the whole play.
+    - The modules only return api_stats when the environment variable AVI_API_STATS is set for
+      the tasks.
+version_added: 2.9
+requirements:
+    - enable in configuration
+options:
+    top:
+        description:
+            - Number of objects in the report.
+        default: 10
+        type: int
+        env:
+            - name: AVI_API_STATS_TOP
+        ini:
+            - section: callback_avi_api_stats
+              key: top
+    report_file:
+        description:
+            - JSON file the whole report is written to.
+        type: path
+        env:
+            - name: AVI_API_STATS_REPORT
+        ini:
+            - section: callback_avi_api_stats
+              key: report_file
+'''
+
+import json
+
+from ansible.plugins.callback import CallbackBase
+
+# counters of api_stats that are summed
+COUNTERS = ('total_requests', 'logins', 'bytes_sent', 'bytes_received',
+            'retries')
+
+
+def object_name(task_args, result):
+    obj = result.get('obj')
+    if isinstance(obj, dict) and obj.get('name'):
+        return obj['name']
+    return task_args.get('name') or task_args.get('path') or ''
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'avi_api_stats'
+    CALLBACK_NEEDS_WHITELIST = True
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self, *args, **kwargs):
+        super(CallbackModule, self).__init__(*args, **kwargs)
+        self.objects = {}
+        self.requests = {}
+        self.totals = dict((k, 0) for k in COUNTERS)
+        self.totals['latency'] = 0.0
+        self.totals['tasks'] = 0
+
+    def add(self, host, action, task_args, result):
+        stats = result.get('api_stats')
+        if not isinstance(stats, dict):
+            return
+        key = (host, action, object_name(task_args, result))
+        entry = self.objects.get(key)
+        if entry is None:
+            entry = self.objects[key] = dict(
+                host=host, module=action, object=key[2], tasks=0,
+                latency=0.0, slowest_call=None,
+                **dict((k, 0) for k in COUNTERS))
+        entry['tasks'] += 1
+        entry['latency'] += stats.get('latency', 0.0)
+        self.totals['tasks'] += 1
+        self.totals['latency'] += stats.get('latency', 0.0)
+        for k in COUNTERS:
+            entry[k] += stats.get(k, 0)
+            self.totals[k] += stats.get(k, 0)
+        for method, count in (stats.get('requests') or {}).items():
+            self.requests[method] = self.requests.get(method, 0) + count
+        for call in stats.get('calls') or []:
+            if (entry['slowest_call'] is None or
+                    call['latency'] > entry['slowest_call']['latency']):
+                entry['slowest_call'] = call
+
+    def record(self, result):
+        host = result._host.get_name()
+        action = result._task.action
+        task_args = result._task.args or {}
+        self.add(host, action, task_args, result._result)
+        # results of the items of a loop
+        for item in result._result.get('results') or []:
+            if isinstance(item, dict):
+                self.add(host, action, task_args, item)
+
+    def v2_runner_on_ok(self, result):
+        self.record(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self.record(result)
+
+    def report(self):
+        objects = sorted(self.objects.values(),
+                         key=lambda e: -e['latency'])
+        return dict(totals=dict(self.totals, requests=self.requests),
+                    objects=objects[:self.get_option('top')])
+
+    def v2_playbook_on_stats(self, stats):
+        if not self.objects:
+            return
+        report = self.report()
+        totals = report['totals']
+        self._display.banner('AVI API STATS')
+        self._display.display(
+            '%d tasks, %d requests (%s), %.3fs, %d logins, %d retries, '
+            '%d bytes sent, %d bytes received' % (
+                totals['tasks'], totals['total_requests'],
+                ', '.join('%s %d' % (m, c) for m, c in sorted(
+                    totals['requests'].items())),
+                totals['latency'], totals['logins'], totals['retries'],
+                totals['bytes_sent'], totals['bytes_received']))
+        for entry in report['objects']:
+            call = entry['slowest_call']
+            self._display.display(
+                '%9.3fs %-20s %-28s %s (%d requests%s)' % (
+                    entry['latency'], entry['host'], entry['module'],
+                    entry['object'], entry['total_requests'],
+                    ', slowest %s %s %.3fs' % (
+                        call['method'], call['path'], call['latency'])
+                    if call else ''))
+        report_file = self.get_option('report_file')
+        if report_file:
+            with open(report_file, 'w') as f:
+                json.dump(dict(report, objects=sorted(
+                    self.objects.values(), key=lambda e: -e['latency'])),
+                    f, indent=2)
@@ -0,0 +1,223 @@
+"""
+# Created on Oct 18, 2026
+#
+# Persistent connection to the Avi controller. A single ApiSession, with its
+# keep-alive connection pool, TLS sessions and login cookies, is held by the
+# ansible-connection process for the whole play and the avi_* modules send
+# their API calls over the socket of the connection.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+author: Avi Networks
+name: avi
+short_description: Persistent connection to the Avi controller REST API
+description:
+    - Logs in to the Avi controller once and keeps the session and its HTTPS connections open for the
+      whole play.
+    - The avi_* modules of this role send their API calls over this connection instead of opening
+      their own session to the controller.
+    - Modules still run on the Ansible controller like with the local connection.
+version_added: 2.9
+requirements: [ avisdk ]
+options:
+    host:
+        description:
+            - IP address or hostname of the Avi controller.
+        default: inventory_hostname
+        vars:
+            - name: inventory_hostname
+            - name: ansible_host
+    port:
+        description:
+            - Port of the controller API.
+        type: int
+        ini:
+            - section: defaults
+              key: remote_port
+        env:
+            - name: ANSIBLE_REMOTE_PORT
+        vars:
+            - name: ansible_port
+    remote_user:
+        description:
+            - Username of the controller.
+        ini:
+            - section: defaults
+              key: remote_user
+        env:
+            - name: ANSIBLE_REMOTE_USER
+        vars:
+            - name: ansible_user
+    password:
+        description:
+            - Password of the controller user.
+        vars:
+            - name: ansible_password
+            - name: ansible_avi_password
+    token:
+        description:
+            - Authentication token used instead of the password.
+        vars:
+            - name: ansible_avi_token
+    tenant:
+        description:
+            - Default tenant of the session.
+        default: admin
+        vars:
+            - name: ansible_avi_tenant
+    api_version:
+        description:
+            - Default Avi API version of the session.
+        vars:
+            - name: ansible_avi_api_version
+    validate_certs:
+        description:
+            - Verify the TLS certificate of the controller.
+        type: bool
+        default: false
+        vars:
+            - name: ansible_avi_validate_certs
+    timeout:
+        description:
+            - Timeout of the API calls in seconds.
+        type: int
+        default: 300
+        vars:
+            - name: ansible_avi_timeout
+    persistent_connect_timeout:
+        description:
+            - Seconds to wait for the connection to the controller to come up.
+        type: int
+        default: 30
+        ini:
+            - section: persistent_connection
+              key: connect_timeout
+        env:
+            - name: ANSIBLE_PERSISTENT_CONNECT_TIMEOUT
+        vars:
+            - name: ansible_connect_timeout
+    persistent_command_timeout:
+        description:
+            - Seconds to wait for the reply to an API call.
+        type: int
+        default: 300
+        ini:
+            - section: persistent_connection
+              key: command_timeout
+        env:
+            - name: ANSIBLE_PERSISTENT_COMMAND_TIMEOUT
+        vars:
+            - name: ansible_command_timeout
+    persistent_log_messages:
+        description:
+            - Log the API calls of the connection to the Ansible log file.
+        type: bool
+        default: false
+        ini:
+            - section: persistent_connection
+              key: log_messages
+        env:
+            - name: ANSIBLE_PERSISTENT_LOG_MESSAGES
+        vars:
+            - name: ansible_persistent_log_messages
+'''
+
+from ansible.errors import AnsibleConnectionFailure
+from ansible.module_utils._text import to_text
+from ansible.plugins.connection import NetworkConnectionBase
+
+try:
+    from avi.sdk.avi_api import ApiSession
+    HAS_AVI = True
+except ImportError:
+    HAS_AVI = False
+
+
+class Connection(NetworkConnectionBase):
+    """
+    Holds the ApiSession of the play. Modules call send_request and
+    get_context through ansible.module_utils.connection.Connection.
+    """
+
+    transport = 'avi'
+    has_pipelining = False
+
+    def __init__(self, play_context, *args, **kwargs):
+        super(Connection, self).__init__(play_context, *args, **kwargs)
+        self._session = None
+
+    def _connect(self):
+        if self._connected:
+            return
+        if not HAS_AVI:
+            raise AnsibleConnectionFailure(
+                'Avi python API SDK (avisdk>=17.1) or requests is not '
+                'installed. For more details visit '
+                'https://github.com/avinetworks/sdk.')
+        try:
+            self._session = ApiSession(
+                self.get_option('host'), self.get_option('remote_user'),
+                password=self.get_option('password'),
+                token=self.get_option('token'),
+                tenant=self.get_option('tenant'),
+                port=self.get_option('port'),
+                api_version=self.get_option('api_version'),
+                verify=self.get_option('validate_certs'),
+                timeout=self.get_option('timeout'))
+        except Exception as e:
+            raise AnsibleConnectionFailure(
+                'Login to Avi controller %s failed: %s' % (
+                    self.get_option('host'), to_text(e)))
+        self.queue_message('vvvv', 'logged in to Avi controller %s' %
+                           self.get_option('host'))
+        self._connected = True
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        super(Connection, self).close()
+
+    def get_context(self):
+        """
+        :return: dict with the controller address and the session_id and
+            csrftoken of the login
+        """
+        self._connect()
+        context = self._session.get_context()
+        context.update(controller=self.get_option('host'),
+                       port=self.get_option('port'),
+                       username=self.get_option('remote_user'),
+                       tenant=self.get_option('tenant'),
+                       api_version=self.get_option('api_version'))
+        return context
+
+    def send_request(self, method, path, tenant='', tenant_uuid='', data=None,
+                     headers=None, timeout=None, api_version=None,
+                     params=None):
+        """
+        Calls the controller API with the session of the connection. The SDK
+        logs in again when the session expired.
+        :param method: get, post, put, patch or delete
+        :param path: relative path of the API like pool/<uuid>
+        :return: dict with status_code, text, headers and url of the response
+        """
+        self._connect()
+        if method not in ('get', 'post', 'put', 'patch', 'delete'):
+            raise AnsibleConnectionFailure('Invalid API method %s' % method)
+        if self.get_option('persistent_log_messages'):
+            self.queue_message('log', '%s %s' % (method.upper(), path))
+        kwargs = {}
+        if params:
+            kwargs['params'] = params
+        rsp = self._session._api(method, path, tenant, tenant_uuid, data=data,
+                             headers=headers, timeout=timeout,
+                             api_version=api_version, **kwargs)
+        return {'status_code': rsp.status_code, 'text': rsp.text,
+                'headers': dict(rsp.headers), 'url': rsp.url}
@@ -0,0 +1,328 @@
+"""
+# Created on Oct 18, 2026
+#
+# Inventory of the service engines and virtual services of an Avi
+# controller. Collections are fetched with the same ApiSession and
+# pagination helpers as the modules of this role.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+name: avi
+author: Avi Networks
+short_description: Avi controller service engines and virtual services inventory
+description:
+    - Adds the service engines and virtual services of an Avi controller as hosts.
+    - Service engines are in the group C(avi_serviceengines) and virtual services in the group
+      C(avi_virtualservices). Hosts are also grouped by C(cloud_<name>), C(se_group_<name>) and
+      C(tenant_<name>).
+    - Host names are the object names with the prefix of their type so that a service engine and
+      a virtual service of the same name are different hosts. The object name is set in the
+      C(avi_name) host variable.
+    - The pools of a virtual service are set in its C(avi_pools) host variable. The pools of the
+      members of the pool group of a virtual service are set as well.
+    - Collections are fetched with large pages, only the fields the inventory needs and the pages
+      of a collection are fetched concurrently.
+    - The configuration file name must end with C(avi.yml) or C(avi.yaml).
+version_added: 2.9
+requirements: [ avisdk ]
+extends_documentation_fragment:
+    - constructed
+    - inventory_cache
+options:
+    plugin:
+        description: Name of the plugin.
+        required: true
+        choices: ['avi']
+    controller:
+        description:
+            - IP address or hostname of the controller.
+        required: true
+        env:
+            - name: AVI_CONTROLLER
+    username:
+        description:
+            - Username of the controller.
+        required: true
+        env:
+            - name: AVI_USERNAME
+    password:
+        description:
+            - Password of the controller user.
+        env:
+            - name: AVI_PASSWORD
+    port:
+        description:
+            - Port of the controller API.
+        type: int
+    api_version:
+        description:
+            - Avi API version of the calls.
+        default: 16.4.4
+    tenant:
+        description:
+            - Tenant of the objects. The default C(*) fetches the objects of all the tenants in one call.
+        default: '*'
+    validate_certs:
+        description:
+            - Verify the TLS certificate of the controller.
+        type: bool
+        default: false
+    page_size:
+        description:
+            - Number of objects fetched per call.
+        type: int
+        default: 1000
+    concurrency:
+        description:
+            - Maximum number of pages fetched at the same time.
+        type: int
+        default: 8
+    include_pools:
+        description:
+            - Fetch the pools and pool groups of the virtual services and set the pools in C(avi_pools).
+        type: bool
+        default: true
+    serviceengine_prefix:
+        description:
+            - Prefix of the host names of the service engines.
+        default: se_
+    virtualservice_prefix:
+        description:
+            - Prefix of the host names of the virtual services.
+        default: vs_
+'''
+
+EXAMPLES = '''
+# avi.yml
+plugin: avi
+controller: 10.10.27.90
+username: admin
+password: password
+api_version: 18.2.8
+cache: true
+cache_plugin: jsonfile
+cache_connection: ~/.ansible/avi_inventory
+cache_timeout: 600
+keyed_groups:
+  - key: avi_se_group
+    prefix: seg
+'''
+
+import os
+from multiprocessing.pool import ThreadPool
+
+import ansible.module_utils
+from ansible.errors import AnsibleError
+from ansible.inventory.group import to_safe_group_name
+from ansible.module_utils._text import to_text
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+
+ROLE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+MODULE_UTILS_DIR = os.path.join(ROLE_DIR, 'module_utils')
+
+if MODULE_UTILS_DIR not in ansible.module_utils.__path__:
+    ansible.module_utils.__path__.append(MODULE_UTILS_DIR)
+try:
+    from avi.sdk.avi_api import APIError, ApiSession
+    from ansible.module_utils.avi_ansible_utils import avi_collection_fetch
+    HAS_AVI = True
+except ImportError:
+    HAS_AVI = False
+
+# Fields fetched for every collection. The refs are returned with the name of
+# the referred object because of include_name.
+COLLECTION_FIELDS = {
+    'serviceengine': ['name', 'uuid', 'cloud_ref', 'se_group_ref',
+                      'tenant_ref', 'mgmt_vnic', 'enable_state'],
+    'virtualservice': ['name', 'uuid', 'cloud_ref', 'se_group_ref',
+                       'tenant_ref', 'vsvip_ref', 'services', 'pool_ref',
+                       'pool_group_ref', 'enabled'],
+    'pool': ['name', 'uuid', 'tenant_ref', 'servers'],
+    'poolgroup': ['name', 'uuid', 'tenant_ref', 'members'],
+}
+
+
+def ref_name(ref):
+    """
+    :param ref: reference returned with include_name like
+        https://10.10.25.42/api/cloud/cloud-0e7f1d42#Default-Cloud
+    :return: name of the referred object or None
+    """
+    if not ref or '#' not in ref:
+        return None
+    return ref.rsplit('#', 1)[1]
+
+
+def ref_uuid(ref):
+    """
+    :param ref: reference like https://10.10.25.42/api/pool/pool-0e7f1d42#p1
+    :return: uuid of the referred object
+    """
+    return ref.split('#', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+
+
+def mgmt_address(se):
+    """
+    :return: management IP address of the service engine or None
+    """
+    for network in se.get('mgmt_vnic', {}).get('vnic_networks', []):
+        addr = network.get('ip', {}).get('ip_addr', {}).get('addr')
+        if addr:
+            return addr
+    return None
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'avi'
+
+    def verify_file(self, path):
+        return (super(InventoryModule, self).verify_file(path) and
+                path.endswith(('avi.yml', 'avi.yaml')))
+
+    def _get_session(self):
+        try:
+            return ApiSession.get_session(
+                self.get_option('controller'), self.get_option('username'),
+                password=self.get_option('password'),
+                port=self.get_option('port'),
+                api_version=self.get_option('api_version'),
+                verify=self.get_option('validate_certs'))
+        except Exception as e:
+            raise AnsibleError('Login to Avi controller %s failed: %s' % (
+                self.get_option('controller'), to_text(e)))
+
+    def _fetch(self):
+        """
+        :return: dict of collection name to the list of its objects
+        """
+        api = self._get_session()
+        collections = ['serviceengine', 'virtualservice']
+        if self.get_option('include_pools'):
+            collections.extend(['pool', 'poolgroup'])
+
+        def fetch(collection):
+            return avi_collection_fetch(
+                api, collection, tenant=self.get_option('tenant'),
+                params={'include_name': '',
+                        'fields': ','.join(COLLECTION_FIELDS[collection])},
+                api_version=self.get_option('api_version'),
+                page_size=self.get_option('page_size'),
+                concurrency=self.get_option('concurrency'))
+        pool = ThreadPool(len(collections))
+        try:
+            return dict(zip(collections, pool.map(fetch, collections)))
+        except APIError as e:
+            raise AnsibleError('Failed to fetch the Avi inventory: %s' %
+                               to_text(e))
+        finally:
+            pool.close()
+            pool.join()
+
+    def _add_group_host(self, prefix, name, host):
+        if name:
+            group = self.inventory.add_group(
+                to_safe_group_name('%s_%s' % (prefix, name), force=True,
+                                   silent=True))
+            self.inventory.add_child(group, host)
+
+    def _add_host(self, name, group, host_vars):
+        host = self.inventory.add_host(name, group=group)
+        for k, v in host_vars.items():
+            if v is not None:
+                self.inventory.set_variable(host, k, v)
+        self._add_group_host('cloud', host_vars.get('avi_cloud'), host)
+        self._add_group_host('se_group', host_vars.get('avi_se_group'), host)
+        self._add_group_host('tenant', host_vars.get('avi_tenant'), host)
+        strict = self.get_option('strict')
+        self._set_composite_vars(self.get_option('compose'), host_vars, host,
+                                 strict=strict)
+        self._add_host_to_composed_groups(self.get_option('groups'),
+                                          host_vars, host, strict=strict)
+        self._add_host_to_keyed_groups(self.get_option('keyed_groups'),
+                                       host_vars, host, strict=strict)
+
+    def _populate(self, objs):
+        self.inventory.add_group('avi_serviceengines')
+        self.inventory.add_group('avi_virtualservices')
+        for se in objs.get('serviceengine', []):
+            host_vars = dict(
+                avi_type='serviceengine', avi_uuid=se['uuid'],
+                avi_cloud=ref_name(se.get('cloud_ref')),
+                avi_se_group=ref_name(se.get('se_group_ref')),
+                avi_tenant=ref_name(se.get('tenant_ref')),
+                avi_enable_state=se.get('enable_state'))
+            addr = mgmt_address(se)
+            if addr:
+                host_vars['ansible_host'] = addr
+            host_vars['avi_name'] = se['name']
+            self._add_host(self.get_option('serviceengine_prefix') +
+                           se['name'], 'avi_serviceengines', host_vars)
+
+        pools = dict((pool['uuid'], dict(
+            name=pool['name'], uuid=pool['uuid'],
+            servers=[s.get('ip', {}).get('addr')
+                     for s in pool.get('servers', [])]))
+            for pool in objs.get('pool', []))
+        pool_groups = dict(
+            (pg['uuid'], [ref_uuid(m['pool_ref'])
+                          for m in pg.get('members', []) if m.get('pool_ref')])
+            for pg in objs.get('poolgroup', []))
+        vs_tenants = {}
+        for vs in objs.get('virtualservice', []):
+            tenant = ref_name(vs.get('tenant_ref'))
+            host_vars = dict(
+                avi_type='virtualservice', avi_uuid=vs['uuid'],
+                avi_cloud=ref_name(vs.get('cloud_ref')),
+                avi_se_group=ref_name(vs.get('se_group_ref')),
+                avi_tenant=tenant, avi_enabled=vs.get('enabled', True),
+                avi_vsvip=ref_name(vs.get('vsvip_ref')),
+                avi_services=vs.get('services', []),
+                avi_pool_group=ref_name(vs.get('pool_group_ref')))
+            pool_uuids = []
+            if vs.get('pool_ref'):
+                pool_uuids.append(ref_uuid(vs['pool_ref']))
+            if vs.get('pool_group_ref'):
+                pool_uuids.extend(pool_groups.get(
+                    ref_uuid(vs['pool_group_ref']), []))
+            if 'pool' in objs and (vs.get('pool_ref') or
+                                   vs.get('pool_group_ref')):
+                host_vars['avi_pools'] = [pools[uuid] for uuid in pool_uuids
+                                          if uuid in pools]
+            name = vs['name']
+            host_vars['avi_name'] = name
+            # virtual services of different tenants can have the same name
+            if vs_tenants.setdefault(name, tenant) != tenant:
+                name = '%s@%s' % (name, tenant)
+            self._add_host(self.get_option('virtualservice_prefix') + name,
+                           'avi_virtualservices', host_vars)
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path,
+                                           cache=cache)
+        self._read_config_data(path)
+        if not HAS_AVI:
+            raise AnsibleError(
+                'Avi python API SDK (avisdk>=17.1) or requests is not '
+                'installed. For more details visit '
+                'https://github.com/avinetworks/sdk.')
+        cache_key = self.get_cache_key(path)
+        use_cache = self.get_option('cache') and cache
+        update_cache = self.get_option('cache') and not cache
+        objs = None
+        if use_cache:
+            try:
+                objs = self._cache[cache_key]
+            except KeyError:
+                update_cache = True
+        if objs is None:
+            objs = self._fetch()
+        if update_cache:
+            self._cache[cache_key] = objs
+        self._populate(objs)
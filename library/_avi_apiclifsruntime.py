@@ -125,7 +125,8 @@ try:
             (parse_version(sdk_version) < parse_version('17.1')))):
         # It allows the __version__ to be '' as that value is used in development builds
         raise ImportError
-    from avi.sdk.utils.ansible_utils import avi_ansible_api
+    from ansible.module_utils.avi_ansible_utils import avi_ansible_api
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
@@ -161,4 +162,7 @@ def main():
                            set([]))
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
@@ -104,7 +104,8 @@ try:
             (parse_version(sdk_version) < parse_version('16.3.5.post1')))):
         # It allows the __version__ to be '' as that value is used in development builds
         raise ImportError
-    from avi.sdk.utils.ansible_utils import avi_ansible_api
+    from ansible.module_utils.avi_ansible_utils import avi_ansible_api
+    from ansible.module_utils.avi_profile import profile_main
 except ImportError:
     HAS_AVI = False
 
@@ -134,4 +135,7 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
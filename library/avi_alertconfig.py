@@ -34,9 +34,10 @@ options:
         description:
             - Default method for object update is HTTP PUT.
             - Setting to patch will override that behavior to use HTTP PATCH.
+            - Setting to auto sends a HTTP PATCH of only the fields that differ from the existing object.
         version_added: "2.5"
         default: put
-        choices: ["put", "patch"]
+        choices: ["put", "patch", "auto"]
         type: str
     avi_api_patch_op:
         description:
@@ -169,8 +170,9 @@ obj:
 from ansible.module_utils.basic import AnsibleModule
 try:
     from avi.sdk.utils.ansible_utils import avi_common_argument_spec
-    from avi.sdk.utils.ansible_utils import (
+    from ansible.module_utils.avi_ansible_utils import (
         avi_ansible_api, avi_common_argument_spec)
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
@@ -181,7 +183,7 @@ def main():
         state=dict(default='present',
                    choices=['absent', 'present']),
         avi_api_update_method=dict(default='put',
-                                   choices=['put', 'patch']),
+                                   choices=['put', 'patch', 'auto']),
         avi_api_patch_op=dict(choices=['add', 'replace', 'delete']),
         action_group_ref=dict(type='str',),
         alert_rule=dict(type='dict', required=True),
@@ -215,4 +217,7 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
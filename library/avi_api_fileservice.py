@@ -37,8 +37,30 @@ options:
     force_mode:
         description:
             - Allowed force mode for upload forcefully.
+            - Downloads are written to I(file_path).part and renamed to I(file_path) once complete so an existing file is
+              only replaced by a complete download. An interrupted download resumes from the size of the .part file when
+              I(file_path).part.json shows it is of the same remote file and the controller confirms with If-Range that
+              the file did not change. Otherwise the download starts over.
+            - If true, the file is always uploaded and I(file_path) of a download is replaced.
+            - Set to false to skip the upload when the listing of the controller has the file with the size and the
+              SHA-256 checksum of the local file. The file is uploaded when the listing has no checksum for it.
+            - Set to false to skip the download when I(file_path) exists.
         default: true
         type: bool
+    chunk_size:
+        description:
+            - Size in MB of the chunks of an upload. Every chunk is sent in a separate request with a Content-Range header.
+            - An interrupted chunked upload resumes from the last uploaded chunk when the task is run again for the same file.
+            - 0 uploads the file in a single request.
+            - For downloads, size in MB of the reads from the response. 0 reads 1 MB at a time.
+        default: 0
+        type: int
+    segments:
+        description:
+            - Number of parallel range requests used to download the file. Only used for downloads.
+            - The file is downloaded in a single request if the controller does not support range requests.
+        default: 1
+        type: int
     file_path:
         description:
             - Local file path of file to be uploaded or downloaded file
@@ -76,6 +98,32 @@ EXAMPLES = '''
       file_path: ./se.ova
       api_version: 17.2.8
 
+  - name: Download a backup with 4 parallel range requests
+    avi_api_fileservice:
+      controller: ""
+      username: ""
+      password: ""
+      upload: false
+      path: backups
+      params:
+        uri: controller://backups/backup.json
+      file_path: ./backup.json
+      chunk_size: 8
+      segments: 4
+      api_version: 18.2.8
+
+  - name: Upload controller upgrade package in 64 MB chunks, skip if already uploaded
+    avi_api_fileservice:
+      controller: ""
+      username: ""
+      password: ""
+      upload: true
+      force_mode: false
+      chunk_size: 64
+      path: uploads
+      file_path: ./controller.pkg
+      api_version: 18.2.8
+
   - name: Upload HSM package to controller
     avi_api_fileservice:
       controller: ""
@@ -94,11 +142,36 @@ obj:
     description: Avi REST resource
     returned: success, changed
     type: dict
+checksum:
+    description: SHA-256 of the uploaded file
+    returned: upload
+    type: str
+uploaded:
+    description: Number of bytes sent to the controller by this task
+    returned: upload
+    type: int
+resumed_from:
+    description: Offset from which an interrupted chunked upload or download was resumed
+    returned: always
+    type: int
+downloaded:
+    description: Number of bytes received from the controller by this task
+    returned: download
+    type: int
+api_stats:
+    description: API calls of the task with the requests per method, latency, the slowest calls, logins, bytes and retries.
+    returned: when AVI_API_STATS is set
+    type: dict
 '''
 
 
+import hashlib
 import json
 import os
+import re
+import tempfile
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
 from ansible.module_utils.basic import AnsibleModule
 
 try:
@@ -108,14 +181,357 @@ except ImportError:
     HAS_LIB = False
 
 try:
-    from avi.sdk.avi_api import ApiSession, AviCredentials
+    from avi.sdk.avi_api import APIError, AviCredentials
     from avi.sdk.utils.ansible_utils import (
         avi_obj_cmp, cleanup_absent_fields, avi_common_argument_spec,
         ansible_return)
+    from ansible.module_utils.avi_connection import (
+        apply_connection_login, get_connection_context)
+    from ansible.module_utils.avi_api_stats import track_api_stats
+    from ansible.module_utils.avi_session_cache import get_cached_session
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
 
+MB = 1024 * 1024
+CHUNK_RETRIES = 3
+# records of the chunked uploads, only readable by the user
+UPLOAD_STATE_DIR = os.path.join('~', '.ansible', 'avi_uploads')
+
+
+def file_checksum(file_path, block_size=MB):
+    """
+    :return: hex SHA-256 of the file read block by block
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def upload_state_path(api_creds, uri, file_path):
+    """
+    :return: path of the local record of the upload of file_path to uri in
+        the private UPLOAD_STATE_DIR of the user
+    """
+    key = '%s:%s:%s' % (api_creds.controller, uri, os.path.abspath(file_path))
+    return os.path.join(os.path.expanduser(UPLOAD_STATE_DIR),
+                        'avi_upload_%s.json' %
+                        hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def read_upload_state(state_path):
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def write_upload_state(state_path, state):
+    """
+    Writes the state to a new file created with O_EXCL and mode 0600 by
+    mkstemp and renames it over state_path, so that a link at state_path is
+    replaced and never followed.
+    """
+    state_dir = os.path.dirname(state_path)
+    if not os.path.isdir(state_dir):
+        os.makedirs(state_dir, 0o700)
+    fd, tmp_path = tempfile.mkstemp(dir=state_dir)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        os.rename(tmp_path, state_path)
+    except (IOError, OSError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def get_remote_file(api, uri, file_name, tenant, tenant_uuid, timeout):
+    """
+    :return: entry of file_name in the fileservice listing of uri or None
+    """
+    rsp = api.get('fileservice', params={'uri': uri}, tenant=tenant,
+                  tenant_uuid=tenant_uuid, timeout=timeout)
+    if rsp.status_code > 299:
+        return None
+    try:
+        listing = rsp.json()
+    except ValueError:
+        return None
+    if isinstance(listing, dict):
+        listing = listing.get('results', listing.get('files', []))
+    for entry in listing or []:
+        if isinstance(entry, dict) and entry.get('name') == file_name:
+            return entry
+    return None
+
+
+def is_uploaded(remote, size, checksum):
+    """
+    The remote file has to have the size of the local file and the same
+    checksum as reported by the controller. A file without a checksum in the
+    listing is never taken as uploaded.
+    """
+    if not remote or int(remote.get('size', -1)) != size:
+        return False
+    return remote.get('checksum') == checksum
+
+
+def upload_chunks(module, api, path, uri, file_path, file_name, size,
+                  offset, chunk_size, state_path, state, timeout):
+    """
+    Uploads the file from offset one chunk per request and records the
+    offset after every chunk so that a later run can resume.
+    :return: error message or None
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        while offset < size:
+            chunk = f.read(chunk_size)
+            end = offset + len(chunk) - 1
+            rsp = None
+            for _ in range(CHUNK_RETRIES):
+                m = MultipartEncoder(fields={
+                    'file': (file_name, BytesIO(chunk),
+                             'application/octet-stream'),
+                    'uri': uri})
+                headers = {'Content-Type': m.content_type,
+                           'Content-Range': 'bytes %d-%d/%d' % (
+                               offset, end, size)}
+                try:
+                    rsp = api.post(path, data=m, headers=headers,
+                                   timeout=timeout, verify=False)
+                except Exception as e:
+                    rsp = None
+                    error = str(e)
+                    continue
+                if rsp.status_code < 300:
+                    break
+                error = rsp.text
+            if rsp is None or rsp.status_code > 299:
+                return ('Fail to upload file at offset %d: %s. Run the task '
+                        'again to resume the upload.' % (offset, error))
+            offset = end + 1
+            state['offset'] = offset
+            write_upload_state(state_path, state)
+            module.log('avi_api_fileservice uploaded %d of %d bytes of %s' % (
+                offset, size, file_name))
+    return None
+
+
+def response_meta(rsp, source):
+    """
+    :return: record of the remote file of a download with its size and the
+        validators of its version
+    """
+    size = None
+    match = re.match(r'bytes [\d*-]+/(\d+)$',
+                     rsp.headers.get('Content-Range', ''))
+    if match:
+        size = int(match.group(1))
+    elif rsp.status_code == 200 and rsp.headers.get('Content-Length'):
+        size = int(rsp.headers['Content-Length'])
+    return dict(source=source, size=size, etag=rsp.headers.get('ETag'),
+                last_modified=rsp.headers.get('Last-Modified'))
+
+
+def range_headers(start, end, meta):
+    """
+    :return: headers of a range request that is only served as a range if
+        the remote file is still the version of meta
+    """
+    headers = {'Range': 'bytes=%d-%s' % (start, '' if end is None else end)}
+    validator = meta.get('etag') or meta.get('last_modified')
+    if validator:
+        headers['If-Range'] = validator
+    return headers
+
+
+def is_same_file(rsp, start, meta):
+    """
+    :return: True if the 206 response rsp is the range from start of the
+        remote file recorded in meta
+    """
+    if rsp.status_code != 206:
+        return False
+    match = re.match(r'bytes (\d+)-\d+/(\d+)$',
+                     rsp.headers.get('Content-Range', ''))
+    if not match or int(match.group(1)) != start:
+        return False
+    if meta.get('size') is not None and int(match.group(2)) != meta['size']:
+        return False
+    etag = rsp.headers.get('ETag')
+    return not (meta.get('etag') and etag and etag != meta['etag'])
+
+
+def read_part_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def write_part_meta(meta_path, meta):
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+
+def remove_files(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def get_content_length(api, path, params, timeout):
+    """
+    :return: record of the file, see response_meta, if the controller
+        supports range requests for it else None
+    """
+    rsp = api.get(path, params=params, stream=True, timeout=timeout,
+                  headers={'Range': 'bytes=0-0'})
+    try:
+        if rsp.status_code != 206:
+            return None
+        meta = response_meta(rsp, None)
+        return meta if meta['size'] else None
+    finally:
+        rsp.close()
+
+
+def download_range(api, path, params, part_path, start, end, meta,
+                   chunk_size, timeout):
+    """
+    Writes bytes start to end (inclusive) of the file at the same offset
+    of part_path.
+    :return: tuple of (bytes written, error message or None)
+    """
+    rsp = api.get(path, params=params, stream=True, timeout=timeout,
+                  headers=range_headers(start, end, meta))
+    if not is_same_file(rsp, start, meta):
+        rsp.close()
+        return 0, 'Fail to download bytes %d-%d: %s' % (
+            start, end, 'the file changed during the download'
+            if rsp.status_code in (200, 206) else rsp.text)
+    written = 0
+    with open(part_path, 'r+b') as f:
+        f.seek(start)
+        try:
+            for chunk in rsp.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                written += len(chunk)
+        except Exception as e:
+            return written, 'Fail to download bytes %d-%d: %s' % (
+                start, end, e)
+    if written != end - start + 1:
+        return written, 'Incomplete download of bytes %d-%d' % (start, end)
+    return written, None
+
+
+def download_file(api, path, params, file_path, chunk_size,
+                  segments, timeout):
+    """
+    Downloads to file_path.part and renames it to file_path once complete.
+    The source, size and ETag or Last-Modified of the remote file are kept
+    in file_path.part.json. A .part file left by an interrupted download of
+    the same source is resumed with a range request sent with If-Range, so
+    that the controller sends the whole file again if it changed. A .part
+    file without a matching record is downloaded again from the start.
+    :return: tuple of (bytes downloaded, resumed from offset, error or None)
+    """
+    part_path = '%s.part' % file_path
+    meta_path = '%s.json' % part_path
+    source = json.dumps(dict(controller=getattr(api, 'prefix', None),
+                             path=path, params=params or {}), sort_keys=True)
+    meta = read_part_meta(meta_path)
+    offset = 0
+    if os.path.exists(part_path):
+        if meta.get('source') == source and (
+                meta.get('etag') or meta.get('last_modified') or
+                meta.get('size') is not None):
+            offset = os.path.getsize(part_path)
+        else:
+            # left by a download of another file or of unknown version
+            remove_files(part_path, meta_path)
+            meta = {}
+    if offset and meta.get('size') is not None and offset > meta['size']:
+        remove_files(part_path, meta_path)
+        offset = 0
+    size = None
+    range_meta = None
+    if segments > 1 and not offset:
+        range_meta = get_content_length(api, path, params, timeout)
+    if range_meta:
+        size = range_meta['size']
+        # the offsets of the segments are not recorded, so the .part file
+        # of a segmented download is never resumed.
+        remove_files(meta_path)
+        # preallocate the file so that every segment writes at its offset
+        with open(part_path, 'wb') as f:
+            f.truncate(size)
+        segment_size = -(-size // segments)
+        ranges = [(start, min(start + segment_size, size) - 1)
+                  for start in range(0, size, segment_size)]
+        pool = ThreadPool(len(ranges))
+        try:
+            results = pool.map(
+                lambda r: download_range(api, path, params, part_path, r[0],
+                                         r[1], range_meta, chunk_size,
+                                         timeout), ranges)
+        finally:
+            pool.close()
+            pool.join()
+        errors = [error for _, error in results if error]
+        if errors:
+            remove_files(part_path)
+            return sum(n for n, _ in results), 0, errors[0]
+    else:
+        rsp = None
+        if offset:
+            rsp = api.get(path, params=params, stream=True, timeout=timeout,
+                          headers=range_headers(offset, None, meta))
+            if rsp.status_code == 416 and offset == meta.get('size'):
+                # the .part file already holds the whole file
+                rsp.close()
+                rsp = None
+                size = offset
+            elif rsp.status_code == 200:
+                # If-Range did not match or ranges are not supported, the
+                # whole file is sent again.
+                offset = 0
+            elif rsp.status_code > 299 and rsp.status_code != 416:
+                return 0, offset, 'Fail to download file: %s' % rsp.text
+            elif not is_same_file(rsp, offset, meta):
+                rsp.close()
+                rsp = None
+                offset = 0
+        if rsp is None and size is None:
+            remove_files(part_path, meta_path)
+            rsp = api.get(path, params=params, stream=True, timeout=timeout)
+        if rsp is not None:
+            if rsp.status_code > 300:
+                return 0, offset, 'Fail to download file: %s' % rsp.text
+            if not offset:
+                write_part_meta(meta_path, response_meta(rsp, source))
+            size = offset
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                try:
+                    for chunk in rsp.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+                except Exception as e:
+                    return size - offset, offset, (
+                        'Download interrupted after %d bytes: %s. Run the '
+                        'task again to resume the download.' % (size, e))
+        size -= offset
+    os.rename(part_path, file_path)
+    remove_files(meta_path)
+    return size, offset, None
+
 
 def main():
     argument_specs = dict(
@@ -125,7 +541,9 @@ def main():
         path=dict(type='str', required=True),
         file_path=dict(type='str', required=True),
         params=dict(type='dict'),
-        timeout=dict(type='int', default=60)
+        timeout=dict(type='int', default=60),
+        chunk_size=dict(type='int', default=0),
+        segments=dict(type='int', default=1)
     )
     argument_specs.update(avi_common_argument_spec())
     module = AnsibleModule(argument_spec=argument_specs)
@@ -137,13 +555,21 @@ def main():
         return module.fail_json(
             msg='avi_api_fileservice, requests_toolbelt is required for this module')
 
+    track_api_stats(module)
     api_creds = AviCredentials()
     api_creds.update_from_ansible_module(module)
-    api = ApiSession.get_session(
-        api_creds.controller, api_creds.username, password=api_creds.password,
-        timeout=api_creds.timeout, tenant=api_creds.tenant,
-        tenant_uuid=api_creds.tenant_uuid, token=api_creds.token,
-        port=api_creds.port)
+    # File transfers are streamed so they can not be sent over the avi
+    # connection. They reuse its login instead.
+    try:
+        context = get_connection_context(module)
+        apply_connection_login(api_creds, context)
+    except APIError as e:
+        return module.fail_json(msg=str(e))
+    session_args = {}
+    if context:
+        session_args = dict(session_id=context['session_id'],
+                            csrftoken=context['csrftoken'])
+    api = get_cached_session(api_creds, **session_args)
 
     tenant_uuid = api_creds.tenant_uuid
     tenant = api_creds.tenant
@@ -170,38 +596,78 @@ def main():
             path = 'fileservice/uploads'
         else:
             uri = 'controller://%s' % module.params.get('path', '').split('?')[0]
-        changed = False
+        size = os.path.getsize(file_path)
+        checksum = file_checksum(file_path)
+        state_path = upload_state_path(api_creds, uri, file_path)
+        state = read_upload_state(state_path)
+        if not force_mode:
+            remote = get_remote_file(api, uri, file_name, tenant, tenant_uuid,
+                                     timeout)
+            if is_uploaded(remote, size, checksum):
+                return module.exit_json(
+                    changed=False, msg='File already uploaded',
+                    checksum=checksum, uploaded=0, resumed_from=0)
         file_uri = 'fileservice?uri=%s' % uri
         rsp = api.post(file_uri, tenant=tenant, tenant_uuid=tenant_uuid,
                        timeout=timeout)
-        with open(file_path, "rb") as f:
-            f_data = {"file": (file_name, f, "application/octet-stream"),
-                      "uri": uri}
-            m = MultipartEncoder(fields=f_data)
-            headers = {'Content-Type': m.content_type}
-            rsp = api.post(path, data=m, headers=headers,
-                           verify=False)
-            if rsp.status_code > 300:
-                return module.fail_json(msg='Fail to upload file: %s' %
-                                        rsp.text)
-            else:
-                return module.exit_json(
-                    changed=True, msg="File uploaded successfully")
+        chunk_size = module.params['chunk_size'] * MB
+        offset = 0
+        if chunk_size > 0:
+            # resume only an incomplete upload of the same content
+            if (state.get('checksum') == checksum and
+                    not state.get('completed')):
+                offset = min(int(state.get('offset', 0)), size)
+            state = {'checksum': checksum, 'size': size, 'offset': offset,
+                     'completed': False}
+            write_upload_state(state_path, state)
+            error = upload_chunks(module, api, path, uri, file_path,
+                                  file_name, size, offset, chunk_size,
+                                  state_path, state, timeout)
+            if error:
+                return module.fail_json(msg=error)
+        else:
+            with open(file_path, "rb") as f:
+                f_data = {"file": (file_name, f, "application/octet-stream"),
+                          "uri": uri}
+                m = MultipartEncoder(fields=f_data)
+                headers = {'Content-Type': m.content_type}
+                rsp = api.post(path, data=m, headers=headers,
+                               verify=False)
+                if rsp.status_code > 300:
+                    return module.fail_json(msg='Fail to upload file: %s' %
+                                            rsp.text)
+        remote = get_remote_file(api, uri, file_name, tenant, tenant_uuid,
+                                 timeout)
+        if remote and (int(remote.get('size', size)) != size or
+                       remote.get('checksum', checksum) != checksum):
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            return module.fail_json(msg=(
+                'Uploaded file %s does not match the local file: %s' % (
+                    file_name, remote)))
+        write_upload_state(state_path, {'checksum': checksum, 'size': size,
+                                        'offset': size, 'completed': True})
+        return module.exit_json(
+            changed=True, msg="File uploaded successfully",
+            checksum=checksum, uploaded=size - offset, resumed_from=offset)
 
     elif not upload:
-        # Removing existing file.
-        if force_mode and os.path.exists(file_path):
-            os.remove(file_path)
-        rsp = api.get(path, params=params, stream=True)
-        if rsp.status_code > 300:
-            return module.fail_json(msg='Fail to download file: %s' % rsp.text)
-        with open(file_path, 'wb') as f:
-            for chunk in rsp.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
+        if not force_mode and os.path.exists(file_path):
+            return module.exit_json(msg='File already downloaded',
+                                    changed=False, downloaded=0,
+                                    resumed_from=0)
+        chunk_size = (module.params['chunk_size'] or 1) * MB
+        downloaded, offset, error = download_file(
+            api, path, params, file_path, chunk_size,
+            module.params['segments'], timeout)
+        if error:
+            return module.fail_json(msg=error)
         return module.exit_json(msg='File downloaded successfully',
-                                changed=True)
-
+                                changed=True, downloaded=downloaded,
+                                resumed_from=offset)
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
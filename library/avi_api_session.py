@@ -32,8 +32,8 @@ options:
     http_method:
         description:
             - Allowed HTTP methods for RESTful services and are supported by Avi Controller.
+            - Required with I(path).
         choices: ["get", "put", "post", "patch", "delete"]
-        required: true
         type: str
     data:
         description:
@@ -46,13 +46,33 @@ options:
     path:
         description:
             - 'Path for Avi API resource. For example, C(path: virtualservice) will translate to C(api/virtualserivce).'
-        required: true
+            - One of I(path) or I(requests) is required.
         type: str
     timeout:
         description:
             - Timeout (in seconds) for Avi API calls.
+            - Used as the default timeout of every call in I(requests).
         default: 60
         type: int
+    requests:
+        description:
+            - List of independent API calls that are run concurrently over one controller session.
+            - Each entry takes the keys C(http_method), C(path), C(params), C(data) and C(timeout) with the same
+              meaning as the options of this module.
+            - Results are returned in I(results) in the same order.
+        type: list
+    concurrency:
+        description:
+            - Maximum number of calls of I(requests) that are in flight at the same time.
+        default: 8
+        type: int
+    readback_timeout:
+        description:
+            - Maximum time in seconds to wait after a HTTP PATCH until the controller returns the patched object.
+            - The object is read back with short and growing waits until its _last_modified reaches the one returned
+              by the PATCH. It is not read back when the response of the PATCH has the whole object.
+        default: 5
+        type: float
 
 
 extends_documentation_fragment:
@@ -121,6 +141,42 @@ EXAMPLES = '''
     retries: 120
     delay: 10
 
+  - name: Fetch runtime of many virtual services concurrently
+    avi_api_session:
+      controller: "{{ controller }}"
+      username: "{{ username }}"
+      password: "{{ password }}"
+      api_version: 16.4
+      concurrency: 16
+      requests:
+        - http_method: get
+          path: virtualservice/virtualservice-4f2c8a3e/runtime
+        - http_method: get
+          path: virtualservice/virtualservice-9b1d7e60/runtime
+    register: vs_runtime
+
+  - name: Create pools and patch a virtual service in one task
+    avi_api_session:
+      controller: "{{ controller }}"
+      username: "{{ username }}"
+      password: "{{ password }}"
+      api_version: 16.4
+      requests:
+        - http_method: post
+          path: pool
+          data:
+            name: pool-1
+        - http_method: post
+          path: pool
+          data:
+            name: pool-2
+        - http_method: get
+          path: virtualservice
+          params:
+            name: vs-1
+          timeout: 10
+    register: batch_results
+
 '''
 
 
@@ -129,61 +185,47 @@ obj:
     description: Avi REST resource
     returned: success, changed
     type: dict
+results:
+    description: Result of every call in requests with keys http_method, path, status_code, changed, failed, obj and msg
+    returned: when requests is used
+    type: list
+api_stats:
+    description: API calls of the task with the requests per method, latency, the slowest calls, logins, bytes and retries.
+    returned: when AVI_API_STATS is set
+    type: dict
 '''
 
 
 import json
-import time
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.six import string_types
 from copy import deepcopy
+from multiprocessing.pool import ThreadPool
 
 try:
-    from avi.sdk.avi_api import ApiSession, AviCredentials
+    from avi.sdk.avi_api import AviCredentials
     from avi.sdk.utils.ansible_utils import (
         avi_obj_cmp, cleanup_absent_fields, avi_common_argument_spec,
         ansible_return)
+    from ansible.module_utils.avi_ansible_utils import (
+        avi_readback, modified_since, strip_ref_hosts)
+    from ansible.module_utils.avi_api_stats import track_api_stats
+    from ansible.module_utils.avi_session_cache import get_cached_session
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
 
 
-def main():
-    argument_specs = dict(
-        http_method=dict(required=True,
-                         choices=['get', 'put', 'post', 'patch',
-                                  'delete']),
-        path=dict(type='str', required=True),
-        params=dict(type='dict'),
-        data=dict(type='jsonarg'),
-        timeout=dict(type='int', default=60)
-    )
-    argument_specs.update(avi_common_argument_spec())
-    module = AnsibleModule(argument_spec=argument_specs)
-    if not HAS_AVI:
-        return module.fail_json(msg=(
-            'Avi python API SDK (avisdk>=17.1) or requests is not installed. '
-            'For more details visit https://github.com/avinetworks/sdk.'))
-    api_creds = AviCredentials()
-    api_creds.update_from_ansible_module(module)
-    api = ApiSession.get_session(
-        api_creds.controller, api_creds.username, password=api_creds.password,
-        timeout=api_creds.timeout, tenant=api_creds.tenant,
-        tenant_uuid=api_creds.tenant_uuid, token=api_creds.token,
-        port=api_creds.port)
-
-    tenant_uuid = api_creds.tenant_uuid
-    tenant = api_creds.tenant
-    timeout = int(module.params.get('timeout'))
-    # path is a required argument
-    path = module.params.get('path', '')
-    params = module.params.get('params', None)
-    data = module.params.get('data', None)
-    # Get the api_version from module.
-    api_version = api_creds.api_version
-    if data is not None:
-        data = json.loads(data)
-    method = module.params['http_method']
-
+def api_call(api, method, path, params, data, timeout, tenant,
+             tenant_uuid, api_version, readback_timeout=5.0):
+    """
+    Invokes a single API call. POST and PUT are made idempotent by checking
+    for the existing object first.
+    :param readback_timeout: seconds to wait for the patched object
+    :return: tuple of (changed, rsp, existing_obj). rsp is None when the PUT
+        was skipped as the object is unchanged.
+    """
     existing_obj = None
     changed = method != 'get'
     gparams = deepcopy(params) if params else {}
@@ -264,22 +306,155 @@ def main():
         changed = False
         rsp.status_code = 200
     if method == 'patch' and existing_obj and rsp.status_code < 299:
-        # Ideally the comparison should happen with the return values
-        # from the patch API call. However, currently Avi API are
-        # returning different hostname when GET is used vs Patch.
-        # tracked as AV-12561
-        if path.startswith('pool'):
-            time.sleep(1)
+        # A PATCH that did not write the object returns it with the same
+        # _last_modified.
+        patch_rsp = rsp
+        patched = rsp.json()
+        last_modified = (patched.get('_last_modified')
+                         if isinstance(patched, dict) else None)
+        if (last_modified is not None and
+                last_modified == existing_obj.get('_last_modified')):
+            return False, rsp, existing_obj
+        if last_modified is not None and patched.get('uuid'):
+            # The PATCH returned the patched object. Its references have
+            # another hostname than the ones of the GET (AV-12561) and no
+            # #name, so both are compared by the path of the references.
+            changed = not avi_obj_cmp(strip_ref_hosts(patched),
+                                      strip_ref_hosts(existing_obj))
+            return changed, rsp, existing_obj
+        # the PATCH did not return the object so it is read back
         gparams = deepcopy(params) if params else {}
         gparams.update({'include_refs': '', 'include_name': ''})
-        rsp = api.get(path, tenant=tenant, tenant_uuid=tenant_uuid,
-                      params=gparams, api_version=api_version)
+        rsp = avi_readback(api, path, tenant=tenant, tenant_uuid=tenant_uuid,
+                           params=gparams, api_version=api_version,
+                           last_modified=last_modified,
+                           timeout=readback_timeout)
         new_obj = rsp.json()
+        if last_modified is not None and not modified_since(
+                new_obj.get('_last_modified'), last_modified):
+            # the controller did not return the patched object in time, so
+            # the response of the PATCH is the best view of the object.
+            rsp = patch_rsp
+            new_obj = patched
         changed = not avi_obj_cmp(new_obj, existing_obj)
+    return changed, rsp, existing_obj
+
+
+def batch_api_calls(module, api, requests, concurrency, tenant, tenant_uuid,
+                    api_version):
+    """
+    Runs independent API calls over the shared session using a bounded
+    pool of threads.
+    :return: list of results in the same order as requests.
+    """
+    default_timeout = int(module.params.get('timeout'))
+
+    def run(req):
+        method = req['http_method']
+        data = req.get('data', None)
+        if isinstance(data, string_types):
+            data = json.loads(data)
+        result = dict(http_method=method, path=req['path'], changed=False,
+                      failed=False)
+        try:
+            changed, rsp, existing_obj = api_call(
+                api, method, req['path'], req.get('params', None), data,
+                int(req.get('timeout', default_timeout)), tenant,
+                tenant_uuid, api_version,
+                readback_timeout=module.params['readback_timeout'])
+        except Exception as e:
+            result.update(failed=True, msg=str(e))
+            return result
+        if rsp is None:
+            result.update(changed=changed, status_code=200, obj=existing_obj)
+        elif rsp.status_code > 299:
+            result.update(failed=True, status_code=rsp.status_code,
+                          msg=rsp.text)
+        else:
+            result.update(changed=changed, status_code=rsp.status_code,
+                          obj=rsp.json())
+        return result
+
+    pool = ThreadPool(max(1, min(concurrency, len(requests))))
+    try:
+        return pool.map(run, requests)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main():
+    argument_specs = dict(
+        http_method=dict(choices=['get', 'put', 'post', 'patch',
+                                  'delete']),
+        path=dict(type='str'),
+        params=dict(type='dict'),
+        data=dict(type='jsonarg'),
+        timeout=dict(type='int', default=60),
+        requests=dict(type='list'),
+        concurrency=dict(type='int', default=8),
+        readback_timeout=dict(type='float', default=5),
+    )
+    argument_specs.update(avi_common_argument_spec())
+    module = AnsibleModule(
+        argument_spec=argument_specs,
+        required_one_of=[['path', 'requests']],
+        mutually_exclusive=[['path', 'requests']],
+        required_together=[['http_method', 'path']])
+    if not HAS_AVI:
+        return module.fail_json(msg=(
+            'Avi python API SDK (avisdk>=17.1) or requests is not installed. '
+            'For more details visit https://github.com/avinetworks/sdk.'))
+    track_api_stats(module)
+    api_creds = AviCredentials()
+    api_creds.update_from_ansible_module(module)
+    api = get_cached_session(api_creds, socket_path=module._socket_path)
+
+    tenant_uuid = api_creds.tenant_uuid
+    tenant = api_creds.tenant
+    # Get the api_version from module.
+    api_version = api_creds.api_version
+
+    requests = module.params.get('requests', None)
+    if requests:
+        for req in requests:
+            if (not isinstance(req, dict) or
+                    req.get('http_method') not in
+                    argument_specs['http_method']['choices'] or
+                    not req.get('path')):
+                return module.fail_json(msg=(
+                    'Every entry in requests requires path and http_method '
+                    'as one of %s: %s' % (
+                        argument_specs['http_method']['choices'], req)))
+        results = batch_api_calls(module, api, requests,
+                                  module.params['concurrency'], tenant,
+                                  tenant_uuid, api_version)
+        changed = any(r['changed'] for r in results)
+        failed = [r for r in results if r['failed']]
+        if failed:
+            return module.fail_json(
+                msg='%d of %d requests failed' % (len(failed), len(results)),
+                changed=changed, results=results)
+        return module.exit_json(changed=changed, results=results)
+
+    timeout = int(module.params.get('timeout'))
+    path = module.params.get('path', '')
+    params = module.params.get('params', None)
+    data = module.params.get('data', None)
+    if data is not None:
+        data = json.loads(data)
+    method = module.params['http_method']
+
+    changed, rsp, existing_obj = api_call(
+        api, method, path, params, data, timeout, tenant, tenant_uuid,
+        api_version, readback_timeout=module.params['readback_timeout'])
     if rsp is None:
         return module.exit_json(changed=changed, obj=existing_obj)
     return ansible_return(module, rsp, changed, req=data)
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
@@ -53,6 +53,32 @@ options:
             - Avoid check for login with given password and re-initialise controller
               with given password even if controller password is initialised before
         type: bool
+    controllers:
+        description:
+            - List of controller IPs to bootstrap in one task. Defaults to the controller of the task.
+            - Every controller is polled and initialized independently so a controller is initialized as soon as it is up.
+        type: list
+    cluster_state:
+        description:
+            - Cluster states of /api/cluster/runtime in which the controller is considered up.
+        default: ["CLUSTER_UP_NO_HA"]
+        type: list
+    con_wait_time:
+        description:
+            - Max time in seconds to wait for each controller to come up.
+        default: 3600
+        type: int
+    round_wait:
+        description:
+            - Initial time in seconds between two polls of a controller. The time doubles after every poll up to
+              I(max_round_wait) with a random jitter.
+        default: 10
+        type: int
+    max_round_wait:
+        description:
+            - Max time in seconds between two polls of a controller.
+        default: 60
+        type: int
 
 
 extends_documentation_fragment:
@@ -71,6 +97,23 @@ EXAMPLES = '''
       con_wait_time: 3600
       round_wait: 10
 
+  - name: Initialize user password of the nodes of a cluster in parallel
+    avi_bootstrap_controller:
+      avi_credentials:
+        port: "443"
+        api_version: "18.2.3"
+      controllers:
+        - 10.10.1.11
+        - 10.10.1.12
+        - 10.10.1.13
+      cluster_state:
+        - CLUSTER_UP_NO_HA
+        - CLUSTER_UP_HA_ACTIVE
+      ssh_key_pair: "/path/to/key-pair-file.pem"
+      password: new_password
+      round_wait: 5
+      max_round_wait: 60
+
 '''
 
 RETURN = '''
@@ -78,9 +121,15 @@ obj:
     description: Avi REST resource
     returned: success, changed
     type: dict
+controllers:
+    description: Result of every controller with the time in seconds it took to come up (wait_time) and the number of polls.
+    returned: always
+    type: list
 '''
 
+import random
 import time
+from multiprocessing.pool import ThreadPool
 from ansible.module_utils.basic import AnsibleModule
 try:
     from avi.sdk.avi_api import ApiSession, AviCredentials
@@ -98,35 +147,90 @@ try:
              (parse_version(sdk_version) < parse_version('17.2.2b3')))):
         # It allows the __version__ to be '' as that value is used in development builds
         raise ImportError
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
 
 
-def controller_wait(controller_ip, port=None, round_wait=10, wait_time=3600):
+def controller_wait(controller_ip, port=None, round_wait=10, wait_time=3600,
+                    max_round_wait=60, cluster_states=('CLUSTER_UP_NO_HA',),
+                    clock=time.time, sleep=time.sleep):
     """
     It waits for controller to come up for a given wait_time (default 1 hour).
-    :return: controller_up: Boolean value for controller up state.
+    The time between two polls starts at round_wait and doubles up to
+    max_round_wait. A random jitter keeps many waits from polling in step.
+    :param clock: function returning the current time in seconds
+    :param sleep: function sleeping for the given seconds
+    :return: tuple of (controller_up, seconds waited, number of polls,
+        last cluster state)
     """
-    count = 0
-    max_count = wait_time / round_wait
     ctrl_port = port if port else 80
     path = "http://{}:{}{}".format(controller_ip, ctrl_port, "/api/cluster/runtime")
-    ctrl_status = False
+    start = clock()
+    deadline = start + wait_time
+    delay = round_wait
+    count = 0
+    state = None
     while True:
-        if count >= max_count:
-            break
+        count += 1
         try:
             r = requests.get(path, timeout=10, verify=False)
             # Check for controller response for login URI.
-            if r.json()['cluster_state']['state'] == 'CLUSTER_UP_NO_HA':
-                ctrl_status = True
-                break
+            state = r.json()['cluster_state']['state']
+            if state in cluster_states:
+                return True, clock() - start, count, state
         except Exception as e:
             pass
-        time.sleep(round_wait)
-        count += 1
-    return ctrl_status
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return False, clock() - start, count, state
+        sleep(min(remaining, delay / 2.0 + random.uniform(0, delay / 2.0)))
+        delay = min(delay * 2, max(max_round_wait, round_wait))
+
+
+def bootstrap_controller(module, api_creds, controller, new_password,
+                         key_pair, force_mode):
+    """
+    Waits for the controller to come up and initializes the admin password.
+    :return: dict with the result of the controller
+    """
+    up, waited, polls, state = controller_wait(
+        controller, api_creds.port, module.params['round_wait'],
+        module.params['con_wait_time'], module.params['max_round_wait'],
+        module.params['cluster_state'])
+    result = dict(controller=controller, changed=False, failed=False,
+                  wait_time=round(waited, 1), polls=polls,
+                  cluster_state=state)
+    if not up:
+        result.update(failed=True, msg=(
+            'Something wrong with the controller. The Controller is not in the up state.'))
+        return result
+    if not force_mode:
+        # Check for admin login with new password before initializing controller password.
+        try:
+            ApiSession.get_session(
+                controller, "admin",
+                password=new_password, timeout=api_creds.timeout,
+                tenant=api_creds.tenant, tenant_uuid=api_creds.tenant_uuid,
+                token=api_creds.token, port=api_creds.port)
+            result.update(msg="Already initialized controller password with a given password.")
+            return result
+        except Exception as e:
+            pass
+    cmd = "ssh -o \"StrictHostKeyChecking no\" -t -i " + key_pair + " admin@" + \
+          controller + " \"ls /opt/avi/scripts/initialize_admin_user.py && echo -e '" + \
+          controller + "\\n" + new_password + "' | sudo /opt/avi/scripts/initialize_admin_user.py\""
+    process = subprocess.Popen(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE, shell=True)
+    stdout, stderr = process.communicate()
+    cmd_status = process.returncode
+    if cmd_status == 0:
+        result.update(changed=True, msg="Successfully initialized controller with new password. "
+                      "return_code: %s output: %s error: %s" % (cmd_status, stdout, stderr))
+    else:
+        result.update(failed=True, msg='Fail to initialize password for controllers return_code: %s '
+                      'output: %s error: %s' % (cmd_status, stdout, stderr))
+    return result
 
 
 def main():
@@ -134,10 +238,13 @@ def main():
         password=dict(type='str', required=True, no_log=True),
         ssh_key_pair=dict(type='str', required=True),
         force_mode=dict(type='bool', default=False),
+        controllers=dict(type='list'),
+        cluster_state=dict(type='list', default=['CLUSTER_UP_NO_HA']),
         # Max time to wait for controller up state
         con_wait_time=dict(type='int', default=3600),
         # Retry after every rount_wait time to check for controller state.
         round_wait=dict(type='int', default=10),
+        max_round_wait=dict(type='int', default=60),
     )
     argument_specs.update(avi_common_argument_spec())
     module = AnsibleModule(argument_spec=argument_specs)
@@ -151,36 +258,34 @@ def main():
     new_password = module.params.get('password')
     key_pair = module.params.get('ssh_key_pair')
     force_mode = module.params.get('force_mode')
-    # Wait for controller to come up for given con_wait_time
-    controller_up = controller_wait(api_creds.controller, api_creds.port, module.params['round_wait'],
-                                    module.params['con_wait_time'])
-    if not controller_up:
-        return module.fail_json(
-            msg='Something wrong with the controller. The Controller is not in the up state.')
-    if not force_mode:
-        # Check for admin login with new password before initializing controller password.
-        try:
-            ApiSession.get_session(
-                api_creds.controller, "admin",
-                password=new_password, timeout=api_creds.timeout,
-                tenant=api_creds.tenant, tenant_uuid=api_creds.tenant_uuid,
-                token=api_creds.token, port=api_creds.port)
-            module.exit_json(msg="Already initialized controller password with a given password.", changed=False)
-        except Exception as e:
-            pass
-    cmd = "ssh -o \"StrictHostKeyChecking no\" -t -i " + key_pair + " admin@" + \
-          api_creds.controller + " \"ls /opt/avi/scripts/initialize_admin_user.py && echo -e '" + \
-          api_creds.controller + "\\n" + new_password + "' | sudo /opt/avi/scripts/initialize_admin_user.py\""
-    process = subprocess.Popen(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE, shell=True)
-    stdout, stderr = process.communicate()
-    cmd_status = process.returncode
-    if cmd_status == 0:
-        return module.exit_json(changed=True, msg="Successfully initialized controller with new password. "
-                                "return_code: %s output: %s error: %s" % (cmd_status, stdout, stderr))
-    else:
-        return module.fail_json(msg='Fail to initialize password for controllers return_code: %s '
-                                'output: %s error: %s' % (cmd_status, stdout, stderr))
+    controllers = module.params.get('controllers') or [api_creds.controller]
+    # Wait for all the controllers at once and initialize each of them as
+    # soon as it is up.
+    pool = ThreadPool(len(controllers))
+    try:
+        results = pool.map(
+            lambda controller: bootstrap_controller(
+                module, api_creds, controller, new_password, key_pair,
+                force_mode), controllers)
+    finally:
+        pool.close()
+        pool.join()
+    changed = any(r['changed'] for r in results)
+    failed = [r for r in results if r['failed']]
+    if failed:
+        msg = failed[0]['msg'] if len(results) == 1 else (
+            '%d of %d controllers failed: %s' % (
+                len(failed), len(results),
+                ', '.join(r['controller'] for r in failed)))
+        return module.fail_json(msg=msg, changed=changed, controllers=results)
+    msg = results[0]['msg'] if len(results) == 1 else (
+        'Initialized %d of %d controllers' % (
+            len([r for r in results if r['changed']]), len(results)))
+    return module.exit_json(changed=changed, msg=msg, controllers=results)
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
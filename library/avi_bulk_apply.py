@@ -0,0 +1,317 @@
+#!/usr/bin/python
+"""
+# Created on Oct 18, 2026
+#
+# module_check: supported
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: avi_bulk_apply
+author: Avi Networks
+
+short_description: Avi module to reconcile many objects in one task
+description:
+    - This module applies a list of Avi objects of any type in a single task.
+    - Existing objects are fetched with one collection GET per object type and tenant and compared in memory.
+    - Only the objects that differ from the controller are created, updated or deleted.
+version_added: 2.9
+requirements: [ avisdk ]
+options:
+    objects:
+        description:
+            - List of objects to apply. Each entry is a dict with keys C(obj_type), C(name), C(spec) and C(state).
+            - C(obj_type) is the Avi object type, for example C(pool) or C(virtualservice).
+            - C(spec) is the object definition in the same format as the corresponding avi_<obj_type> module.
+            - C(state) is C(present) (default) or C(absent).
+            - C(tenant) can optionally override the tenant of the task for an entry.
+            - One of I(objects) or I(config) is required.
+        type: list
+    config:
+        description:
+            - Configuration tree as a dict of object type to the list of object specs, for example
+              C({pool: [{name: p1, ...}], virtualservice: [{name: vs1, pool_ref: /api/pool?name=p1}]}).
+            - All objects of the tree are applied with state C(present).
+        type: dict
+    concurrency:
+        description:
+            - Objects are ordered by the references between them in their C(*_ref) fields.
+              Present objects are applied in waves where each wave only refers to objects of earlier waves,
+              and absent objects are deleted afterwards in the reverse order.
+            - Maximum number of objects of a wave that are applied at the same time.
+        default: 1
+        type: int
+    page_size:
+        description:
+            - Number of objects fetched per collection GET call.
+        default: 200
+        type: int
+
+
+extends_documentation_fragment:
+    - avi
+'''
+
+EXAMPLES = '''
+  - name: Apply a configuration tree with dependent objects in parallel waves
+    avi_bulk_apply:
+      controller: "{{ controller }}"
+      username: "{{ username }}"
+      password: "{{ password }}"
+      api_version: 18.2.8
+      concurrency: 8
+      config:
+        virtualservice:
+          - name: vs-1
+            pool_group_ref: /api/poolgroup?name=pg-1
+            vsvip_ref: /api/vsvip?name=vsvip-1
+            services:
+              - port: 80
+        poolgroup:
+          - name: pg-1
+            members:
+              - pool_ref: /api/pool?name=pool-1
+        pool:
+          - name: pool-1
+        vsvip:
+          - name: vsvip-1
+            vip:
+              - vip_id: 1
+                ip_address:
+                  addr: 10.10.10.10
+                  type: V4
+
+  - name: Create pools and a virtual service in one task
+    avi_bulk_apply:
+      controller: "{{ controller }}"
+      username: "{{ username }}"
+      password: "{{ password }}"
+      api_version: 18.2.8
+      objects:
+        - obj_type: pool
+          name: pool-1
+          spec:
+            servers:
+              - ip:
+                  addr: 10.10.10.11
+                  type: V4
+        - obj_type: pool
+          name: pool-2
+          state: absent
+        - obj_type: virtualservice
+          name: vs-1
+          spec:
+            pool_ref: /api/pool?name=pool-1
+            vsvip_ref: /api/vsvip?name=vsvip-1
+            services:
+              - port: 80
+'''
+
+
+RETURN = '''
+obj:
+    description: Result of every entry with the action taken (create, update, delete or none)
+    returned: success, changed
+    type: list
+'''
+
+from copy import deepcopy
+from multiprocessing.pool import ThreadPool
+from ansible.module_utils.basic import AnsibleModule
+
+try:
+    from avi.sdk.avi_api import APIError, AviCredentials
+    from avi.sdk.utils.ansible_utils import cleanup_absent_fields
+    from ansible.module_utils.avi_ansible_utils import (
+        avi_common_argument_spec, avi_collection_iter)
+    from ansible.module_utils.avi_diff import avi_obj_cmp
+    from ansible.module_utils.avi_dependency_graph import (
+        DependencyCycleError, dependency_waves, iter_refs)
+    from ansible.module_utils.avi_object_cache import get_object_cache
+    from ansible.module_utils.avi_session_cache import get_cached_session
+    from ansible.module_utils.avi_profile import profile_main
+    HAS_AVI = True
+except ImportError:
+    HAS_AVI = False
+
+# Objects that do not have a collection and can not be applied by name.
+NO_COLLECTION_OBJ = ['cluster', 'systemconfiguration', 'controllerproperties',
+                     'seproperties', 'backupconfiguration']
+
+
+def apply_entry(api, entry, existing_obj, tenant, api_version, check_mode):
+    """
+    Applies a single entry against the existing object from the collection.
+    :return: tuple of (action, rsp) where action is create, update, delete
+        or none.
+    """
+    obj_type = entry['obj_type']
+    if entry.get('state', 'present') == 'absent':
+        if not existing_obj:
+            return 'none', None
+        if check_mode:
+            return 'delete', None
+        rsp = api.delete('%s/%s' % (obj_type, existing_obj['uuid']),
+                         tenant=tenant, api_version=api_version)
+        if rsp.status_code == 404:
+            return 'none', None
+        return 'delete', rsp
+
+    req = deepcopy(entry.get('spec') or {})
+    req['name'] = entry['name']
+    if not existing_obj:
+        if check_mode:
+            return 'create', None
+        cleanup_absent_fields(req)
+        return 'create', api.post(obj_type, data=req, tenant=tenant,
+                                  api_version=api_version)
+    # avi_obj_cmp purges the fields it has compared so work on a copy.
+    if avi_obj_cmp(deepcopy(req), existing_obj):
+        return 'none', None
+    if check_mode:
+        return 'update', None
+    cleanup_absent_fields(req)
+    return 'update', api.put('%s/%s' % (obj_type, existing_obj['uuid']),
+                             data=req, tenant=tenant, api_version=api_version)
+
+
+def get_entries(module):
+    """
+    :return: list of entries from objects followed by the objects of config
+    """
+    entries = list(module.params.get('objects') or [])
+    for obj_type, specs in (module.params.get('config') or {}).items():
+        for spec in specs or []:
+            spec = dict(spec)
+            entries.append(dict(obj_type=obj_type, name=spec.pop('name', None),
+                                spec=spec))
+    return entries
+
+
+def get_waves(entries, keys, collections):
+    """
+    Orders the entries by the references between them.
+    :return: list of waves of entry indexes. Waves of present entries come
+        first followed by waves of absent entries in reverse dependency order.
+    """
+    key_index = dict((key, i) for i, key in enumerate(keys))
+    present, absent, deps = [], [], {}
+    for i, entry in enumerate(entries):
+        tenant = keys[i][0]
+        if entry.get('state', 'present') == 'absent':
+            # the spec of absent entries is not given so use the references
+            # of the object on the controller.
+            obj = collections[(tenant, entry['obj_type'])].get(entry['name'])
+            absent.append(i)
+        else:
+            obj = entry.get('spec') or {}
+            present.append(i)
+        deps[i] = set(key_index[(tenant, obj_type, name)]
+                      for obj_type, name in iter_refs(obj)
+                      if (tenant, obj_type, name) in key_index)
+    waves = dependency_waves(present, deps)
+    waves.extend(reversed(dependency_waves(absent, deps)))
+    return waves
+
+
+def main():
+    argument_specs = dict(
+        objects=dict(type='list'),
+        config=dict(type='dict'),
+        concurrency=dict(type='int', default=1),
+        page_size=dict(type='int', default=200),
+    )
+    argument_specs.update(avi_common_argument_spec())
+    module = AnsibleModule(
+        argument_spec=argument_specs, supports_check_mode=True,
+        required_one_of=[['objects', 'config']])
+    if not HAS_AVI:
+        return module.fail_json(msg=(
+            'Avi python API SDK (avisdk>=17.1) or requests is not installed. '
+            'For more details visit https://github.com/avinetworks/sdk.'))
+    api_creds = AviCredentials()
+    api_creds.update_from_ansible_module(module)
+    api = get_cached_session(api_creds, socket_path=module._socket_path)
+    api_version = api_creds.api_version
+    object_cache = get_object_cache(api_creds)
+    entries = get_entries(module)
+    for entry in entries:
+        if not isinstance(entry, dict) or not (
+                entry.get('obj_type') and entry.get('name')):
+            return module.fail_json(
+                msg='Every entry in objects requires obj_type and name: %s'
+                    % entry)
+        if entry['obj_type'] in NO_COLLECTION_OBJ:
+            return module.fail_json(
+                msg='%s can not be applied in bulk. Use avi_%s instead.' % (
+                    entry['obj_type'], entry['obj_type']))
+    keys = [(entry.get('tenant') or api_creds.tenant, entry['obj_type'],
+             entry['name']) for entry in entries]
+    pool = ThreadPool(max(1, module.params['concurrency']))
+
+    # One collection GET per object type and tenant. Objects are indexed by
+    # name so that each entry is looked up in memory.
+    def get_collection(key):
+        return dict(
+            (obj['name'], obj) for obj in avi_collection_iter(
+                api, key[1], tenant=key[0],
+                params={'include_refs': '', 'include_name': ''},
+                api_version=api_version,
+                page_size=module.params['page_size']))
+
+    collection_keys = sorted(set((key[0], key[1]) for key in keys))
+    try:
+        collections = dict(zip(collection_keys,
+                               pool.map(get_collection, collection_keys)))
+        waves = get_waves(entries, keys, collections)
+    except (APIError, DependencyCycleError) as e:
+        return module.fail_json(msg=str(e))
+
+    def apply_index(i):
+        tenant, obj_type, name = keys[i]
+        existing_obj = collections[(tenant, obj_type)].get(name)
+        return apply_entry(api, entries[i], existing_obj, tenant, api_version,
+                           module.check_mode)
+
+    results = [None] * len(entries)
+    try:
+        for wave in waves:
+            for i, (action, rsp) in zip(wave, pool.map(apply_index, wave)):
+                tenant, obj_type, name = keys[i]
+                objs = collections[(tenant, obj_type)]
+                if rsp is not None and rsp.status_code > 299:
+                    return module.fail_json(
+                        msg='Error %d Msg %s for %s %s' % (
+                            rsp.status_code, rsp.text, obj_type, name),
+                        obj=[r for r in results if r])
+                obj = objs.get(name)
+                if rsp is not None:
+                    object_cache.invalidate(obj_type, name=name)
+                if action in ('create', 'update') and rsp is not None:
+                    obj = rsp.json()
+                    objs[name] = obj
+                elif action == 'delete':
+                    objs.pop(name, None)
+                    obj = None
+                results[i] = dict(obj_type=obj_type, name=name, action=action,
+                                  changed=action != 'none', obj=obj)
+    finally:
+        pool.close()
+        pool.join()
+    changed = any(r['changed'] for r in results)
+    return module.exit_json(changed=changed, obj=results)
+
+
+if __name__ == '__main__':
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
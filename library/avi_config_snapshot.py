@@ -0,0 +1,542 @@
+#!/usr/bin/python
+"""
+# Created on Oct 18, 2026
+#
+# module_check: supported
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = '''
+---
+module: avi_config_snapshot
+author: Avi Networks
+
+short_description: Avi module to export the configuration of a controller
+description:
+    - This module exports the objects of every object type managed by the modules of this role to a
+      compressed newline delimited JSON (NDJSON) file.
+    - Every line of the file is a JSON document with the keys C(obj_type) and C(obj).
+    - Collections are fetched page by page and every page is written to the file as soon as it is
+      received, so the objects are never all held in memory.
+    - A manifest with the number of objects and the highest C(_last_modified) of every object type is
+      written next to the file, together with a file of the uuids of the objects.
+    - In C(incremental) mode only the objects modified after the C(_last_modified) of the previous
+      snapshot are written, each line with C(op) C(upsert), followed by lines with C(op) C(delete) and
+      the C(uuid) of every deleted object. The delta is replayed onto the previous snapshot by applying
+      its lines in order, keyed by C(obj_type) and C(uuid).
+version_added: 2.9
+requirements: [ avisdk ]
+options:
+    file_path:
+        description:
+            - Path of the snapshot file. The file is written to C(<file_path>.part) and renamed once complete.
+        required: true
+        type: str
+    manifest_path:
+        description:
+            - Path of the manifest file. Defaults to C(<file_path>.manifest.json).
+        type: str
+    compression:
+        description:
+            - Compression of the snapshot file. C(zstd) requires the zstandard python library.
+        choices: ["gzip", "zstd", "none"]
+        default: gzip
+        type: str
+    mode:
+        description:
+            - C(full) exports all the objects.
+            - C(incremental) exports the objects changed since the snapshot of I(previous_manifest).
+              Deleted objects are found with a listing of only the uuids of every collection.
+              A full export is done when I(previous_manifest) does not exist.
+        choices: ["full", "incremental"]
+        default: full
+        type: str
+    previous_manifest:
+        description:
+            - Manifest of the previous full or incremental snapshot. Required with I(mode=incremental).
+        type: str
+    obj_types:
+        description:
+            - Object types to export. Defaults to all the object types managed by the modules of this role.
+        type: list
+    exclude_obj_types:
+        description:
+            - Object types that are not exported.
+        type: list
+    all_tenants:
+        description:
+            - Export the objects of all the tenants with C(X-Avi-Tenant: *). Otherwise only the objects of
+              I(tenant) are exported.
+        default: true
+        type: bool
+    concurrency:
+        description:
+            - Maximum number of object types fetched at the same time.
+        default: 4
+        type: int
+    page_size:
+        description:
+            - Number of objects fetched per call.
+        default: 200
+        type: int
+    watermark_margin:
+        description:
+            - Seconds subtracted from the start of the snapshot for the watermark of the next incremental
+              snapshot. Objects modified in that time are exported again, so that changes committed while
+              the snapshot runs and the clock skew between the controller and the host are not missed.
+        default: 300
+        type: int
+
+
+extends_documentation_fragment:
+    - avi
+'''
+
+EXAMPLES = '''
+  - name: Nightly snapshot of the controller configuration
+    avi_config_snapshot:
+      controller: "{{ controller }}"
+      username: "{{ username }}"
+      password: "{{ password }}"
+      api_version: 18.2.8
+      file_path: "/backups/avi-{{ ansible_date_time.date }}.ndjson.gz"
+      concurrency: 8
+      exclude_obj_types:
+        - alert
+        - useractivity
+
+  - name: Daily delta since the last snapshot
+    avi_config_snapshot:
+      controller: "{{ controller }}"
+      username: "{{ username }}"
+      password: "{{ password }}"
+      api_version: 18.2.8
+      mode: incremental
+      previous_manifest: /backups/avi-latest.manifest.json
+      manifest_path: /backups/avi-latest.manifest.json
+      file_path: "/backups/avi-{{ ansible_date_time.date }}.delta.ndjson.gz"
+'''
+
+
+RETURN = '''
+file_path:
+    description: Path of the snapshot file
+    returned: success
+    type: str
+manifest:
+    description: Manifest of the snapshot with the watermark of the next incremental snapshot and count and
+                 last_modified of every object type
+    returned: success
+    type: dict
+mode:
+    description: Mode of the snapshot, full if no previous manifest was found
+    returned: success
+    type: str
+skipped:
+    description: Object types that are not supported by the controller and were not exported
+    returned: success
+    type: list
+'''
+
+import gzip
+import json
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from ansible.module_utils.basic import AnsibleModule
+
+try:
+    from avi.sdk.avi_api import APIError, AviCredentials
+    from ansible.module_utils.avi_ansible_utils import (
+        avi_common_argument_spec, avi_collection_iter)
+    from ansible.module_utils.avi_session_cache import get_cached_session
+    from ansible.module_utils.avi_profile import profile_main
+    HAS_AVI = True
+except ImportError:
+    HAS_AVI = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Object types of the modules of this role
+SNAPSHOT_OBJ_TYPES = [
+    'actiongroupconfig', 'alert', 'alertconfig', 'alertemailconfig',
+    'alertobjectlist', 'alertscriptconfig', 'alertsyslogconfig',
+    'analyticsprofile', 'apiclifsruntime', 'application',
+    'applicationpersistenceprofile', 'applicationprofile', 'authprofile',
+    'autoscalelaunchconfig', 'backup', 'backupconfiguration',
+    'certificatemanagementprofile', 'cloud', 'cloudconnectoruser',
+    'cloudproperties', 'cloudruntime', 'cluster', 'clusterclouddetails',
+    'controllerlicense', 'controllerportalregistration',
+    'controllerproperties', 'controllersite', 'customerportalinfo',
+    'customipamdnsprofile', 'debugcontroller', 'debugserviceengine',
+    'debugvirtualservice', 'dnspolicy', 'errorpagebody', 'errorpageprofile',
+    'gslb', 'gslbapplicationpersistenceprofile', 'gslbgeodbprofile',
+    'gslbhealthmonitor', 'gslbservice', 'hardwaresecuritymodulegroup',
+    'healthmonitor', 'httppolicyset', 'image', 'ipaddrgroup',
+    'ipamdnsproviderprofile', 'jobentry', 'logcontrollermapping',
+    'microservice', 'microservicegroup', 'natpolicy', 'network',
+    'networkprofile', 'networkruntime', 'networksecuritypolicy',
+    'networkservice', 'nsxapplicationinfo', 'nsxipsetinfo',
+    'nsxsectioninfo', 'objectaccesspolicy', 'pingaccessagent', 'pkiprofile',
+    'pool', 'poolgroup', 'poolgroupdeploymentpolicy', 'portalfileupload',
+    'prioritylabels', 'protocolparser', 'role', 'scheduler',
+    'scpoolserverstateinfo', 'scvsstateinfo', 'securechannelavailablelocalips',
+    'securechannelmapping', 'securechanneltoken', 'securitypolicy',
+    'seproperties', 'serverautoscalepolicy', 'serviceengine',
+    'serviceenginegroup', 'serviceenginepolicy', 'snmptrapprofile',
+    'sslkeyandcertificate', 'sslprofile', 'ssopolicy', 'stringgroup',
+    'systemconfiguration', 'tenant', 'trafficcloneprofile',
+    'upgradestatusinfo', 'upgradestatussummary', 'user', 'useraccountprofile',
+    'useractivity', 'vidcinfo', 'vimgrclusterruntime',
+    'vimgrcontrollerruntime', 'vimgrdcruntime', 'vimgrhostruntime',
+    'vimgrnwruntime', 'vimgrsevmruntime', 'vimgrvcenterruntime',
+    'vimgrvmruntime', 'vipgnameinfo', 'virtualservice', 'vrfcontext',
+    'vsdatascriptset', 'vsvip', 'wafcrs', 'wafpolicy', 'wafpolicypsmgroup',
+    'wafprofile', 'webhook']
+
+# Objects that are a single object instead of a collection.
+SINGLETON_OBJ_TYPES = ['cluster', 'controllerproperties', 'seproperties',
+                       'systemconfiguration']
+
+
+def open_file(path, mode, compression):
+    if compression == 'gzip':
+        return gzip.open(path, mode)
+    if compression == 'zstd':
+        if 'r' in mode:
+            return zstandard.ZstdDecompressor().stream_reader(open(path, mode))
+        return zstandard.ZstdCompressor().stream_writer(open(path, mode))
+    return open(path, mode)
+
+
+class SnapshotWriter(object):
+    """
+    Writes the objects of all the object types to one NDJSON stream. Pages
+    of different object types are written whole so their lines never mix.
+    """
+
+    def __init__(self, path, compression, incremental=False):
+        self.f = open_file(path, 'wb', compression)
+        self.incremental = incremental
+        self.lock = threading.Lock()
+
+    def _write(self, records):
+        lines = ''.join(json.dumps(record, sort_keys=True) + '\n'
+                        for record in records).encode('utf-8')
+        with self.lock:
+            self.f.write(lines)
+
+    def write(self, obj_type, objs):
+        if self.incremental:
+            self._write({'op': 'upsert', 'obj_type': obj_type, 'obj': obj}
+                        for obj in objs)
+        else:
+            self._write({'obj_type': obj_type, 'obj': obj} for obj in objs)
+
+    def write_deletes(self, obj_type, uuids):
+        self._write({'op': 'delete', 'obj_type': obj_type, 'uuid': uuid}
+                    for uuid in uuids)
+
+    def close(self):
+        self.f.close()
+
+
+def max_last_modified(last_modified, objs):
+    """
+    :return: highest _last_modified of last_modified and the objects. It is
+        a timestamp in microseconds so it is compared as a number.
+    """
+    for obj in objs:
+        value = obj.get('_last_modified')
+        if value and (last_modified is None or
+                      int(value) > int(last_modified)):
+            last_modified = value
+    return last_modified
+
+
+def snapshot_watermark(started, margin):
+    """
+    The watermark of the next incremental snapshot is taken from the clock
+    and not from the objects. An object committed while the export runs can
+    have a _last_modified lower than that of objects already exported.
+    :param started: time the export started at, in seconds
+    :param margin: seconds subtracted for the clock skew of the controller
+    :return: _last_modified of the watermark, in microseconds
+    """
+    return str(int((started - margin) * 1000000))
+
+
+def modified_after(obj, since):
+    """
+    :return: True if the object was modified after the watermark since or
+        if it has no _last_modified
+    """
+    value = obj.get('_last_modified')
+    return not (value and since) or int(value) > int(since)
+
+
+def is_descending(objs):
+    values = [int(obj.get('_last_modified') or 0) for obj in objs]
+    return values == sorted(values, reverse=True)
+
+
+def export_obj_type(api, writer, obj_type, tenant, api_version, page_size,
+                    since=None):
+    """
+    Writes the objects of obj_type to the snapshot one page at a time.
+    :param since: only objects modified after this _last_modified are
+        written. The collection is sorted by _last_modified descending so
+        that the export stops at the first page with older objects.
+    :return: dict with count, last_modified and uuids of the written objects
+    Raises APIError if a page can not be fetched.
+    """
+    stats = {'count': 0, 'last_modified': None, 'uuids': []}
+    page = 1
+    while True:
+        gparams = {}
+        if obj_type not in SINGLETON_OBJ_TYPES:
+            gparams.update(page=page, page_size=page_size)
+            if since:
+                gparams['sort'] = '-_last_modified'
+        rsp = api.get(obj_type, tenant=tenant, params=gparams,
+                      api_version=api_version)
+        if rsp.status_code > 299:
+            raise APIError('Failed to get %s page %d status %d msg %s' % (
+                obj_type, page, rsp.status_code, rsp.text), rsp)
+        data = rsp.json()
+        objs = data['results'] if 'results' in data else [data]
+        newer = [obj for obj in objs if modified_after(obj, since)]
+        writer.write(obj_type, newer)
+        stats['count'] += len(newer)
+        stats['uuids'].extend(obj['uuid'] for obj in newer if 'uuid' in obj)
+        stats['last_modified'] = max_last_modified(stats['last_modified'],
+                                                   newer)
+        if not data.get('next'):
+            return stats
+        # the remaining pages are older if the controller sorted the
+        # collection, otherwise every page has to be checked.
+        if len(newer) < len(objs) and is_descending(objs):
+            return stats
+        page += 1
+
+
+def list_uuids(api, obj_type, tenant, api_version, page_size):
+    """
+    :return: set of the uuids of the collection fetched without the objects
+    """
+    return set(obj['uuid'] for obj in avi_collection_iter(
+        api, obj_type, tenant=tenant, params={'fields': 'uuid'},
+        api_version=api_version, page_size=page_size))
+
+
+def export_delta(api, writer, obj_type, tenant, api_version, page_size,
+                 previous, since):
+    """
+    Writes the objects of obj_type changed since the previous snapshot and
+    the uuids of the deleted objects.
+    :param previous: dict with last_modified and uuids of the object type in
+        the previous snapshot
+    :param since: watermark of the previous snapshot
+    :return: dict with count, last_modified, uuids, changed and deleted
+    """
+    stats = export_obj_type(api, writer, obj_type, tenant, api_version,
+                            page_size, since=since)
+    stats['changed'] = stats['count']
+    stats['last_modified'] = max_last_modified(
+        previous.get('last_modified'),
+        [{'_last_modified': stats['last_modified']}])
+    if obj_type in SINGLETON_OBJ_TYPES:
+        # a single object is never deleted
+        stats.update(deleted=0, count=max(stats['count'],
+                                          previous.get('count', 0)),
+                     uuids=previous.get('uuids', []) or stats['uuids'])
+        return stats
+    previous_uuids = set(previous.get('uuids', []))
+    uuids = list_uuids(api, obj_type, tenant, api_version, page_size)
+    # objects created with an older _last_modified, for example restored
+    # from a backup, are fetched one by one.
+    for uuid in sorted(uuids - previous_uuids - set(stats['uuids'])):
+        rsp = api.get('%s/%s' % (obj_type, uuid), tenant=tenant,
+                      api_version=api_version)
+        if rsp.status_code < 300:
+            writer.write(obj_type, [rsp.json()])
+            stats['changed'] += 1
+    deleted = sorted(previous_uuids - uuids)
+    writer.write_deletes(obj_type, deleted)
+    stats['deleted'] = len(deleted)
+    stats['uuids'] = list(uuids)
+    stats['count'] = len(uuids)
+    return stats
+
+
+def read_previous(manifest_path):
+    """
+    :return: tuple of the previous manifest and dict of object type to the
+        uuids of its objects or (None, None) if there is no manifest
+    """
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None, None
+    uuids_path = os.path.join(os.path.dirname(manifest_path),
+                              manifest.get('uuids_file', ''))
+    try:
+        with open_file(uuids_path, 'rb', 'gzip') as f:
+            uuids = json.loads(f.read().decode('utf-8'))
+    except (IOError, OSError, ValueError):
+        return None, None
+    return manifest, uuids
+
+
+def is_unsupported(error):
+    """
+    :return: True if the controller does not have the object type
+    """
+    rsp = getattr(error, 'rsp', None)
+    return rsp is not None and rsp.status_code in (400, 404)
+
+
+def write_json(path, data):
+    tmp_path = '%s.part' % path
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.rename(tmp_path, path)
+
+
+def main():
+    argument_specs = dict(
+        file_path=dict(type='str', required=True),
+        manifest_path=dict(type='str'),
+        compression=dict(type='str', default='gzip',
+                         choices=['gzip', 'zstd', 'none']),
+        mode=dict(type='str', default='full',
+                  choices=['full', 'incremental']),
+        previous_manifest=dict(type='str'),
+        obj_types=dict(type='list'),
+        exclude_obj_types=dict(type='list'),
+        all_tenants=dict(type='bool', default=True),
+        concurrency=dict(type='int', default=4),
+        page_size=dict(type='int', default=200),
+        watermark_margin=dict(type='int', default=300),
+    )
+    argument_specs.update(avi_common_argument_spec())
+    module = AnsibleModule(
+        argument_spec=argument_specs, supports_check_mode=True,
+        required_if=[['mode', 'incremental', ['previous_manifest']]])
+    if not HAS_AVI:
+        return module.fail_json(msg=(
+            'Avi python API SDK (avisdk>=17.1) or requests is not installed. '
+            'For more details visit https://github.com/avinetworks/sdk.'))
+    compression = module.params['compression']
+    if compression == 'zstd' and not HAS_ZSTD:
+        return module.fail_json(
+            msg='avi_config_snapshot, zstandard is required for zstd '
+                'compression')
+    file_path = module.params['file_path']
+    manifest_path = (module.params.get('manifest_path') or
+                     '%s.manifest.json' % file_path)
+    exclude = set(module.params.get('exclude_obj_types') or [])
+    obj_types = [obj_type for obj_type in
+                 module.params.get('obj_types') or SNAPSHOT_OBJ_TYPES
+                 if obj_type not in exclude]
+    previous, previous_uuids = None, None
+    if module.params['mode'] == 'incremental':
+        previous, previous_uuids = read_previous(
+            module.params['previous_manifest'])
+    mode = 'incremental' if previous else 'full'
+    if module.check_mode:
+        return module.exit_json(changed=True, file_path=file_path, mode=mode)
+
+    api_creds = AviCredentials()
+    api_creds.update_from_ansible_module(module)
+    api = get_cached_session(api_creds, socket_path=module._socket_path)
+    tenant = '*' if module.params['all_tenants'] else api_creds.tenant
+    api_version = api_creds.api_version
+    page_size = module.params['page_size']
+
+    part_path = '%s.part' % file_path
+    writer = SnapshotWriter(part_path, compression,
+                            incremental=mode == 'incremental')
+
+    def export(obj_type):
+        try:
+            if (mode == 'incremental' and
+                    obj_type in previous.get('obj_types', {})):
+                prev = dict(previous['obj_types'][obj_type],
+                            uuids=previous_uuids.get(obj_type, []))
+                # manifests without a watermark only have the newest
+                # _last_modified of every object type.
+                since = previous.get('watermark') or prev.get('last_modified')
+                stats = export_delta(api, writer, obj_type, tenant,
+                                     api_version, page_size, prev, since)
+            else:
+                stats = export_obj_type(api, writer, obj_type, tenant,
+                                        api_version, page_size)
+            return obj_type, stats, None
+        except Exception as e:
+            # raised in a worker thread so report it with the object type
+            return obj_type, None, e
+
+    started = time.time()
+    watermark = snapshot_watermark(started, module.params['watermark_margin'])
+    pool = ThreadPool(max(1, module.params['concurrency']))
+    manifest_types, uuids, skipped, errors = {}, {}, [], []
+    try:
+        for obj_type, stats, error in pool.imap_unordered(export, obj_types):
+            if stats is not None:
+                uuids[obj_type] = sorted(stats.pop('uuids'))
+                manifest_types[obj_type] = stats
+            elif is_unsupported(error):
+                skipped.append(obj_type)
+            else:
+                errors.append('%s: %s' % (obj_type, error.args[0] if
+                                          error.args else error))
+    finally:
+        pool.close()
+        pool.join()
+        writer.close()
+    if errors:
+        os.remove(part_path)
+        return module.fail_json(msg='Snapshot failed: %s' % '; '.join(
+            sorted(errors)))
+    os.rename(part_path, file_path)
+
+    uuids_path = '%s.uuids.json.gz' % file_path
+    with open_file(uuids_path, 'wb', 'gzip') as f:
+        f.write(json.dumps(uuids, sort_keys=True).encode('utf-8'))
+    manifest = dict(
+        controller=api_creds.controller, api_version=api_version,
+        tenant=tenant, created=started, duration=time.time() - started,
+        watermark=watermark,
+        file=os.path.basename(file_path), compression=compression,
+        uuids_file=os.path.relpath(
+            uuids_path, os.path.dirname(os.path.abspath(manifest_path))),
+        mode=mode, count=sum(stats['count']
+                             for stats in manifest_types.values()),
+        obj_types=manifest_types, skipped=sorted(skipped))
+    if mode == 'incremental':
+        # the chain of snapshots to replay starts at the last full snapshot
+        manifest['base'] = previous.get('base') or previous.get('file')
+        manifest['previous'] = previous.get('file')
+    write_json(manifest_path, manifest)
+    return module.exit_json(changed=True, file_path=file_path, mode=mode,
+                            manifest=manifest, skipped=sorted(skipped))
+
+if __name__ == '__main__':
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
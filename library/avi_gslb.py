@@ -35,9 +35,10 @@ options:
         description:
             - Default method for object update is HTTP PUT.
             - Setting to patch will override that behavior to use HTTP PATCH.
+            - Setting to auto sends a HTTP PATCH of only the fields that differ from the existing object.
         version_added: "2.5"
         default: put
-        choices: ["put", "patch"]
+        choices: ["put", "patch", "auto"]
         type: str
     avi_api_patch_op:
         description:
@@ -288,9 +289,11 @@ obj:
 from ansible.module_utils.basic import AnsibleModule
 try:
     from avi.sdk.utils.ansible_utils import avi_common_argument_spec
-    from avi.sdk.avi_api import ApiSession, AviCredentials
-    from avi.sdk.utils.ansible_utils import (
+    from avi.sdk.avi_api import AviCredentials
+    from ansible.module_utils.avi_ansible_utils import (
         avi_ansible_api, avi_common_argument_spec)
+    from ansible.module_utils.avi_session_cache import get_cached_session
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
@@ -377,7 +380,7 @@ def main():
         state=dict(default='present',
                    choices=['absent', 'present']),
         avi_api_update_method=dict(default='put',
-                                   choices=['put', 'patch']),
+                                   choices=['put', 'patch', 'auto']),
         avi_api_patch_op=dict(choices=['add', 'replace', 'delete']),
         patch_level=dict(type='str', default='/site/dns_vses',
                          choices=['/site/dns_vses', '/site']),
@@ -413,11 +416,7 @@ def main():
         # Create controller session
         api_creds = AviCredentials()
         api_creds.update_from_ansible_module(module)
-        api = ApiSession.get_session(
-            api_creds.controller, api_creds.username,
-            password=api_creds.password, timeout=api_creds.timeout,
-            tenant=api_creds.tenant, tenant_uuid=api_creds.tenant_uuid,
-            token=api_creds.token, port=api_creds.port)
+        api = get_cached_session(api_creds, socket_path=module._socket_path)
         # Get existing gslb objects
         rsp = api.get('gslb', api_version=api_creds.api_version)
         existing_gslb = rsp.json()
@@ -445,4 +444,7 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
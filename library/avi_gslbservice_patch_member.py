@@ -31,20 +31,23 @@ options:
     data:
         description:
             - HTTP body of GSLB Service Member in YAML or JSON format.
-        type: dict
-    params:
-        description:
-            - Query parameters passed to the HTTP API.
+            - A single group is given as C(group) and several groups as the list C(groups).
+            - All the groups of a GSLB Service are updated with one API call.
         type: dict
     name:
         description:
             - Name of the GSLB Service
-        required: true
+            - One of I(name) or I(services) is required.
         type: str
+    services:
+        description:
+            - List of GSLB Services to patch in one task. Each entry is a dict with keys C(name), C(data) and optionally
+              C(state) that have the same meaning as the options of this module.
+        type: list
     state:
         description:
             - The state that should be applied to the member. Member is
-            - identified using field member.ip.addr.
+            - identified using field member.fqdn if set else member.ip.addr.
         default: present
         choices: ["absent","present"]
         type: str
@@ -101,12 +104,41 @@ EXAMPLES = '''
         group:
           name: newfoo
           priority: 42
+  - name: Patch members of several groups of several GSLB Services
+    avi_gslbservice_patch_member:
+      controller: "{{ controller }}"
+      username: "{{ username }}"
+      password: "{{ password }}"
+      api_version: 17.2.1
+      services:
+        - name: gs-3
+          data:
+            groups:
+              - name: newfoo
+                members:
+                  - ip:
+                      addr: 10.30.10.66
+                      type: V4
+              - name: newbar
+                members:
+                  - ip:
+                      addr: 10.30.10.67
+                      type: V4
+        - name: gs-4
+          state: absent
+          data:
+            groups:
+              - name: newfoo
+                members:
+                  - ip:
+                      addr: 10.30.10.68
+                      type: V4
 '''
 
 
 RETURN = '''
 obj:
-    description: Avi REST resource
+    description: Avi REST resource. With I(services), list of the name, changed and obj of each GSLB Service.
     returned: success, changed
     type: dict
 '''
@@ -117,57 +149,86 @@ from ansible.module_utils.basic import AnsibleModule
 from copy import deepcopy
 
 try:
-    from avi.sdk.avi_api import ApiSession, AviCredentials
+    from avi.sdk.avi_api import AviCredentials
     from avi.sdk.utils.ansible_utils import (
         avi_obj_cmp, cleanup_absent_fields, avi_common_argument_spec,
         ansible_return, AviCheckModeResponse)
+    from ansible.module_utils.avi_object_cache import get_object_cache
+    from ansible.module_utils.avi_session_cache import get_cached_session
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
 
 
+def get_groups(data):
+    """
+    :return: list of the groups in data given as group and/or groups
+    """
+    groups = list(data.get('groups') or [])
+    if data.get('group'):
+        groups.append(data['group'])
+    return groups
+
+
+def index_members(members):
+    """
+    :return: dict of the members by their member_id
+    """
+    index = {}
+    for m in members:
+        index.setdefault(member_id(m), m)
+    return index
+
+
+def member_id(member):
+    """
+    Members are identified by fqdn if they have one, else by ip.addr.
+    """
+    if 'fqdn' in member:
+        return ('fqdn', member['fqdn'])
+    if 'ip' in member:
+        return ('ip', member['ip']['addr'])
+    return None
+
+
+def find_member(index, member):
+    return index.get(member_id(member))
+
+
 def delete_member(module, check_mode, api, tenant, tenant_uuid,
                   existing_obj, data, api_version):
-    members = data.get('group', {}).get('members', [])
-    patched_member_ids = set([m['ip']['addr'] for m in members if 'fqdn' not in m])
-    patched_member_fqdns = set([m['fqdn'] for m in members if 'fqdn' in m])
-
     changed = False
     rsp = None
-
-    if existing_obj and (patched_member_ids or patched_member_fqdns):
-        groups = [group for group in existing_obj.get('groups', [])
-                  if group['name'] == data['group']['name']]
-        if groups:
-            changed = any(
-                [(lambda g: g['ip']['addr'] in patched_member_ids)(m)
-                    for m in groups[0].get('members', []) if 'fqdn' not in m])
-            changed = changed or any(
-                [(lambda g: g['fqdn'] in patched_member_fqdns)(m)
-                    for m in groups[0].get('members', []) if 'fqdn' in m])
+    if not existing_obj:
+        return changed, rsp
+    req = deepcopy(existing_obj)
+    groups = dict((group['name'], group) for group in req.get('groups', []))
+    emptied = set()
+    for patch_group in get_groups(data):
+        group = groups.get(patch_group['name'])
+        members = patch_group.get('members', [])
+        if not group or not members:
+            continue
+        patched_member_ids = set(member_id(m) for m in members)
+        new_members = [m for m in group.get('members', [])
+                       if member_id(m) not in patched_member_ids]
+        if len(new_members) == len(group.get('members', [])):
+            continue
+        changed = True
+        group['members'] = new_members
+        if not new_members:
+            emptied.add(group['name'])
     if check_mode or not changed:
         return changed, rsp
-    # should not come here if not found
-    group = groups[0]
-    new_members = []
-    for m in group.get('members', []):
-        if 'fqdn' in m:
-            if m['fqdn'] not in patched_member_fqdns:
-                new_members.append(m)
-        elif 'ip' in m:
-            if m['ip']['addr'] not in patched_member_ids:
-                new_members.append(m)
-    group['members'] = new_members
-    if not group['members']:
-        # Delete this group from the existing objects if it is empty.
-        # Controller also does not allow empty group.
-        existing_obj['groups'] = [
-            grp for grp in existing_obj.get('groups', []) if
-            grp['name'] != data['group']['name']]
+    # Delete the groups left empty from the existing objects.
+    # Controller also does not allow empty group.
+    req['groups'] = [group for group in req.get('groups', [])
+                     if group['name'] not in emptied]
     # remove the members that are part of the list
     # update the object
     # added api version for AVI api call.
-    rsp = api.put('gslbservice/%s' % existing_obj['uuid'], data=existing_obj,
+    rsp = api.put('gslbservice/%s' % existing_obj['uuid'], data=req,
                   tenant=tenant, tenant_uuid=tenant_uuid, api_version=api_version)
     return changed, rsp
 
@@ -181,9 +242,9 @@ def add_member(module, check_mode, api, tenant, tenant_uuid,
         if check_mode:
             rsp = AviCheckModeResponse(obj=None)
         else:
-            # creates group with single member
+            # creates the groups with their members
             req = {'name': name,
-                   'groups': [data['group']]
+                   'groups': get_groups(data)
                    }
             # added api version for AVI api call.
             rsp = api.post('gslbservice', data=req, tenant=tenant,
@@ -193,35 +254,29 @@ def add_member(module, check_mode, api, tenant, tenant_uuid,
         req = deepcopy(existing_obj)
         if 'groups' not in req:
             req['groups'] = []
-        groups = [group for group in req['groups']
-                  if group['name'] == data['group']['name']]
-        if not groups:
-            # did not find the group
-            req['groups'].append(data['group'])
-        else:
+        groups = dict((group['name'], group) for group in req['groups'])
+        for patch_group in get_groups(data):
+            group = groups.get(patch_group['name'])
+            if not group:
+                # did not find the group
+                req['groups'].append(patch_group)
+                groups[patch_group['name']] = patch_group
+                continue
             # just update the existing group with members
-            group = groups[0]
-            group_info_wo_members = deepcopy(data['group'])
+            group_info_wo_members = deepcopy(patch_group)
             group_info_wo_members.pop('members', None)
             group.update(group_info_wo_members)
             if 'members' not in group:
                 group['members'] = []
-            new_members = []
-            for patch_member in data['group'].get('members', []):
-                found = False
-                for m in group['members']:
-                    if 'fqdn' in patch_member and m.get('fqdn', '') == patch_member['fqdn']:
-                        found = True
-                        break
-                    elif m['ip']['addr'] == patch_member['ip']['addr']:
-                        found = True
-                        break
-                if not found:
-                    new_members.append(patch_member)
+            index = index_members(group['members'])
+            for patch_member in patch_group.get('members', []):
+                m = find_member(index, patch_member)
+                if m is None:
+                    # add the new member
+                    group['members'].append(patch_member)
+                    index.update(index_members([patch_member]))
                 else:
                     m.update(patch_member)
-            # add any new members
-            group['members'].extend(new_members)
         cleanup_absent_fields(req)
         changed = not avi_obj_cmp(req, existing_obj)
         if changed and not check_mode:
@@ -232,34 +287,55 @@ def add_member(module, check_mode, api, tenant, tenant_uuid,
     return changed, rsp
 
 
+def patch_service(module, api, object_cache, tenant, tenant_uuid, name,
+                  data, state, api_version):
+    """
+    Applies all the patched groups of a GSLB service with a single PUT.
+    :return: tuple of (changed, rsp, existing_obj)
+    """
+    obj_type = 'gslbservice'
+    # Added api version to call
+    existing_obj = object_cache.get_object_by_name(
+        api, obj_type, name, tenant=tenant, tenant_uuid=tenant_uuid,
+        params={'include_refs': '', 'include_name': ''}, api_version=api_version)
+    check_mode = module.check_mode
+    if state == 'absent':
+        # Added api version to call
+        changed, rsp = delete_member(module, check_mode, api, tenant,
+                                     tenant_uuid, existing_obj, data, api_version)
+    else:
+        # Added api version to call
+        changed, rsp = add_member(module, check_mode, api, tenant, tenant_uuid,
+                                  existing_obj, data, name, api_version)
+    if changed and not check_mode:
+        object_cache.invalidate(obj_type, name=name)
+    return changed, rsp, existing_obj
+
+
 def main():
     argument_specs = dict(
-        params=dict(type='dict'),
         data=dict(type='dict'),
-        name=dict(type='str', required=True),
+        name=dict(type='str'),
+        services=dict(type='list'),
         state=dict(default='present',
                    choices=['absent', 'present'])
     )
     argument_specs.update(avi_common_argument_spec())
-    module = AnsibleModule(argument_spec=argument_specs)
+    module = AnsibleModule(argument_spec=argument_specs,
+                           supports_check_mode=True,
+                           required_one_of=[['name', 'services']],
+                           mutually_exclusive=[['name', 'services']])
     if not HAS_AVI:
         return module.fail_json(msg=(
             'Avi python API SDK (avisdk>=17.1) or ansible>=2.8 is not installed. '
             'For more details visit https://github.com/avinetworks/sdk.'))
     api_creds = AviCredentials()
     api_creds.update_from_ansible_module(module)
-    api = ApiSession.get_session(
-        api_creds.controller, api_creds.username, password=api_creds.password,
-        timeout=api_creds.timeout, tenant=api_creds.tenant,
-        tenant_uuid=api_creds.tenant_uuid, token=api_creds.token,
-        port=api_creds.port)
+    api = get_cached_session(api_creds, socket_path=module._socket_path)
 
     tenant = api_creds.tenant
     tenant_uuid = api_creds.tenant_uuid
-    params = module.params.get('params', None)
-    data = module.params.get('data', None)
-    gparams = deepcopy(params) if params else {}
-    gparams.update({'include_refs': '', 'include_name': ''})
+    data = module.params.get('data', None) or {}
     name = module.params.get('name', '')
     state = module.params['state']
     # Get the api version from module.
@@ -267,34 +343,50 @@ def main():
     """
     state: present
     1. Check if the GSLB service is present
-    2.    If not then create the GSLB service with the member
-    3. Check if the group exists
-    4.    if not then create the group with the member
-    5. Check if the member is present
+    2.    If not then create the GSLB service with the groups
+    3. Check if each group exists
+    4.    if not then create the group with the members
+    5. Check if each member is present
           if not then add the member
+    6. Update the GSLB service with one PUT
     state: absent
     1. check if GSLB service is present if not then exit
-    2. check if group is present. if not then exit
+    2. check if each group is present. if not then skip it
     3. check if member is present. if present then remove it.
+    4. Update the GSLB service with one PUT
     """
-    obj_type = 'gslbservice'
-    # Added api version to call
-    existing_obj = api.get_object_by_name(
-        obj_type, name, tenant=tenant, tenant_uuid=tenant_uuid,
-        params={'include_refs': '', 'include_name': ''}, api_version=api_version)
-    check_mode = module.check_mode
-    if state == 'absent':
-        # Added api version to call
-        changed, rsp = delete_member(module, check_mode, api, tenant,
-                                     tenant_uuid, existing_obj, data, api_version)
-    else:
-        # Added api version to call
-        changed, rsp = add_member(module, check_mode, api, tenant, tenant_uuid,
-                                  existing_obj, data, name, api_version)
-    if check_mode or not changed:
-        return module.exit_json(changed=changed, obj=existing_obj)
-    return ansible_return(module, rsp, changed, req=data)
+    object_cache = get_object_cache(api_creds)
+    if name:
+        changed, rsp, existing_obj = patch_service(
+            module, api, object_cache, tenant, tenant_uuid, name, data, state,
+            api_version)
+        if module.check_mode or not changed:
+            return module.exit_json(changed=changed, obj=existing_obj)
+        return ansible_return(module, rsp, changed, req=data)
 
+    results = []
+    for service in module.params['services']:
+        if not isinstance(service, dict) or not service.get('name'):
+            return module.fail_json(
+                msg='Every entry in services requires name: %s' % service)
+        changed, rsp, existing_obj = patch_service(
+            module, api, object_cache, tenant, tenant_uuid, service['name'],
+            service.get('data') or {}, service.get('state', state),
+            api_version)
+        if rsp is not None and rsp.status_code > 299:
+            return module.fail_json(
+                msg='Error %d Msg %s for GSLB service %s' % (
+                    rsp.status_code, rsp.text, service['name']),
+                obj=results)
+        obj = existing_obj
+        if rsp is not None and not module.check_mode:
+            obj = rsp.json()
+        results.append(dict(name=service['name'], changed=changed, obj=obj))
+    return module.exit_json(changed=any(r['changed'] for r in results),
+                            obj=results)
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
@@ -35,9 +35,10 @@ options:
         description:
             - Default method for object update is HTTP PUT.
             - Setting to patch will override that behavior to use HTTP PATCH.
+            - Setting to auto sends a HTTP PATCH of only the fields that differ from the existing object.
         version_added: "2.5"
         default: put
-        choices: ["put", "patch"]
+        choices: ["put", "patch", "auto"]
         type: str
     avi_api_patch_op:
         description:
@@ -49,6 +50,12 @@ options:
         description:
             - Configure ip address(es).
         type: list
+    addrs_file:
+        description:
+            - Local file with the ip addresses of addrs, one per line.
+            - Only the addresses that are missing or no longer in the file are added or deleted with HTTP PATCH.
+            - Empty lines and lines starting with # are skipped.
+        type: path
     apic_epg_name:
         description:
             - Populate ip addresses from members of this cisco apic epg.
@@ -61,6 +68,11 @@ options:
         description:
             - User defined description for the object.
         type: str
+    file_chunk_size:
+        description:
+            - Maximum number of members of a list loaded from a file that are added or deleted in one HTTP PATCH.
+            - Default value when not specified is 5000.
+        type: int
     ip_ports:
         description:
             - Configure (ip address, port) tuple(s).
@@ -84,10 +96,20 @@ options:
         description:
             - Configure ip address prefix(es).
         type: list
+    prefixes_file:
+        description:
+            - Local file with the prefixes of prefixes, one per line like 10.0.0.0/8.
+            - Only the prefixes that are missing or no longer in the file are added or deleted with HTTP PATCH.
+        type: path
     ranges:
         description:
             - Configure ip address range(s).
         type: list
+    ranges_file:
+        description:
+            - Local file with the ranges of ranges, one per line like 10.0.0.1-10.0.0.100.
+            - Only the ranges that are missing or no longer in the file are added or deleted with HTTP PATCH.
+        type: path
     tenant_ref:
         description:
             - It is a reference to an object of type tenant.
@@ -126,6 +148,15 @@ EXAMPLES = """
           addr: 192.168.0.0
           type: V4
         mask: 16
+
+  - name: Apply a blocklist of addresses and prefixes from files
+    avi_ipaddrgroup:
+      controller: '{{ controller }}'
+      username: '{{ username }}'
+      password: '{{ password }}'
+      name: Client-Source-Blocklist
+      addrs_file: files/blocklist_addrs.txt
+      prefixes_file: files/blocklist_prefixes.txt
 """
 
 RETURN = '''
@@ -133,49 +164,71 @@ obj:
     description: IpAddrGroup (api/ipaddrgroup) object
     returned: success, changed
     type: dict
+members:
+    description: Number of members added and deleted per list loaded from a file.
+    returned: when a list is loaded from a file
+    type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 try:
     from avi.sdk.utils.ansible_utils import avi_common_argument_spec
-    from avi.sdk.utils.ansible_utils import (
+    from ansible.module_utils.avi_ansible_utils import (
         avi_ansible_api, avi_common_argument_spec)
+    from ansible.module_utils.avi_file_set import avi_file_set_api
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
 
+# module options of the lists that can be loaded from a file
+FILE_FIELDS = {'addrs_file': 'addrs', 'prefixes_file': 'prefixes',
+               'ranges_file': 'ranges'}
+
 
 def main():
     argument_specs = dict(
         state=dict(default='present',
                    choices=['absent', 'present']),
         avi_api_update_method=dict(default='put',
-                                   choices=['put', 'patch']),
+                                   choices=['put', 'patch', 'auto']),
         avi_api_patch_op=dict(choices=['add', 'replace', 'delete']),
         addrs=dict(type='list',),
+        addrs_file=dict(type='path',),
         apic_epg_name=dict(type='str',),
         country_codes=dict(type='list',),
         description=dict(type='str',),
+        file_chunk_size=dict(type='int',),
         ip_ports=dict(type='list',),
         marathon_app_name=dict(type='str',),
         marathon_service_port=dict(type='int',),
         name=dict(type='str', required=True),
         prefixes=dict(type='list',),
+        prefixes_file=dict(type='path',),
         ranges=dict(type='list',),
+        ranges_file=dict(type='path',),
         tenant_ref=dict(type='str',),
         url=dict(type='str',),
         uuid=dict(type='str',),
     )
     argument_specs.update(avi_common_argument_spec())
     module = AnsibleModule(
-        argument_spec=argument_specs, supports_check_mode=True)
+        argument_spec=argument_specs, supports_check_mode=True,
+        mutually_exclusive=[[field, option]
+                            for option, field in FILE_FIELDS.items()])
     if not HAS_AVI:
         return module.fail_json(msg=(
             'Avi python API SDK (avisdk>=17.1) or requests is not installed. '
             'For more details visit https://github.com/avinetworks/sdk.'))
+    if (module.params['state'] == 'present' and
+            any(module.params.get(option) for option in FILE_FIELDS)):
+        return avi_file_set_api(module, 'ipaddrgroup', FILE_FIELDS)
     return avi_ansible_api(module, 'ipaddrgroup',
                            set([]))
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
@@ -35,9 +35,10 @@ options:
         description:
             - Default method for object update is HTTP PUT.
             - Setting to patch will override that behavior to use HTTP PATCH.
+            - Setting to auto sends a HTTP PATCH of only the fields that differ from the existing object.
         version_added: "2.5"
         default: put
-        choices: ["put", "patch"]
+        choices: ["put", "patch", "auto"]
         type: str
     avi_api_patch_op:
         description:
@@ -125,6 +126,11 @@ options:
             - Field introduced in 18.2.1.
         version_added: "2.9"
         type: dict
+    concurrency:
+        description:
+            - Maximum number of the pools of I(pools) that are applied at the same time.
+            - Default value when not specified is 4.
+        type: int
     connection_ramp_duration:
         description:
             - Duration for which new connections will be gradually ramped up to a server recently brought online.
@@ -290,7 +296,7 @@ options:
     name:
         description:
             - The name of the pool.
-        required: true
+            - One of I(name) or I(pools) is required.
         type: str
     networks:
         description:
@@ -303,6 +309,12 @@ options:
             - A list of nsx service groups where the servers for the pool are created.
             - Field introduced in 17.1.1.
         type: list
+    pools:
+        description:
+            - Batch of pools whose servers are applied with I(servers_state) in one task.
+            - Every entry has the I(name) and I(servers) of a pool, optionally its own I(servers_state) and other fields of the pool.
+            - Missing pools are created.
+        type: list
     pki_profile_ref:
         description:
             - Avi will validate the ssl certificate present by a server against the selected pki profile.
@@ -374,6 +386,15 @@ options:
             - The pool directs load balanced traffic to this list of destination servers.
             - The servers can be configured by ip address, name, network or via ip address group.
         type: list
+    servers_state:
+        description:
+            - Applies I(servers) to the servers of the pool instead of replacing them.
+            - Servers are matched by their ip.addr and port and only the servers that differ are added or deleted with HTTP PATCH.
+            - C(present) adds and updates the servers, C(absent) deletes them and C(reconcile) also deletes the servers that are not in I(servers).
+            - Updating a server of the pool replaces the whole server list with HTTP PATCH.
+            - Default value with I(pools) is C(reconcile).
+        choices: ["present", "absent", "reconcile"]
+        type: str
     service_metadata:
         description:
             - Metadata pertaining to the service provided by this pool.
@@ -462,20 +483,47 @@ EXAMPLES = """
   register: pool
   when:
     - state | default("present") == "present"
+
+- name: Reconcile the servers of a batch of pools
+  avi_pool:
+    avi_credentials: "{{avi_credentials}}"
+    servers_state: reconcile
+    pools:
+      - name: web-pool
+        servers:
+          - ip:
+              addr: 10.90.64.13
+              type: V4
+          - ip:
+              addr: 10.90.64.14
+              type: V4
+      - name: api-pool
+        servers_state: present
+        servers:
+          - ip:
+              addr: 10.90.65.20
+              type: V4
+            port: 8443
 """
 
 RETURN = '''
 obj:
-    description: Pool (api/pool) object
+    description: Pool (api/pool) object, or with I(pools) the name, uuid, changed and servers of every pool
     returned: success, changed
     type: dict
+servers:
+    description: Number of servers added, deleted and updated by I(servers_state)
+    returned: with servers_state
+    type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 try:
     from avi.sdk.utils.ansible_utils import avi_common_argument_spec
-    from avi.sdk.utils.ansible_utils import (
+    from ansible.module_utils.avi_ansible_utils import (
         avi_ansible_api, avi_common_argument_spec)
+    from ansible.module_utils.avi_pool_servers import avi_pool_servers_api
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
@@ -486,7 +534,7 @@ def main():
         state=dict(default='present',
                    choices=['absent', 'present']),
         avi_api_update_method=dict(default='put',
-                                   choices=['put', 'patch']),
+                                   choices=['put', 'patch', 'auto']),
         avi_api_patch_op=dict(choices=['add', 'replace', 'delete']),
         a_pool=dict(type='str',),
         ab_pool=dict(type='dict',),
@@ -503,6 +551,7 @@ def main():
         cloud_config_cksum=dict(type='str',),
         cloud_ref=dict(type='str',),
         conn_pool_properties=dict(type='dict',),
+        concurrency=dict(type='int',),
         connection_ramp_duration=dict(type='int',),
         created_by=dict(type='str',),
         default_server_port=dict(type='int',),
@@ -529,9 +578,10 @@ def main():
         max_conn_rate_per_server=dict(type='dict',),
         min_health_monitors_up=dict(type='int',),
         min_servers_up=dict(type='int',),
-        name=dict(type='str', required=True),
+        name=dict(type='str',),
         networks=dict(type='list',),
         nsx_securitygroup=dict(type='list',),
+        pools=dict(type='list',),
         pki_profile_ref=dict(type='str',),
         placement_networks=dict(type='list',),
         prst_hdr_name=dict(type='str',),
@@ -545,6 +595,7 @@ def main():
         server_reselect=dict(type='dict',),
         server_timeout=dict(type='int',),
         servers=dict(type='list',),
+        servers_state=dict(choices=['present', 'absent', 'reconcile']),
         service_metadata=dict(type='str',),
         sni_enabled=dict(type='bool',),
         ssl_key_and_certificate_ref=dict(type='str',),
@@ -557,14 +608,24 @@ def main():
     )
     argument_specs.update(avi_common_argument_spec())
     module = AnsibleModule(
-        argument_spec=argument_specs, supports_check_mode=True)
+        argument_spec=argument_specs, supports_check_mode=True,
+        required_one_of=[['name', 'pools']],
+        mutually_exclusive=[['name', 'pools']])
     if not HAS_AVI:
         return module.fail_json(msg=(
             'Avi python API SDK (avisdk>=17.1) or requests is not installed. '
             'For more details visit https://github.com/avinetworks/sdk.'))
+    if module.params.get('pools') and module.params['state'] != 'present':
+        return module.fail_json(msg='pools can only be applied with state present')
+    if module.params['state'] == 'present' and (
+            module.params.get('servers_state') or module.params.get('pools')):
+        return avi_pool_servers_api(module)
     return avi_ansible_api(module, 'pool',
                            set([]))
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
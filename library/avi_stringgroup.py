@@ -35,9 +35,10 @@ options:
         description:
             - Default method for object update is HTTP PUT.
             - Setting to patch will override that behavior to use HTTP PATCH.
+            - Setting to auto sends a HTTP PATCH of only the fields that differ from the existing object.
         version_added: "2.5"
         default: put
-        choices: ["put", "patch"]
+        choices: ["put", "patch", "auto"]
         type: str
     avi_api_patch_op:
         description:
@@ -49,10 +50,21 @@ options:
         description:
             - User defined description for the object.
         type: str
+    file_chunk_size:
+        description:
+            - Maximum number of members of a list loaded from a file that are added or deleted in one HTTP PATCH.
+            - Default value when not specified is 5000.
+        type: int
     kv:
         description:
             - Configure key value in the string group.
         type: list
+    kv_file:
+        description:
+            - Local file with the keys of kv, one per line. A value follows its key after a tab.
+            - Only the keys that are missing or no longer in the file are added or deleted with HTTP PATCH.
+            - Empty lines and lines starting with # are skipped.
+        type: path
     longest_match:
         description:
             - Enable the longest match, default is the shortest match.
@@ -108,6 +120,15 @@ EXAMPLES = """
       name: System-Compressible-Content-Types
       tenant_ref: /api/tenant?name=admin
       type: SG_TYPE_STRING
+
+  - name: Apply a string group with the keys of a file
+    avi_stringgroup:
+      controller: '{{ controller }}'
+      password: '{{ password }}'
+      username: '{{ username }}'
+      name: Geo-Blocked-Hosts
+      kv_file: files/geo_blocked_hosts.txt
+      type: SG_TYPE_STRING
 """
 
 RETURN = '''
@@ -115,27 +136,38 @@ obj:
     description: StringGroup (api/stringgroup) object
     returned: success, changed
     type: dict
+members:
+    description: Number of members added and deleted per list loaded from a file.
+    returned: when a list is loaded from a file
+    type: dict
 '''
 
 from ansible.module_utils.basic import AnsibleModule
 try:
     from avi.sdk.utils.ansible_utils import avi_common_argument_spec
-    from avi.sdk.utils.ansible_utils import (
+    from ansible.module_utils.avi_ansible_utils import (
         avi_ansible_api, avi_common_argument_spec)
+    from ansible.module_utils.avi_file_set import avi_file_set_api
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
 
+# module options of the lists that can be loaded from a file
+FILE_FIELDS = {'kv_file': 'kv'}
+
 
 def main():
     argument_specs = dict(
         state=dict(default='present',
                    choices=['absent', 'present']),
         avi_api_update_method=dict(default='put',
-                                   choices=['put', 'patch']),
+                                   choices=['put', 'patch', 'auto']),
         avi_api_patch_op=dict(choices=['add', 'replace', 'delete']),
         description=dict(type='str',),
+        file_chunk_size=dict(type='int',),
         kv=dict(type='list',),
+        kv_file=dict(type='path',),
         longest_match=dict(type='bool',),
         name=dict(type='str', required=True),
         tenant_ref=dict(type='str',),
@@ -145,14 +177,20 @@ def main():
     )
     argument_specs.update(avi_common_argument_spec())
     module = AnsibleModule(
-        argument_spec=argument_specs, supports_check_mode=True)
+        argument_spec=argument_specs, supports_check_mode=True,
+        mutually_exclusive=[['kv', 'kv_file']])
     if not HAS_AVI:
         return module.fail_json(msg=(
             'Avi python API SDK (avisdk>=17.1) or requests is not installed. '
             'For more details visit https://github.com/avinetworks/sdk.'))
+    if module.params['state'] == 'present' and module.params.get('kv_file'):
+        return avi_file_set_api(module, 'stringgroup', FILE_FIELDS)
     return avi_ansible_api(module, 'stringgroup',
                            set([]))
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
@@ -103,10 +103,12 @@ obj:
 from ansible.module_utils.basic import AnsibleModule
 
 try:
-    from avi.sdk.avi_api import ApiSession, AviCredentials
-    from avi.sdk.utils.ansible_utils import (
-        avi_common_argument_spec, avi_ansible_api,
-        ansible_return)
+    from avi.sdk.avi_api import AviCredentials
+    from ansible.module_utils.avi_ansible_utils import (
+        avi_common_argument_spec, avi_ansible_api)
+    from ansible.module_utils.avi_object_cache import get_object_cache
+    from ansible.module_utils.avi_session_cache import get_cached_session
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
@@ -127,15 +129,11 @@ def main():
     # Create controller session
     api_creds = AviCredentials()
     api_creds.update_from_ansible_module(module)
-    api = ApiSession.get_session(
-        api_creds.controller, api_creds.username, password=api_creds.password,
-        timeout=api_creds.timeout, tenant=api_creds.tenant,
-        tenant_uuid=api_creds.tenant_uuid, token=api_creds.token,
-        port=api_creds.port)
+    api = get_cached_session(api_creds, socket_path=module._socket_path)
     path = 'serviceengine'
     # Get existing SE object
-    se_obj = api.get_object_by_name(
-        path, module.params['se_name'], api_version=api_creds.api_version)
+    se_obj = get_object_cache(api_creds).get_object_by_name(
+        api, path, module.params['se_name'], api_version=api_creds.api_version)
     data_vnics_config = module.params['data_vnics_config']
     for d_vnic in se_obj['data_vnics']:
         for obj in data_vnics_config:
@@ -163,4 +161,7 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
@@ -89,10 +89,13 @@ from ansible.module_utils.basic import AnsibleModule
 
 
 try:
-    from avi.sdk.avi_api import ApiSession, AviCredentials
+    from avi.sdk.avi_api import AviCredentials
     from avi.sdk.utils.ansible_utils import (
         avi_obj_cmp, cleanup_absent_fields, avi_common_argument_spec,
         ansible_return)
+    from ansible.module_utils.avi_object_cache import get_object_cache
+    from ansible.module_utils.avi_session_cache import get_cached_session
+    from ansible.module_utils.avi_profile import profile_main
     HAS_AVI = True
 except ImportError:
     HAS_AVI = False
@@ -182,15 +185,13 @@ def main():
             'For more details visit https://github.com/avinetworks/sdk.'))
     api_creds = AviCredentials()
     api_creds.update_from_ansible_module(module)
-    api = ApiSession.get_session(
-        api_creds.controller, api_creds.username, password=api_creds.password,
-        timeout=api_creds.timeout, tenant=api_creds.tenant,
-        tenant_uuid=api_creds.tenant_uuid, token=api_creds.token,
-        port=api_creds.port, api_version=api_creds.api_version)
+    api = get_cached_session(api_creds, socket_path=module._socket_path,
+                             api_version=api_creds.api_version)
 
+    object_cache = get_object_cache(api_creds)
     obj_uuid = None
-    existing_obj = api.get_object_by_name(
-        'wafpolicy', module.params.get('name'),
+    existing_obj = object_cache.get_object_by_name(
+        api, 'wafpolicy', module.params.get('name'),
         params={"include_name": True})
     if existing_obj:
         obj_uuid = existing_obj.pop('uuid', None)
@@ -203,13 +204,14 @@ def main():
             changed = True
         if changed and not module.check_mode:
             api.delete_by_name('wafpolicy', module.params.get('name'))
+            object_cache.invalidate('wafpolicy', name=module.params.get('name'))
         ansible_return(
             module, None, changed, existing_obj=existing_obj,
             api_context=api.get_context())
 
     if not existing_obj:
-        existing_obj = api.get_object_by_name(
-            'wafpolicy', module.params.get('base_waf_policy'),
+        existing_obj = object_cache.get_object_by_name(
+            api, 'wafpolicy', module.params.get('base_waf_policy'),
             params={"include_name": True})
 
     with open(module.params.get('patch_file'), "r+") as f:
@@ -230,9 +232,13 @@ def main():
                 rsp = api.put('wafpolicy/%s' % obj_uuid, data=new_obj)
             else:
                 rsp = api.post('wafpolicy', data=new_obj)
+            object_cache.invalidate('wafpolicy', name=module.params.get('name'))
 
         ansible_return(module, rsp, changed, req=new_obj)
 
 
 if __name__ == '__main__':
-    main()
+    if HAS_AVI:
+        profile_main(main)()
+    else:
+        main()
@@ -0,0 +1,443 @@
+"""
+# Created on Oct 18, 2026
+#
+# Role level wrappers over avi.sdk.utils.ansible_utils. Modules in library/
+# import avi_ansible_api and avi_common_argument_spec from here so that
+# features of this role apply to every module without changes to the SDK.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+import re
+import time
+from multiprocessing.pool import ThreadPool
+
+from copy import deepcopy
+
+from avi.sdk.avi_api import APIError, ApiSession, AviCredentials, ObjectNotFound
+from avi.sdk.utils import ansible_utils as sdk_ansible_utils
+from avi.sdk.utils.ansible_utils import (
+    NO_UUID_OBJ, POP_FIELDS, AviCheckModeResponse, ansible_return,
+    avi_common_argument_spec, get_api_context, purge_optional_fields,
+    avi_ansible_api as sdk_avi_ansible_api)
+from ansible.module_utils.avi_api_stats import track_api_stats
+from ansible.module_utils.avi_apply_state import (
+    AviApplyState, NO_FAST_PATH_OBJ, get_existing_obj, get_last_modified,
+    spec_hash)
+from ansible.module_utils.avi_diff import avi_obj_diff, avi_obj_patch
+from ansible.module_utils.avi_object_cache import get_object_cache
+from ansible.module_utils.avi_session_cache import get_cached_session
+from ansible.module_utils.six import string_types
+
+# first and longest wait between the reads of avi_readback in seconds
+READBACK_DELAY = 0.05
+READBACK_MAX_DELAY = 1.0
+
+# URL of a reference with the host and the #name of the object
+HTTP_REF = re.compile(r'^https?://[^/]+(/api/[^#]*)(#.*)?$')
+
+
+def use_apply_state(module, obj_type):
+    """
+    The fast path only applies to objects that are compared as a whole by
+    name.
+    """
+    params = module.params
+    return (params.get('state', 'present') == 'present' and
+            params.get('name') and not params.get('uuid') and
+            params.get('avi_api_update_method', 'put') in ('put', 'auto') and
+            obj_type not in NO_FAST_PATH_OBJ)
+
+
+def record_apply_state(module, apply_state, key, digest, lookup):
+    """
+    Hooks exit_json of the module to record the _last_modified of the object
+    returned by the SDK once it is applied.
+    :param lookup: callable returning the object fields with _last_modified.
+        avi_obj_cmp drops _last_modified from the existing object so it has
+        to be fetched again when the object did not change.
+    """
+    exit_json = module.exit_json
+
+    def exit_and_record(**kwargs):
+        obj = kwargs.get('obj')
+        if not isinstance(obj, dict):
+            obj = None
+        elif '_last_modified' not in obj and not kwargs.get('changed'):
+            obj = lookup()
+        apply_state.set(key, digest, obj.get('_last_modified') if obj else None)
+        return exit_json(**kwargs)
+    module.exit_json = exit_and_record
+
+
+def module_obj(module, obj_type):
+    """
+    :return: the object of the module parameters as avi_ansible_api of the
+        SDK sends it
+    """
+    obj = deepcopy(module.params)
+    for k in POP_FIELDS:
+        obj.pop(k, None)
+    purge_optional_fields(obj, module)
+    # fields named like the options of the modules
+    for field in ('username', 'password', 'state'):
+        if 'obj_%s' % field in obj:
+            obj[field] = obj.pop('obj_%s' % field)
+    if 'full_name' not in obj and 'name' in obj and obj_type == 'user':
+        obj['full_name'] = obj['name']
+        obj['name'] = obj['username']
+    return obj
+
+
+def find_existing_obj(module, api, obj_type, obj, api_creds):
+    """
+    Looks up the object of the module as avi_ansible_api of the SDK does.
+    The object is looked up by the name of obj, so a user is looked up by
+    its username and not by its full name.
+    :return: tuple of the existing object, or None if there is none, and the
+        path to update it at
+    """
+    tenant = api_creds.tenant
+    tenant_uuid = api_creds.tenant_uuid
+    api_version = api_creds.api_version
+    name = obj.get('name')
+    uuid = module.params.get('uuid')
+    path = '%s/' % obj_type
+    if uuid and obj_type not in NO_UUID_OBJ:
+        path = '%s/%s' % (obj_type, uuid)
+    elif name:
+        existing_obj = get_existing_obj(
+            api, obj_type, name, tenant=tenant, tenant_uuid=tenant_uuid,
+            api_version=api_version, cloud_ref=obj.get('cloud_ref'))
+        if (existing_obj and 'tenant_ref' in obj and
+                'tenant_ref' in existing_obj and
+                existing_obj['tenant_ref'].split('#')[-1] !=
+                obj['tenant_ref'].split('name=')[-1]):
+            # found in the admin tenant instead of the tenant of the object
+            existing_obj = None
+        if existing_obj and obj_type not in NO_UUID_OBJ:
+            path = '%s/%s' % (obj_type, existing_obj['uuid'])
+        return existing_obj, path
+    try:
+        rsp = api.get(path, tenant=tenant, tenant_uuid=tenant_uuid,
+                      params={'include_refs': '', 'include_name': ''},
+                      api_version=api_version)
+    except ObjectNotFound:
+        return None, path
+    return (rsp.json() if rsp.status_code < 300 else None), path
+
+
+def api_context_session(module, api_creds):
+    """
+    :return: ApiSession of the api_context of the module, created as
+        avi_ansible_api of the SDK does, or None if the module has no
+        context for the credentials
+    """
+    api_context = get_api_context(module, api_creds)
+    if not api_context:
+        return None
+    return ApiSession.get_session(
+        api_creds.controller, api_creds.username,
+        password=api_creds.password, timeout=api_creds.timeout,
+        tenant=api_creds.tenant, tenant_uuid=api_creds.tenant_uuid,
+        token=api_context['csrftoken'], port=api_creds.port,
+        session_id=api_context['session_id'],
+        csrftoken=api_context['csrftoken'],
+        verify=getattr(api_creds, 'verify', False), avi_credentials=api_creds)
+
+
+def avi_api_patch(module, api, api_creds, existing_obj, path, patch):
+    """
+    Updates the existing object with one PATCH with all the operations of
+    patch, as avi_ansible_api of the SDK updates it with a PUT.
+    :param existing_obj: object from the controller
+    :param path: path of the object
+    :param patch: patch data of avi_obj_patch
+    :return: result of ansible_return
+    """
+    if not patch:
+        return ansible_return(module, None, False, existing_obj=existing_obj,
+                              api_context=api.get_context())
+    if module.check_mode:
+        rsp = AviCheckModeResponse(obj=existing_obj)
+    else:
+        rsp = api.patch(path, data=patch, tenant=api_creds.tenant,
+                        tenant_uuid=api_creds.tenant_uuid,
+                        api_version=api_creds.api_version)
+    return ansible_return(module, rsp, True, patch,
+                          existing_obj=existing_obj,
+                          api_context=api.get_context())
+
+
+def avi_api_create(module, api, api_creds, obj_type, obj):
+    """
+    Creates the object that was not found by find_existing_obj, as
+    avi_ansible_api of the SDK creates it, without looking it up again.
+    :return: result of ansible_return
+    """
+    if module.check_mode:
+        rsp = AviCheckModeResponse(obj=None)
+    else:
+        rsp = api.post(obj_type, data=obj, tenant=api_creds.tenant,
+                       tenant_uuid=api_creds.tenant_uuid,
+                       api_version=api_creds.api_version)
+    return ansible_return(module, rsp, True, obj,
+                          api_context=api.get_context())
+
+
+def sdk_api_with_diff(module, obj_type, sensitive_fields, api=None):
+    """
+    Runs the avi_ansible_api of the SDK with avi_obj_cmp replaced by the
+    structural diff of avi_diff. With --diff the paths found by the last
+    compare of the object are returned in diff of the module result.
+    With avi_api_update_method auto an existing object is compared as for a
+    PUT but only the fields that differ are sent with avi_api_patch, and a
+    missing object is created with avi_api_create. The SDK then only
+    deletes objects.
+    :param api: ApiSession of the module, None when the session comes from
+        api_context
+    """
+    changed_paths = []
+
+    def obj_cmp(x, y, sensitive_fields=None):
+        changed_paths[:] = avi_obj_diff(x, y, sensitive_fields)
+        return not changed_paths
+    exit_json = module.exit_json
+
+    def exit_with_diff(**kwargs):
+        if module._diff and kwargs.get('changed') and changed_paths:
+            kwargs['diff'] = dict(
+                changed_paths=list(changed_paths),
+                prepared='\n'.join('changed: %s' % path
+                                    for path in changed_paths))
+        return exit_json(**kwargs)
+    module.exit_json = exit_with_diff
+    try:
+        if (module.params.get('avi_api_update_method') == 'auto' and
+                module.params.get('state') == 'present'):
+            api_creds = AviCredentials()
+            api_creds.update_from_ansible_module(module)
+            if api is None:
+                api = api_context_session(module, api_creds) or \
+                    get_cached_session(
+                        api_creds, socket_path=module._socket_path,
+                        verify=getattr(api_creds, 'verify', False))
+            obj = module_obj(module, obj_type)
+            existing_obj, path = find_existing_obj(module, api, obj_type, obj,
+                                                   api_creds)
+            if existing_obj:
+                changed_paths[:], patch = avi_obj_patch(
+                    obj, deepcopy(existing_obj), sensitive_fields)
+                return avi_api_patch(module, api, api_creds, existing_obj,
+                                     path, patch)
+            return avi_api_create(module, api, api_creds, obj_type, obj)
+        sdk_obj_cmp = sdk_ansible_utils.avi_obj_cmp
+        sdk_ansible_utils.avi_obj_cmp = obj_cmp
+        try:
+            return sdk_avi_ansible_api(module, obj_type, sensitive_fields)
+        finally:
+            sdk_ansible_utils.avi_obj_cmp = sdk_obj_cmp
+    finally:
+        module.exit_json = exit_json
+
+
+def avi_ansible_api(module, obj_type, sensitive_fields):
+    """
+    Same as avi.sdk.utils.ansible_utils.avi_ansible_api. The controller
+    session is created through the session cache first so that the SDK picks
+    up the cached login instead of authenticating again, and the object is
+    dropped from the object cache. Tasks on the avi connection send their
+    API calls over the connection.
+    When AVI_APPLY_STATE_DIR is set and neither the spec nor the
+    _last_modified of the object changed since the last run the module
+    returns the name, uuid, url and _last_modified of the object without
+    fetching, comparing or updating it.
+    The object is compared with the structural diff of avi_diff instead of
+    avi_obj_cmp of the SDK.
+    :param module: Ansible module
+    :param obj_type: string representing Avi object type
+    :param sensitive_fields: sensitive fields to be excluded for comparison
+        purposes.
+    """
+    track_api_stats(module)
+    api_creds = AviCredentials()
+    api_creds.update_from_ansible_module(module)
+    api = None
+    if not module.params.get('api_context'):
+        try:
+            api = get_cached_session(
+                api_creds, socket_path=module._socket_path,
+                verify=getattr(api_creds, 'verify', False))
+        except APIError as e:
+            return module.fail_json(msg=str(e))
+        # the SDK takes the login from the params, on the avi connection the
+        # task may leave it to the connection.
+        for field in ('controller', 'port', 'username'):
+            if not module.params.get(field):
+                module.params[field] = getattr(api_creds, field)
+    apply_state = AviApplyState.from_env(api_creds)
+    if apply_state and api and use_apply_state(module, obj_type):
+        name = module.params['name']
+        key = apply_state.make_key(obj_type, name, api_creds.tenant)
+        digest = spec_hash(module.params)
+        entry = apply_state.get(key)
+
+        def lookup():
+            return get_last_modified(
+                api, obj_type, name, tenant=api_creds.tenant,
+                tenant_uuid=api_creds.tenant_uuid,
+                api_version=api_creds.api_version,
+                cloud_ref=module.params.get('cloud_ref'))
+        if entry and entry.get('spec_hash') == digest:
+            # only _last_modified is fetched, the object is not compared
+            current = lookup()
+            if (current and current.get('_last_modified') ==
+                    entry.get('_last_modified')):
+                return module.exit_json(changed=False, obj=current,
+                                        old_obj=None)
+        if not module.check_mode:
+            record_apply_state(module, apply_state, key, digest, lookup)
+    if not module.check_mode:
+        # the object may be written by this task so later lookups of the
+        # object cache have to go to the controller.
+        get_object_cache(api_creds).invalidate(
+            obj_type, name=module.params.get('name'))
+    return sdk_api_with_diff(module, obj_type, sensitive_fields, api=api)
+
+
+def avi_collection_iter(api, path, tenant='', tenant_uuid='', params=None,
+                        api_version=None, page_size=200):
+    """
+    Yields the objects of a collection one page at a time following the
+    controller pagination.
+    :param api: ApiSession
+    :param path: collection path for example pool
+    :param params: additional query parameters
+    :param page_size: number of objects to fetch per call
+    Raises APIError if any page can not be fetched.
+    """
+    gparams = dict(params) if params else {}
+    gparams['page_size'] = page_size
+    page = 1
+    while True:
+        gparams['page'] = page
+        rsp = api.get(path, tenant=tenant, tenant_uuid=tenant_uuid,
+                      params=gparams, api_version=api_version)
+        if rsp.status_code > 299:
+            raise APIError('Failed to get %s page %d status %d msg %s' % (
+                path, page, rsp.status_code, rsp.text), rsp)
+        data = rsp.json()
+        for obj in data.get('results', []):
+            yield obj
+        if not data.get('next'):
+            break
+        page += 1
+
+
+def avi_collection_fetch(api, path, tenant='', tenant_uuid='', params=None,
+                         api_version=None, page_size=200, concurrency=1):
+    """
+    Fetches all the objects of a collection. The count returned with the
+    first page gives the number of pages and the remaining pages are fetched
+    concurrently.
+    :param api: ApiSession
+    :param path: collection path for example pool
+    :param params: additional query parameters
+    :param page_size: number of objects to fetch per call
+    :param concurrency: maximum number of pages fetched at the same time
+    :return: list of the objects in the order of the collection
+    Raises APIError if any page can not be fetched.
+    """
+    gparams = dict(params) if params else {}
+    gparams['page_size'] = page_size
+
+    def get_page(page):
+        page_params = dict(gparams, page=page)
+        rsp = api.get(path, tenant=tenant, tenant_uuid=tenant_uuid,
+                      params=page_params, api_version=api_version)
+        if rsp.status_code > 299:
+            raise APIError('Failed to get %s page %d status %d msg %s' % (
+                path, page, rsp.status_code, rsp.text), rsp)
+        return rsp.json()
+
+    data = get_page(1)
+    objs = list(data.get('results', []))
+    count = data.get('count')
+    if data.get('next') and count is not None and concurrency > 1:
+        pages = range(2, (count + page_size - 1) // page_size + 1)
+        pool = ThreadPool(max(1, min(concurrency, len(pages))))
+        try:
+            for page_data in pool.map(get_page, pages):
+                objs.extend(page_data.get('results', []))
+        finally:
+            pool.close()
+            pool.join()
+        return objs
+    # without a count the pages can only be followed one by one.
+    page = 1
+    while data.get('next'):
+        page += 1
+        data = get_page(page)
+        objs.extend(data.get('results', []))
+    return objs
+
+
+def strip_ref_hosts(obj):
+    """
+    :return: copy of obj with the URLs of the references reduced to their
+        path, without the host and the #name of the object
+    """
+    if isinstance(obj, dict):
+        return dict((k, strip_ref_hosts(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return [strip_ref_hosts(v) for v in obj]
+    if isinstance(obj, string_types):
+        match = HTTP_REF.match(obj)
+        if match:
+            return match.group(1)
+    return obj
+
+
+def modified_since(last_modified, since):
+    """
+    :return: True if the _last_modified last_modified is the same as or
+        later than since
+    """
+    try:
+        return int(last_modified) >= int(since)
+    except (TypeError, ValueError):
+        return last_modified == since
+
+
+def avi_readback(api, path, tenant='', tenant_uuid='', params=None,
+                 api_version=None, last_modified=None, timeout=5.0):
+    """
+    Reads an object back after it was written until the controller returns
+    the written object. With last_modified the object is read until its
+    _last_modified reaches it, otherwise until two reads in a row return the
+    same object. The wait between the reads starts at READBACK_DELAY and
+    doubles up to READBACK_MAX_DELAY.
+    :param last_modified: _last_modified returned by the write
+    :param timeout: seconds after which the last read is returned as is
+    :return: ApiResponse of the last read
+    """
+    deadline = time.time() + timeout
+    delay = READBACK_DELAY
+    previous = None
+    while True:
+        rsp = api.get(path, tenant=tenant, tenant_uuid=tenant_uuid,
+                      params=params, api_version=api_version)
+        if rsp.status_code > 299:
+            return rsp
+        obj = rsp.json()
+        if last_modified is not None:
+            if modified_since(obj.get('_last_modified'), last_modified):
+                return rsp
+        elif previous is not None and obj == previous:
+            return rsp
+        previous = obj
+        if time.time() + delay > deadline:
+            return rsp
+        time.sleep(delay)
+        delay = min(delay * 2, READBACK_MAX_DELAY)
@@ -0,0 +1,191 @@
+"""
+# Created on Oct 18, 2026
+#
+# Telemetry of the API calls of a task. When AVI_API_STATS is set the module
+# result has an api_stats block with the requests per method, their latency,
+# logins, bytes sent and received and retries.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+import json
+import os
+import threading
+import time
+
+from avi.sdk.avi_api import ApiSession
+from ansible.module_utils.avi_connection import AviConnectionSession
+from ansible.module_utils.six import binary_type, string_types
+
+API_STATS_ENV = 'AVI_API_STATS'
+
+# number of the slowest calls returned in api_stats
+MAX_CALLS = 20
+
+# AviApiStats currently installed
+installed = []
+
+
+def body_size(data):
+    """
+    :return: number of bytes of the body the SDK sends for data
+    """
+    if data is None:
+        return 0
+    if isinstance(data, (dict, list)):
+        return len(json.dumps(data))
+    if isinstance(data, (binary_type,) + string_types):
+        return len(data)
+    # MultipartEncoder of file uploads
+    return int(getattr(data, 'len', 0) or 0)
+
+
+def response_size(rsp, stream=False):
+    if stream:
+        return int(rsp.headers.get('Content-Length') or 0)
+    return len(rsp.content or b'')
+
+
+class AviApiStats(object):
+    """
+    Counts the API calls of every session while it is installed. A call
+    made by the SDK within another call, like the call it sends again after
+    a new login, is a retry. Latency and bytes are those of the outermost
+    call, including its retries.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.requests = {}
+        self.latency = 0.0
+        self.calls = []
+        self.logins = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.patched = []
+
+    @classmethod
+    def from_env(cls):
+        """
+        :return: AviApiStats if AVI_API_STATS is set else None
+        """
+        if os.environ.get(API_STATS_ENV, '').lower() in (
+                '', '0', 'false', 'no', 'off'):
+            return None
+        return cls()
+
+    def track(self, api_fn):
+        stats = self
+
+        def tracked_api(api, api_name, path, *args, **kwargs):
+            depth = getattr(stats.local, 'depth', 0)
+            with stats.lock:
+                stats.requests[api_name] = stats.requests.get(api_name, 0) + 1
+                if depth:
+                    stats.retries += 1
+            stats.local.depth = depth + 1
+            start = time.time()
+            try:
+                rsp = api_fn(api, api_name, path, *args, **kwargs)
+            finally:
+                stats.local.depth = depth
+            if not depth:
+                stats.record(api_name, path, rsp, time.time() - start,
+                             body_size(kwargs.get('data', args[2] if len(
+                                 args) > 2 else None)),
+                             response_size(rsp, kwargs.get('stream')))
+            return rsp
+        return tracked_api
+
+    def record(self, api_name, path, rsp, latency, sent, received):
+        with self.lock:
+            self.latency += latency
+            self.bytes_sent += sent
+            self.bytes_received += received
+            self.calls.append(dict(method=api_name.upper(), path=path,
+                                   status=rsp.status_code,
+                                   latency=round(latency, 4)))
+            # only the slowest calls are kept
+            if len(self.calls) > 2 * MAX_CALLS:
+                self.calls.sort(key=lambda c: -c['latency'])
+                del self.calls[MAX_CALLS:]
+
+    def install(self):
+        """
+        Hooks the API calls and logins of all sessions.
+        """
+        stats = self
+        authenticate_session = ApiSession.authenticate_session
+
+        def counted_authenticate_session(api):
+            with stats.lock:
+                stats.logins += 1
+            return authenticate_session(api)
+        for cls, name, fn in (
+                (ApiSession, '_api', self.track(ApiSession._api)),
+                (AviConnectionSession, '_api',
+                 self.track(AviConnectionSession._api)),
+                (ApiSession, 'authenticate_session',
+                 counted_authenticate_session)):
+            self.patched.append((cls, name, cls.__dict__[name]))
+            setattr(cls, name, fn)
+        installed.append(self)
+        return self
+
+    def uninstall(self):
+        for cls, name, fn in reversed(self.patched):
+            setattr(cls, name, fn)
+        self.patched = []
+        if self in installed:
+            installed.remove(self)
+
+    def summary(self):
+        """
+        :return: api_stats of the module result
+        """
+        with self.lock:
+            total = sum(self.requests.values())
+            return dict(
+                requests=dict((k.upper(), v) for k, v in
+                              self.requests.items()),
+                total_requests=total, latency=round(self.latency, 4),
+                calls=sorted(self.calls,
+                             key=lambda c: -c['latency'])[:MAX_CALLS],
+                logins=self.logins, bytes_sent=self.bytes_sent,
+                bytes_received=self.bytes_received, retries=self.retries)
+
+
+def count_retry():
+    """
+    Counts a call sent again by the client, like after a 429 of the
+    controller, as a retry.
+    """
+    for stats in installed:
+        with stats.lock:
+            stats.retries += 1
+
+
+def track_api_stats(module):
+    """
+    Installs AviApiStats when AVI_API_STATS is set and adds its summary as
+    api_stats to the result of exit_json and fail_json of the module.
+    :param module: AnsibleModule
+    :return: AviApiStats or None
+    """
+    stats = AviApiStats.from_env()
+    if stats is None:
+        return None
+    stats.install()
+
+    def with_stats(fn):
+        def exit_with_stats(**kwargs):
+            stats.uninstall()
+            kwargs['api_stats'] = stats.summary()
+            return fn(**kwargs)
+        return exit_with_stats
+    module.exit_json = with_stats(module.exit_json)
+    module.fail_json = with_stats(module.fail_json)
+    return stats
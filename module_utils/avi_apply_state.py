@@ -0,0 +1,152 @@
+"""
+# Created on Oct 18, 2026
+#
+# Local record of the last applied spec of every object and its
+# _last_modified on the controller. When neither has changed since the last
+# run the module returns the object without comparing or updating it.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    # no lock file on windows
+    fcntl = None
+
+# The fast path is disabled unless a directory is configured.
+APPLY_STATE_DIR_ENV = 'AVI_APPLY_STATE_DIR'
+
+# Module parameters that do not change the object on the controller.
+NON_SPEC_PARAMS = ['controller', 'username', 'password', 'port', 'timeout',
+                   'token', 'api_context', 'avi_credentials',
+                   'avi_disable_session_cache_as_fact',
+                   'avi_deactivate_session_cache_as_fact', 'csp_host',
+                   'csp_token', 'ssl_cert', 'ssl_key', 'idp_class']
+
+# Objects that are not looked up by name or where name is not the name of
+# the object on the controller.
+NO_FAST_PATH_OBJ = ['user', 'fileobject/upload']
+
+
+def spec_hash(params):
+    """
+    :param params: module parameters
+    :return: sha256 of the parameters that define the object
+    """
+    spec = dict((k, v) for k, v in params.items() if k not in NON_SPEC_PARAMS)
+    return hashlib.sha256(json.dumps(
+        spec, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class AviApplyState(object):
+    """
+    One file per controller and user with an entry per tenant, object type
+    and name holding the spec hash and _last_modified of the last run.
+    """
+
+    def __init__(self, state_file):
+        self.state_file = state_file
+
+    @classmethod
+    def from_env(cls, api_creds):
+        """
+        :return: AviApplyState if AVI_APPLY_STATE_DIR is set else None
+        """
+        state_dir = os.environ.get(APPLY_STATE_DIR_ENV, '')
+        if not state_dir:
+            return None
+        key = '%s:%s:%s' % (api_creds.controller, api_creds.port or '',
+                            api_creds.username)
+        return cls(os.path.join(
+            os.path.expanduser(state_dir), '%s.state.json' %
+            hashlib.sha256(key.encode('utf-8')).hexdigest()))
+
+    @staticmethod
+    def make_key(obj_type, name, tenant=''):
+        return '%s/%s/%s' % (tenant or '', obj_type, name)
+
+    def _read(self):
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        return self._read().get(key)
+
+    def set(self, key, spec_digest, last_modified):
+        """
+        Records the entry. The file is re-read under an flock of the state
+        file before the update so that entries written by the other forks are
+        kept.
+        """
+        state_dir = os.path.dirname(self.state_file)
+        if not os.path.isdir(state_dir):
+            os.makedirs(state_dir, 0o700)
+        if fcntl is None:
+            return self._update(key, spec_digest, last_modified)
+        # the state file is replaced on every update so lock a file next to it
+        fd = os.open(self.state_file + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self._update(key, spec_digest, last_modified)
+        finally:
+            os.close(fd)
+
+    def _update(self, key, spec_digest, last_modified):
+        state = self._read()
+        if last_modified:
+            state[key] = {'spec_hash': spec_digest,
+                          '_last_modified': last_modified}
+        elif state.pop(key, None) is None:
+            return
+        state_dir = os.path.dirname(self.state_file)
+        fd, tmp_path = tempfile.mkstemp(dir=state_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.chmod(tmp_path, 0o600)
+            os.rename(tmp_path, self.state_file)
+        except (IOError, OSError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def get_existing_obj(api, obj_type, name, tenant='', tenant_uuid='',
+                     api_version=None, cloud_ref=None):
+    """
+    Fetches the object by name as avi_ansible_api of the SDK does, so that
+    the fast path returns the same obj as a run that compares the object.
+    :return: dict of the object or None if it does not exist
+    """
+    params = {'include_refs': '', 'include_name': ''}
+    if cloud_ref and 'name=' in cloud_ref:
+        params['cloud_ref.name'] = cloud_ref.split('name=')[1]
+    return api.get_object_by_name(obj_type, name, tenant=tenant,
+                                  tenant_uuid=tenant_uuid, params=params,
+                                  api_version=api_version)
+
+
+def get_last_modified(api, obj_type, name, tenant='', tenant_uuid='',
+                      api_version=None, cloud_ref=None):
+    """
+    Fetches only the identity fields and _last_modified of an object.
+    :return: dict of the fields or None if the object does not exist
+    """
+    params = {'name': name, 'fields': 'name,uuid,url,_last_modified'}
+    if cloud_ref and 'name=' in cloud_ref:
+        params['cloud_ref.name'] = cloud_ref.split('name=')[1]
+    rsp = api.get(obj_type, tenant=tenant, tenant_uuid=tenant_uuid,
+                  params=params, api_version=api_version)
+    if rsp.status_code > 299:
+        return None
+    results = rsp.json().get('results', [])
+    return results[0] if results else None
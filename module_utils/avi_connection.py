@@ -0,0 +1,138 @@
+"""
+# Created on Oct 18, 2026
+#
+# Module side of the avi persistent connection. API calls of the SDK are sent
+# over the socket of the connection instead of a session of the module.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+from datetime import datetime
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.module_utils.six import binary_type, string_types
+from avi.sdk import avi_api
+from avi.sdk.avi_api import APIError, ApiResponse, ApiSession
+
+
+class AviConnectionSession(ApiSession):
+    """
+    ApiSession that never logs in or opens a HTTPS connection itself. Every
+    API call is sent to the avi connection plugin which holds the login and
+    the connection pool of the play. The session is registered in the SDK
+    session cache so that ApiSession.get_session, and with it
+    avi_ansible_api, returns it for the credentials of the module.
+    """
+
+    def __init__(self, socket_path, api_creds, verify=False):
+        self.connection = Connection(socket_path)
+        context = self._get_connection_context()
+        apply_connection_login(api_creds, context)
+        api_creds.session_id = context.get('session_id')
+        api_creds.csrftoken = context.get('csrftoken')
+        super(AviConnectionSession, self).__init__(
+            avi_credentials=api_creds, verify=verify, port=api_creds.port,
+            timeout=api_creds.timeout, lazy_authentication=True)
+        self._register(context)
+
+    def _get_connection_context(self):
+        try:
+            return self.connection.get_context()
+        except ConnectionError as e:
+            raise APIError('Avi connection failed: %s' % e)
+
+    def _register(self, context):
+        avi_api.sessionDict[self.key] = {
+            'api': self, 'csrftoken': context.get('csrftoken'),
+            'session_id': context.get('session_id'),
+            'last_used': datetime.utcnow(), 'connected': True}
+
+    def authenticate_session(self):
+        """
+        The connection logs in again by itself so only the context of its
+        current login is picked up.
+        """
+        context = self._get_connection_context()
+        self.avi_credentials.session_id = context.get('session_id')
+        self.avi_credentials.csrftoken = context.get('csrftoken')
+        self._register(context)
+
+    def _api(self, api_name, path, tenant, tenant_uuid, data=None,
+             headers=None, timeout=None, api_version=None, **kwargs):
+        """
+        Sends the call to the connection. Only JSON requests can be sent over
+        the socket, so streamed responses and multipart bodies are not
+        supported.
+        :return: ApiResponse
+        """
+        if kwargs.get('stream') or not (data is None or isinstance(
+                data, (dict, list, binary_type) + string_types)):
+            raise APIError('%s %s is not supported over the avi connection'
+                           % (api_name.upper(), path))
+        if isinstance(data, binary_type):
+            data = data.decode('utf-8')
+        # defaults of the module, not of the connection, apply to the call.
+        if not (tenant or tenant_uuid):
+            tenant = self.avi_credentials.tenant
+            tenant_uuid = self.avi_credentials.tenant_uuid
+        api_version = api_version or self.avi_credentials.api_version
+        try:
+            result = self.connection.send_request(
+                api_name, path, tenant=tenant, tenant_uuid=tenant_uuid,
+                data=data, headers=headers, timeout=timeout,
+                api_version=api_version, params=kwargs.get('params'))
+        except ConnectionError as e:
+            raise APIError('Avi connection failed: %s' % e)
+        rsp = Response()
+        rsp.status_code = result['status_code']
+        rsp.headers = CaseInsensitiveDict(result.get('headers') or {})
+        rsp.url = result.get('url')
+        rsp.encoding = 'utf-8'
+        rsp._content = (result.get('text') or '').encode('utf-8')
+        self._update_session_last_used()
+        return ApiResponse(rsp)
+
+
+def apply_connection_login(api_creds, context):
+    """
+    Fills the controller, port and username that the task left out with the
+    ones of the login of the avi connection.
+    :param api_creds: AviCredentials of the task
+    :param context: context of the connection, see get_connection_context
+    :raises APIError: if the task sets another controller, port or username
+        than the connection logged in with
+    """
+    for field in ('controller', 'port', 'username'):
+        value = context.get(field)
+        if not value:
+            continue
+        current = getattr(api_creds, field, None)
+        if not current:
+            setattr(api_creds, field, value)
+        elif str(current) != str(value):
+            raise APIError(
+                'The %s %s of the task is not the %s %s of the avi '
+                'connection' % (field, current, field, value))
+
+
+def get_connection_context(module):
+    """
+    Login of the avi connection for requests that can not be sent over its
+    socket, like file transfers.
+    :param module: AnsibleModule
+    :return: dict with session_id, csrftoken, controller, port and username
+        or an empty dict if the task does not use the avi connection
+    """
+    socket_path = getattr(module, '_socket_path', None)
+    if not socket_path:
+        return {}
+    try:
+        context = Connection(socket_path).get_context()
+    except ConnectionError as e:
+        raise APIError('Avi connection failed: %s' % e)
+    if not context.get('csrftoken'):
+        return {}
+    return context
@@ -0,0 +1,87 @@
+"""
+# Created on Oct 18, 2026
+#
+# Dependency graph of Avi objects built from their *_ref fields. Used to
+# apply a set of objects in waves where every object of a wave only refers
+# to objects of earlier waves.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+import re
+
+from ansible.module_utils.six import string_types
+
+# /api/pool?name=p1, /api/tenant/?name=admin or /api/pool?cloud=c&name=p1
+REF_BY_NAME = re.compile(
+    r'^/api/(?P<obj_type>[\w-]+)/?\?(?:[^#]*&)?name=(?P<name>[^&#]+)')
+# https://10.10.25.42/api/pool/pool-0e7f1d42#p1 as returned by include_name
+REF_BY_URL = re.compile(
+    r'^https?://[^/]+/api/(?P<obj_type>[\w-]+)/[^#]+#(?P<name>.+)$')
+
+
+class DependencyCycleError(Exception):
+    pass
+
+
+def parse_ref(ref):
+    """
+    :param ref: reference string
+    :return: tuple of (obj_type, name) or None if ref is not a reference
+        by name.
+    """
+    match = REF_BY_NAME.match(ref) or REF_BY_URL.match(ref)
+    if not match:
+        return None
+    return match.group('obj_type'), match.group('name')
+
+
+def iter_refs(obj):
+    """
+    Yields (obj_type, name) for every *_ref and *_refs field in obj and in
+    its nested objects.
+    """
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            if k.endswith('_ref') or k.endswith('_refs'):
+                refs = v if isinstance(v, list) else [v]
+                for ref in refs:
+                    parsed = (parse_ref(ref)
+                              if isinstance(ref, string_types) else None)
+                    if parsed:
+                        yield parsed
+            elif isinstance(v, (dict, list)):
+                for parsed in iter_refs(v):
+                    yield parsed
+    elif isinstance(obj, list):
+        for v in obj:
+            for parsed in iter_refs(v):
+                yield parsed
+
+
+def dependency_waves(nodes, deps):
+    """
+    Groups nodes in waves such that every node only depends on nodes of
+    earlier waves. Nodes keep their relative order inside a wave.
+    :param nodes: list of hashable node keys
+    :param deps: dict of node key to the set of node keys it depends on.
+        Dependencies on keys not in nodes are ignored.
+    :return: list of waves, each a list of node keys
+    Raises DependencyCycleError if the dependencies have a cycle.
+    """
+    node_set = set(nodes)
+    pending = dict((n, set(d for d in deps.get(n, ()) if d in node_set and
+                           d != n)) for n in nodes)
+    waves = []
+    done = set()
+    while pending:
+        wave = [n for n in nodes if n in pending and pending[n] <= done]
+        if not wave:
+            raise DependencyCycleError(
+                'Dependency cycle between %s' % sorted(pending))
+        for n in wave:
+            pending.pop(n)
+        done.update(wave)
+        waves.append(wave)
+    return waves
@@ -0,0 +1,268 @@
+"""
+# Created on Oct 18, 2026
+#
+# Structural diff of a desired Avi object against the object on the
+# controller. It has the semantics of avi_obj_cmp of the SDK but returns the
+# paths that differ and is much cheaper on large objects.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+from ansible.module_utils.six import string_types
+from avi.sdk.utils.ansible_utils import cleanup_absent_fields, ref_n_str_cmp
+
+# Fields of the desired object that are never compared.
+IGNORED_FIELDS = ['_last_modified', 'tenant', 'api_version', 'verify']
+
+# Lists whose elements are a set, by field name, with the keys that identify
+# their elements independent of their position in order of preference. Dotted
+# keys are looked up in nested objects. Elements of all the other lists are
+# compared by position like avi_obj_cmp does, as the order of rules, policies
+# and references matters.
+UNORDERED_LISTS = {
+    'servers': ['ip.addr'],
+    'addrs': ['addr'],
+    'prefixes': ['ip_addr.addr'],
+    'ranges': ['begin.addr'],
+    'kv': ['key'],
+    'members': ['ip.addr', 'fqdn'],
+}
+
+ABSENT = "{'state': 'absent'}"
+
+
+def join_path(path, key):
+    return '%s.%s' % (path, key) if path else key
+
+
+def natural_key_value(obj, key):
+    for part in key.split('.'):
+        if not isinstance(obj, dict) or part not in obj:
+            return None
+        obj = obj[part]
+    return obj if isinstance(obj, string_types + (int, float)) else None
+
+
+def top_level_field(path):
+    """
+    :return: field of the object a changed path belongs to
+    """
+    for i, c in enumerate(path):
+        if c in '.[':
+            return path[:i]
+    return path
+
+
+def list_index(field, x, y):
+    """
+    :param field: name of the field of the lists
+    :return: tuple of the natural key of the lists and the elements of y by
+        the value of the key, or (None, None) if the list is ordered or the
+        elements of x and y can not be told apart by any of its keys in
+        UNORDERED_LISTS.
+    """
+    for key in UNORDERED_LISTS.get(field, ()):
+        x_values = [natural_key_value(obj, key) for obj in x]
+        if None in x_values or len(set(x_values)) != len(x_values):
+            continue
+        index = {}
+        for obj in y:
+            value = natural_key_value(obj, key)
+            if value is None or value in index:
+                break
+            index[value] = obj
+        else:
+            return key, index
+    return None, None
+
+
+class ObjDiff(object):
+    """
+    Walks the desired object against the controller object and collects the
+    paths that differ in changed.
+    """
+
+    def __init__(self, sensitive_fields=None):
+        self.sensitive_fields = set(sensitive_fields or ())
+        self.changed = []
+        # refs repeat across the elements of large lists, so the result of
+        # the reference matching of the SDK is kept per pair of strings.
+        self.str_cmps = {}
+
+    def str_cmp(self, x, y):
+        if x == y:
+            return True
+        if isinstance(y, (int, float, bool)):
+            return str(x) == str(y)
+        if not isinstance(y, string_types):
+            return False
+        key = (x, y)
+        if key not in self.str_cmps:
+            self.str_cmps[key] = ref_n_str_cmp(x, y)
+        return self.str_cmps[key]
+
+    def list_diff(self, x, y, path, field):
+        if not isinstance(y, list) or len(x) != len(y):
+            self.changed.append(path)
+            return
+        key, index = list_index(field, x, y)
+        if key is None:
+            for i, (x_item, y_item) in enumerate(zip(x, y)):
+                self.diff(x_item, y_item, '%s[%d]' % (path, i))
+            return
+        for x_item in x:
+            value = natural_key_value(x_item, key)
+            item_path = '%s[%s=%s]' % (path, key, value)
+            if value not in index:
+                self.changed.append(item_path)
+            else:
+                self.diff(x_item, index[value], item_path)
+
+    def dict_diff(self, x, y, path):
+        for k in IGNORED_FIELDS:
+            x.pop(k, None)
+        y.pop('_last_modified', None)
+        for k in list(x):
+            v = x[k]
+            k_path = join_path(path, k)
+            if k in self.sensitive_fields:
+                # sensitive fields are never returned as is by the controller
+                self.changed.append(k_path)
+                continue
+            if v is None:
+                x.pop(k)
+                continue
+            if isinstance(v, dict):
+                if v.get('state') == 'absent':
+                    if k in y:
+                        self.changed.append(k_path)
+                    else:
+                        x.pop(k)
+                    continue
+                if not v:
+                    x.pop(k)
+                    continue
+            elif k not in y and (
+                    (isinstance(v, list) and not v) or
+                    (isinstance(v, string_types) and (not v or v == ABSENT))):
+                x.pop(k)
+                continue
+            if k not in y:
+                self.changed.append(k_path)
+                continue
+            self.diff(v, y[k], k_path, k)
+
+    def diff(self, x, y, path='', field=None):
+        if x == y:
+            # equal subtrees are always contained, skip walking them.
+            return
+        if isinstance(x, string_types):
+            if not self.str_cmp(x, y):
+                self.changed.append(path)
+        elif isinstance(x, list):
+            self.list_diff(x, y, path, field)
+        elif isinstance(x, dict) and isinstance(y, dict):
+            self.dict_diff(x, y, path)
+        else:
+            self.changed.append(path)
+
+
+def avi_obj_diff(x, y, sensitive_fields=None):
+    """
+    Compares the desired object x with the controller object y like
+    avi_obj_cmp: x only has to be contained in y, references by name match
+    the url of the object in y and fields that are None or state: absent are
+    not expected in y. Elements of the lists in UNORDERED_LISTS are matched
+    by their key when they have unique values for one of them, elements of
+    all the other lists by position.
+    Like avi_obj_cmp the fields that take no part in the compare are removed
+    from x and _last_modified from y.
+    :param x: desired object
+    :param y: object from the controller
+    :param sensitive_fields: fields that are always reported as changed
+    :return: list of the paths of x that differ from y. Empty if x is
+        contained in y.
+    """
+    obj_diff = ObjDiff(sensitive_fields)
+    obj_diff.diff(x, y)
+    return obj_diff.changed
+
+
+def avi_obj_cmp(x, y, sensitive_fields=None):
+    """
+    Drop-in replacement of avi_obj_cmp of the SDK.
+    :return: True if x is contained in y
+    """
+    return not avi_obj_diff(x, y, sensitive_fields)
+
+
+def list_patch(field, x, y, sensitive_fields):
+    """
+    Patch of an unordered list of objects that only gained or lost elements.
+    :param field: name of the field of the lists
+    :return: tuple of the elements of x to add and the elements of y to
+        delete, or None if the lists can not be matched by a natural key or
+        an element in both lists changed.
+    """
+    if not (isinstance(y, list) and all(
+            isinstance(obj, dict) for obj in x + y)):
+        return None
+    key, index = list_index(field, x, y)
+    if key is None:
+        return None
+    added = []
+    matched = set()
+    for x_item in x:
+        value = natural_key_value(x_item, key)
+        if value not in index:
+            added.append(x_item)
+        elif avi_obj_diff(x_item, index[value], sensitive_fields):
+            return None
+        else:
+            matched.add(value)
+    deleted = [obj for value, obj in index.items() if value not in matched]
+    return added, deleted
+
+
+def avi_obj_patch(obj, existing_obj, sensitive_fields=None):
+    """
+    Minimal PATCH of the existing object to the desired object in the add,
+    replace and delete operations of the Avi API. Changed fields are
+    replaced as a whole, like a PUT does. Unordered lists of objects that
+    only gained or lost elements, matched by their key in UNORDERED_LISTS,
+    get the elements added or deleted instead.
+    Like avi_obj_diff the fields that take no part in the compare are
+    removed from obj.
+    :param obj: desired object, fields not in it are left as they are
+    :param existing_obj: object from the controller
+    :param sensitive_fields: fields that are always replaced
+    :return: tuple of the changed paths and the patch data. The patch data
+        is empty if nothing changed.
+    """
+    changed = avi_obj_diff(obj, existing_obj, sensitive_fields)
+    patch = {}
+    for field in sorted(set(top_level_field(path) for path in changed)):
+        value = obj[field]
+        if isinstance(value, dict) and value.get('state') == 'absent':
+            patch.setdefault('delete', {})[field] = existing_obj[field]
+            continue
+        if isinstance(value, list):
+            delta = list_patch(field, value, existing_obj.get(field),
+                               sensitive_fields)
+            if delta:
+                added, deleted = delta
+                if added:
+                    patch.setdefault('add', {})[field] = [
+                        cleanup_absent_fields(item) for item in added]
+                if deleted:
+                    patch.setdefault('delete', {})[field] = deleted
+                continue
+        cleaned = cleanup_absent_fields({field: value})
+        if field in cleaned:
+            patch.setdefault('replace', {})[field] = cleaned[field]
+        else:
+            # only fields marked absent were set in the value
+            patch.setdefault('delete', {})[field] = existing_obj[field]
+    return changed, patch
+
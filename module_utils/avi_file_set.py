@@ -0,0 +1,212 @@
+"""
+# Created on Oct 18, 2026
+#
+# Large list fields of an object, like the addresses of an ipaddrgroup or the
+# keys of a stringgroup, loaded from local files. Only the members that
+# differ from the object on the controller are sent, as PATCH add and delete
+# in chunks.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+import io
+import socket
+
+from avi.sdk.avi_api import AviCredentials
+from avi.sdk.utils.ansible_utils import (
+    POP_FIELDS, avi_common_argument_spec, cleanup_absent_fields)
+from ansible.module_utils.avi_api_stats import track_api_stats
+from ansible.module_utils.avi_diff import avi_obj_patch
+from ansible.module_utils.avi_object_cache import get_object_cache
+from ansible.module_utils.avi_session_cache import get_cached_session
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def ip_addr(addr):
+    """
+    :return: IpAddr object of the address. IPv6 addresses are normalized so
+        that they match the form returned by the controller.
+    """
+    addr = addr.strip()
+    if ':' in addr:
+        return {'addr': socket.inet_ntop(
+            socket.AF_INET6, socket.inet_pton(socket.AF_INET6, addr)),
+            'type': 'V6'}
+    socket.inet_pton(socket.AF_INET, addr)
+    return {'addr': addr, 'type': 'V4'}
+
+
+def addr_key(line):
+    return ip_addr(line)['addr']
+
+
+def addr_member(key):
+    return ip_addr(key)
+
+
+def prefix_key(line):
+    addr, mask = line.split('/')
+    return ip_addr(addr)['addr'], int(mask)
+
+
+def prefix_member(key):
+    return {'ip_addr': ip_addr(key[0]), 'mask': key[1]}
+
+
+def range_key(line):
+    begin, end = line.split('-')
+    return ip_addr(begin)['addr'], ip_addr(end)['addr']
+
+
+def range_member(key):
+    return {'begin': ip_addr(key[0]), 'end': ip_addr(key[1])}
+
+
+def kv_key(line):
+    # a key and its value are separated by a tab
+    key, _, value = line.partition('\t')
+    return key.strip(), value.strip() or None
+
+
+def kv_member(key):
+    member = {'key': key[0]}
+    if key[1] is not None:
+        member['value'] = key[1]
+    return member
+
+
+# List fields that can be loaded from a file: key of a line of the file, the
+# member of the object for a key and the key of a member of the controller.
+MEMBER_FIELDS = {
+    'addrs': (addr_key, addr_member, lambda m: m.get('addr')),
+    'prefixes': (prefix_key, prefix_member,
+                 lambda m: (m.get('ip_addr', {}).get('addr'), m.get('mask'))),
+    'ranges': (range_key, range_member,
+               lambda m: (m.get('begin', {}).get('addr'),
+                          m.get('end', {}).get('addr'))),
+    'kv': (kv_key, kv_member,
+           lambda m: (m.get('key'), m.get('value') or None)),
+}
+
+
+def load_member_keys(path, field):
+    """
+    Reads the file line by line, so only the set of the keys is held in
+    memory. Empty lines and lines starting with # are skipped.
+    :return: set of the keys of the members in the file
+    """
+    parse = MEMBER_FIELDS[field][0]
+    keys = set()
+    with io.open(path, encoding='utf-8') as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                keys.add(parse(line))
+            except (ValueError, socket.error):
+                raise ValueError('Invalid %s entry in %s line %d: %s' % (
+                    field, path, n, line))
+    return keys
+
+
+def chunks(items, chunk_size):
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+def member_delta(field, keys, existing_obj):
+    """
+    :return: tuple of the members to add and the members of the existing
+        object to delete.
+    """
+    _, to_member, member_key = MEMBER_FIELDS[field]
+    existing = {}
+    for member in (existing_obj or {}).get(field) or []:
+        existing[member_key(member)] = member
+    added = [to_member(key) for key in keys if key not in existing]
+    deleted = [member for key, member in existing.items() if key not in keys]
+    return added, deleted
+
+
+def avi_file_set_api(module, obj_type, file_fields):
+    """
+    Applies an object whose list fields are loaded from files. The other
+    fields are compared and patched like avi_api_update_method auto does.
+    The members of the files are compared with the members of the object as
+    sets and only the members to add and delete are sent, at most
+    file_chunk_size members per PATCH.
+    :param module: AnsibleModule
+    :param obj_type: Avi object type
+    :param file_fields: dict of the module option of a file to the list field
+        of the object it holds
+    """
+    track_api_stats(module)
+    api_creds = AviCredentials()
+    api_creds.update_from_ansible_module(module)
+    api = get_cached_session(api_creds, socket_path=module._socket_path,
+                             verify=getattr(api_creds, 'verify', False))
+    params = module.params
+    tenant = api_creds.tenant
+    tenant_uuid = api_creds.tenant_uuid
+    api_version = api_creds.api_version
+    name = params['name']
+    chunk_size = params.get('file_chunk_size') or DEFAULT_CHUNK_SIZE
+    try:
+        members = dict((field, load_member_keys(params[option], field))
+                       for option, field in file_fields.items()
+                       if params.get(option))
+    except (IOError, OSError, ValueError) as e:
+        return module.fail_json(msg=str(e))
+    skip = set(POP_FIELDS) | set(avi_common_argument_spec()) | set(
+        file_fields) | set(['file_chunk_size'])
+    obj = dict((k, v) for k, v in params.items()
+               if k not in skip and v is not None)
+
+    existing_obj = api.get_object_by_name(
+        obj_type, name, tenant=tenant, tenant_uuid=tenant_uuid,
+        params={'include_refs': '', 'include_name': ''},
+        api_version=api_version)
+    deltas = dict((field, member_delta(field, keys, existing_obj))
+                  for field, keys in members.items())
+    counts = dict((field, dict(added=len(added), deleted=len(deleted)))
+                  for field, (added, deleted) in deltas.items())
+    if existing_obj:
+        patch = avi_obj_patch(obj, existing_obj)[1]
+        requests = [patch] if patch else []
+    else:
+        # the object is created with the first chunk of every field.
+        req = cleanup_absent_fields(obj)
+        for field, (added, _) in deltas.items():
+            req[field] = added[:chunk_size]
+            deltas[field] = (added[chunk_size:], [])
+        requests = [req]
+    for field, (added, deleted) in deltas.items():
+        requests.extend({'delete': {field: chunk}}
+                        for chunk in chunks(deleted, chunk_size))
+        requests.extend({'add': {field: chunk}}
+                        for chunk in chunks(added, chunk_size))
+    changed = bool(requests)
+    if module.check_mode or not changed:
+        return module.exit_json(changed=changed, obj=existing_obj,
+                                members=counts)
+
+    get_object_cache(api_creds).invalidate(obj_type, name=name)
+    rsp = None
+    for i, req in enumerate(requests):
+        if existing_obj is None and i == 0:
+            rsp = api.post(obj_type, data=req, tenant=tenant,
+                           tenant_uuid=tenant_uuid, api_version=api_version)
+            existing_obj = rsp.json() if rsp.status_code < 300 else None
+        else:
+            rsp = api.patch('%s/%s' % (obj_type, existing_obj['uuid']),
+                            data=req, tenant=tenant, tenant_uuid=tenant_uuid,
+                            api_version=api_version)
+        if rsp.status_code > 299:
+            return module.fail_json(
+                msg='Error %d Msg %s in request %d of %d' % (
+                    rsp.status_code, rsp.text, i + 1, len(requests)),
+                members=counts)
+    return module.exit_json(changed=changed, obj=rsp.json(), members=counts)
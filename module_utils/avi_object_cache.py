@@ -0,0 +1,233 @@
+"""
+# Created on Oct 18, 2026
+#
+# Read-through cache of Avi objects looked up by name. Entries are kept in a
+# size bounded LRU per controller and can be shared across the tasks of a
+# play through AVI_OBJECT_CACHE_DIR.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+
+# The cache is kept in memory of the module unless a directory is
+# configured, in which case it is loaded at the start and saved at the exit
+# of every task.
+OBJECT_CACHE_DIR_ENV = 'AVI_OBJECT_CACHE_DIR'
+OBJECT_CACHE_SIZE_ENV = 'AVI_OBJECT_CACHE_SIZE'
+OBJECT_CACHE_TTL_ENV = 'AVI_OBJECT_CACHE_TTL'
+DEFAULT_OBJECT_CACHE_SIZE = 256
+DEFAULT_OBJECT_CACHE_TTL = 300
+
+# Shared objects that are referred by many others but rarely change during a
+# play. They are served from the cache without validation until the ttl.
+STATIC_OBJ_TYPES = ['cloud', 'tenant', 'serviceenginegroup', 'healthmonitor',
+                    'vrfcontext']
+
+# caches of this process by controller
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class AviObjectCache(object):
+    """
+    LRU of objects keyed by tenant, object type, name and the query
+    parameters of the lookup. An entry is revalidated against the
+    _last_modified of the object on the controller before it is returned,
+    except for STATIC_OBJ_TYPES.
+    """
+
+    def __init__(self, cache_file=None, max_size=None, ttl=None):
+        self.cache_file = cache_file
+        self.max_size = int(max_size or DEFAULT_OBJECT_CACHE_SIZE)
+        self.ttl = int(ttl or DEFAULT_OBJECT_CACHE_TTL)
+        self._objs = OrderedDict()
+        # keys updated or removed by this process. Used to merge with the
+        # entries saved by other tasks in the meantime.
+        self._updated = set()
+        self._removed = set()
+        self._invalidated = set()
+        self._lock = threading.RLock()
+        if cache_file:
+            self._objs.update(self._read())
+
+    @staticmethod
+    def make_key(obj_type, name, tenant='', params=None):
+        return '%s/%s/%s?%s' % (tenant or '', obj_type, name,
+                                json.dumps(params or {}, sort_keys=True))
+
+    def _read(self):
+        try:
+            with open(self.cache_file) as f:
+                entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            return []
+        now = time.time()
+        return [(k, v) for k, v in entries
+                if now - v.get('fetched', 0) <= self.ttl]
+
+    def _put(self, key, obj):
+        with self._lock:
+            self._objs.pop(key, None)
+            self._objs[key] = {'obj': obj, 'fetched': time.time()}
+            self._updated.add(key)
+            self._removed.discard(key)
+            while len(self._objs) > self.max_size:
+                self._objs.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._objs.pop(key, None)
+            if not entry:
+                return None
+            if time.time() - entry['fetched'] > self.ttl:
+                self._removed.add(key)
+                return None
+            self._objs[key] = entry
+            return entry
+
+    def get_object_by_name(self, api, obj_type, name, tenant='',
+                           tenant_uuid='', params=None, api_version=None,
+                           validate=None):
+        """
+        Same as ApiSession.get_object_by_name but served from the cache when
+        the object has not changed on the controller.
+        :param validate: check _last_modified of the cached object on the
+            controller. Defaults to True except for STATIC_OBJ_TYPES.
+        :return: copy of the object or None if it does not exist
+        """
+        key = self.make_key(obj_type, name, tenant, params)
+        if validate is None:
+            validate = obj_type not in STATIC_OBJ_TYPES
+        entry = self._lookup(key)
+        if entry:
+            cached = entry['obj']
+            if not validate:
+                return deepcopy(cached)
+            last_modified = cached.get('_last_modified')
+            if last_modified:
+                # the controller only returns the requested fields so this
+                # is much cheaper than fetching the object again.
+                rsp = api.get(obj_type, tenant=tenant, tenant_uuid=tenant_uuid,
+                              params={'name': name,
+                                      'fields': '_last_modified'},
+                              api_version=api_version)
+                if rsp.status_code < 300:
+                    results = rsp.json().get('results', [])
+                    if (results and
+                            results[0].get('_last_modified') == last_modified):
+                        self._put(key, cached)
+                        return deepcopy(cached)
+        obj = api.get_object_by_name(
+            obj_type, name, tenant=tenant, tenant_uuid=tenant_uuid,
+            params=dict(params) if params else None, api_version=api_version)
+        if obj:
+            self._put(key, obj)
+            return deepcopy(obj)
+        self.invalidate(obj_type, name=name)
+        return obj
+
+    def get_obj_uuid(self, api, obj_type, name, tenant='', tenant_uuid='',
+                     api_version=None):
+        """
+        :return: uuid of the object or None if it does not exist. The uuid
+            never changes for a name so it is served without validation.
+        """
+        obj = self.get_object_by_name(
+            api, obj_type, name, tenant=tenant, tenant_uuid=tenant_uuid,
+            api_version=api_version, validate=False)
+        return obj['uuid'] if obj else None
+
+    def invalidate(self, obj_type, name=None, uuid=None):
+        """
+        Drops the cached entries of an object after it is written, also from
+        the cache file on save. All the entries of obj_type are dropped if
+        neither name nor uuid is given.
+        """
+        with self._lock:
+            for key, entry in list(self._objs.items()):
+                if key.split('/', 2)[1] != obj_type:
+                    continue
+                obj = entry['obj']
+                if ((name is None and uuid is None) or
+                        (name is not None and obj.get('name') == name) or
+                        (uuid is not None and obj.get('uuid') == uuid)):
+                    del self._objs[key]
+                    self._removed.add(key)
+            self._invalidated.add((obj_type, name, uuid))
+
+    def save(self):
+        """
+        Merges the entries changed by this process into the cache file. The
+        file is written to a temp file and renamed so that concurrent forks
+        never read a partial file.
+        """
+        if not self.cache_file:
+            return
+        with self._lock:
+            merged = OrderedDict(self._read())
+            for obj_type, name, uuid in self._invalidated:
+                for key, entry in list(merged.items()):
+                    obj = entry.get('obj', {})
+                    if key.split('/', 2)[1] == obj_type and (
+                            (name is None and uuid is None) or
+                            obj.get('name') == name or
+                            (uuid is not None and obj.get('uuid') == uuid)):
+                        del merged[key]
+            for key in self._removed:
+                merged.pop(key, None)
+            for key, entry in self._objs.items():
+                if key in self._updated:
+                    merged.pop(key, None)
+                    merged[key] = entry
+            entries = list(merged.items())[-self.max_size:]
+        cache_dir = os.path.dirname(self.cache_file)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.chmod(tmp_path, 0o600)
+            os.rename(tmp_path, self.cache_file)
+        except (IOError, OSError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def get_object_cache(api_creds):
+    """
+    :param api_creds: AviCredentials
+    :return: AviObjectCache of the controller shared by all the callers of
+        this process. It is persisted for the later tasks when
+        AVI_OBJECT_CACHE_DIR is set.
+    """
+    controller_key = '%s:%s:%s' % (api_creds.controller, api_creds.port or '',
+                                   api_creds.username)
+    with _caches_lock:
+        cache = _caches.get(controller_key)
+        if cache:
+            return cache
+        cache_dir = os.environ.get(OBJECT_CACHE_DIR_ENV, '')
+        cache_file = None
+        if cache_dir:
+            cache_file = os.path.join(
+                os.path.expanduser(cache_dir), '%s.objects.json' %
+                hashlib.sha256(controller_key.encode('utf-8')).hexdigest())
+        cache = AviObjectCache(cache_file,
+                               os.environ.get(OBJECT_CACHE_SIZE_ENV),
+                               os.environ.get(OBJECT_CACHE_TTL_ENV))
+        if cache_file:
+            # modules exit through sys.exit so save the cache on the way out.
+            atexit.register(cache.save)
+        _caches[controller_key] = cache
+        return cache
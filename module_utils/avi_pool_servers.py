@@ -0,0 +1,216 @@
+"""
+# Created on Oct 18, 2026
+#
+# Reconciles the servers of one pool or of a batch of pools. Servers are
+# matched by ip.addr:port and only the servers that differ are sent, as PATCH
+# add and delete.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+from multiprocessing.pool import ThreadPool
+
+from avi.sdk.avi_api import APIError, AviCredentials
+from avi.sdk.utils.ansible_utils import (
+    POP_FIELDS, avi_common_argument_spec, cleanup_absent_fields)
+from ansible.module_utils.avi_api_stats import track_api_stats
+from ansible.module_utils.avi_diff import avi_obj_diff, avi_obj_patch
+from ansible.module_utils.avi_object_cache import get_object_cache
+from ansible.module_utils.avi_session_cache import get_cached_session
+
+# Options of avi_pool that are not fields of the pool.
+SERVERS_OPTIONS = ['servers_state', 'pools', 'concurrency']
+
+DEFAULT_CONCURRENCY = 4
+
+
+def server_key(server, default_port=None):
+    """
+    :param default_port: default_server_port of the pool, the port of the
+        servers without one
+    :return: ip.addr:port of the server. The port is empty for servers
+        without a port when the default port is not known.
+    """
+    return '%s:%s' % ((server.get('ip') or {}).get('addr'),
+                      server.get('port') or default_port or '')
+
+
+def server_delta(servers, existing_servers, servers_state, default_port=None,
+                 existing_default_port=None):
+    """
+    :param servers_state: present adds and updates the servers, absent
+        deletes them and reconcile also deletes the servers of the pool that
+        are not in servers.
+    :param default_port: default_server_port of the pool for servers
+    :param existing_default_port: default_server_port of the pool on the
+        controller for existing_servers
+    :return: tuple of the servers to add, the existing servers to delete and
+        the servers to update
+    """
+    existing = dict((server_key(s, existing_default_port), s)
+                    for s in existing_servers or [])
+    added, deleted, updated = [], [], []
+    keys = set()
+    for server in servers or []:
+        key = server_key(server, default_port)
+        keys.add(key)
+        current = existing.get(key)
+        if servers_state == 'absent':
+            if current is not None:
+                deleted.append(current)
+        elif current is None:
+            added.append(server)
+        elif avi_obj_diff(dict(server, port=None), current):
+            # the ports are the same once the default port is applied
+            updated.append(server)
+    if servers_state == 'reconcile':
+        deleted.extend(s for key, s in existing.items() if key not in keys)
+    return added, deleted, updated
+
+
+def server_patch(servers, existing_servers, servers_state, default_port=None,
+                 existing_default_port=None):
+    """
+    Servers are added and deleted with PATCH add and delete. Servers of the
+    pool can not be changed in place, so when one is updated the whole list
+    is replaced instead.
+    :param default_port: default_server_port of the pool for servers
+    :param existing_default_port: default_server_port of the pool on the
+        controller for existing_servers
+    :return: tuple of the patch data, empty if no server changed, and the
+        counts of the servers added, deleted and updated
+    """
+    added, deleted, updated = server_delta(
+        servers, existing_servers, servers_state, default_port,
+        existing_default_port)
+    counts = dict(added=len(added), deleted=len(deleted),
+                  updated=len(updated))
+    if updated:
+        replaced = dict((server_key(s, default_port), s) for s in updated)
+        gone = set(server_key(s, existing_default_port) for s in deleted)
+        servers = []
+        for server in existing_servers:
+            key = server_key(server, existing_default_port)
+            if key not in gone:
+                servers.append(replaced.get(key, server))
+        servers += added
+        return {'replace': {'servers': cleanup_absent_fields(
+            {'servers': servers}).get('servers', [])}}, counts
+    patch = {}
+    if deleted:
+        patch['delete'] = {'servers': deleted}
+    if added:
+        patch['add'] = {'servers': [cleanup_absent_fields(s) for s in added]}
+    return patch, counts
+
+
+def apply_pool(api, pool, servers_state, tenant, tenant_uuid, api_version,
+               check_mode):
+    """
+    :param pool: fields of the pool with name and servers
+    :return: tuple of (changed, counts, rsp, existing_obj). rsp is the
+        response of the call, or None if nothing was sent.
+    """
+    pool = dict(pool)
+    servers = pool.pop('servers', None) or []
+    name = pool['name']
+    existing_obj = api.get_object_by_name(
+        'pool', name, tenant=tenant, tenant_uuid=tenant_uuid,
+        params={'include_refs': '', 'include_name': ''},
+        api_version=api_version)
+    if not existing_obj:
+        if servers_state == 'absent':
+            return False, dict(added=0, deleted=0, updated=0), None, None
+        counts = dict(added=len(servers), deleted=0, updated=0)
+        if check_mode:
+            return True, counts, None, None
+        pool['servers'] = servers
+        rsp = api.post('pool', data=cleanup_absent_fields(pool),
+                       tenant=tenant, tenant_uuid=tenant_uuid,
+                       api_version=api_version)
+        return True, counts, rsp, None
+    # the fields of the pool and its servers are sent in one PATCH
+    patch = avi_obj_patch(pool, existing_obj)[1]
+    existing_default_port = existing_obj.get('default_server_port')
+    servers_patch, counts = server_patch(
+        servers, existing_obj.get('servers') or [], servers_state,
+        pool.get('default_server_port') or existing_default_port,
+        existing_default_port)
+    for op, fields in servers_patch.items():
+        patch.setdefault(op, {}).update(fields)
+    if check_mode or not patch:
+        return bool(patch), counts, None, existing_obj
+    rsp = api.patch('pool/%s' % existing_obj['uuid'], data=patch,
+                    tenant=tenant, tenant_uuid=tenant_uuid,
+                    api_version=api_version)
+    return True, counts, rsp, existing_obj
+
+
+def avi_pool_servers_api(module):
+    """
+    Applies the servers of the pool of the module, or of every pool in
+    pools, with servers_state. Pools of a batch are applied concurrently.
+    :param module: AnsibleModule of avi_pool
+    """
+    track_api_stats(module)
+    api_creds = AviCredentials()
+    api_creds.update_from_ansible_module(module)
+    api = get_cached_session(api_creds, socket_path=module._socket_path,
+                             verify=getattr(api_creds, 'verify', False))
+    params = module.params
+    tenant = api_creds.tenant
+    tenant_uuid = api_creds.tenant_uuid
+    api_version = api_creds.api_version
+    servers_state = params.get('servers_state') or 'reconcile'
+    if params.get('pools'):
+        pools = params['pools']
+        for pool in pools:
+            if not isinstance(pool, dict) or not pool.get('name'):
+                return module.fail_json(
+                    msg='Every entry in pools requires name: %s' % pool)
+    else:
+        skip = set(POP_FIELDS) | set(avi_common_argument_spec()) | set(
+            SERVERS_OPTIONS)
+        pools = [dict((k, v) for k, v in params.items()
+                      if k not in skip and v is not None)]
+    object_cache = get_object_cache(api_creds)
+
+    def apply_index(i):
+        pool = dict(pools[i])
+        state = pool.pop('servers_state', None) or servers_state
+        return apply_pool(api, pool, state, tenant, tenant_uuid, api_version,
+                          module.check_mode)
+
+    workers = ThreadPool(max(1, min(
+        len(pools), params.get('concurrency') or DEFAULT_CONCURRENCY)))
+    try:
+        applied = workers.map(apply_index, range(len(pools)))
+    except APIError as e:
+        return module.fail_json(msg=str(e))
+    finally:
+        workers.close()
+        workers.join()
+
+    results = []
+    for pool, (changed, counts, rsp, existing_obj) in zip(pools, applied):
+        if changed and not module.check_mode:
+            object_cache.invalidate('pool', name=pool['name'])
+        if rsp is not None and rsp.status_code > 299:
+            return module.fail_json(
+                msg='Error %d Msg %s for pool %s' % (
+                    rsp.status_code, rsp.text, pool['name']),
+                obj=results)
+        obj = rsp.json() if rsp is not None else existing_obj
+        results.append(dict(name=pool['name'], changed=changed,
+                            servers=counts, obj=obj))
+    if not params.get('pools'):
+        result = results[0]
+        return module.exit_json(changed=result['changed'], obj=result['obj'],
+                                servers=result['servers'])
+    for result in results:
+        # only the identity of the pools is returned for batches
+        obj = result.pop('obj') or {}
+        result['uuid'] = obj.get('uuid')
+    return module.exit_json(changed=any(r['changed'] for r in results),
+                            obj=results)
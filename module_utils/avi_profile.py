@@ -0,0 +1,124 @@
+"""
+# Created on Oct 18, 2026
+#
+# Opt-in profiling of the main() of a module with cProfile. Set
+# AVI_PROFILE_DIR to write a profile per task to that directory and
+# AVI_PROFILE_TOP to return the top functions in profile of the module
+# result.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+import cProfile
+import functools
+import os
+import pstats
+import re
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.six import StringIO
+
+PROFILE_DIR_ENV = 'AVI_PROFILE_DIR'
+PROFILE_TOP_ENV = 'AVI_PROFILE_TOP'
+# cumulative, tottime or calls
+PROFILE_SORT_ENV = 'AVI_PROFILE_SORT'
+# wall profiles the elapsed time, cpu only the time spent on the CPU
+PROFILE_CLOCK_ENV = 'AVI_PROFILE_CLOCK'
+
+
+def cpu_time():
+    if hasattr(time, 'process_time'):
+        return time.process_time()
+    # python 2
+    times = os.times()
+    return times[0] + times[1]
+
+
+def profile_path(profile_dir, module_name, name):
+    """
+    :return: path of the profile of a task, unique per process
+    """
+    label = module_name
+    if name:
+        label = '%s-%s' % (label, re.sub(r'[^\w.-]', '_', str(name))[:64])
+    return os.path.join(os.path.expanduser(profile_dir), '%s-%d-%d.prof' % (
+        label, int(time.time() * 1000), os.getpid()))
+
+
+def top_functions(profiler, sort, top):
+    """
+    :return: list of the top functions with their number of calls, own time
+        and cumulative time in seconds
+    """
+    stats = pstats.Stats(profiler, stream=StringIO())
+    stats.sort_stats(sort)
+    result = []
+    for func in stats.fcn_list[:top]:
+        calls, _, tottime, cumtime, _ = stats.stats[func]
+        result.append(dict(function='%s:%d(%s)' % func, calls=calls,
+                           tottime=round(tottime, 6),
+                           cumtime=round(cumtime, 6)))
+    return result
+
+
+def profile_main(main):
+    """
+    :param main: main() of a module
+    :return: main run under cProfile when AVI_PROFILE_DIR or AVI_PROFILE_TOP
+        is set, else main. The profile covers the argument spec validation
+        of AnsibleModule and ends when the module exits. The wall and CPU
+        time of main are returned in profile of the result, so that time
+        spent waiting for the controller can be told apart from local work.
+    """
+    profile_dir = os.environ.get(PROFILE_DIR_ENV)
+    top = int(os.environ.get(PROFILE_TOP_ENV) or 0)
+    if not (profile_dir or top):
+        return main
+    sort = os.environ.get(PROFILE_SORT_ENV) or 'cumulative'
+    clock = os.environ.get(PROFILE_CLOCK_ENV) or 'wall'
+    module_name = os.path.splitext(os.path.basename(
+        main.__globals__.get('__file__') or main.__module__))[0]
+
+    @functools.wraps(main)
+    def profiled_main(*args, **kwargs):
+        if clock == 'cpu':
+            profiler = cProfile.Profile(cpu_time)
+        else:
+            profiler = cProfile.Profile()
+        exit_json = AnsibleModule.exit_json
+        fail_json = AnsibleModule.fail_json
+        start = (time.time(), cpu_time())
+
+        def with_profile(fn):
+            def exit_with_profile(module, **result):
+                profiler.disable()
+                profile = dict(wall_time=round(time.time() - start[0], 6),
+                               cpu_time=round(cpu_time() - start[1], 6))
+                if profile_dir:
+                    # params is not set when the argument spec fails
+                    params = getattr(module, 'params', None) or {}
+                    path = profile_path(profile_dir, module_name,
+                                        params.get('name'))
+                    try:
+                        profiler.dump_stats(path)
+                        profile['file'] = path
+                    except (IOError, OSError) as e:
+                        module.warn('Fail to write profile %s: %s' % (
+                            path, e))
+                if top:
+                    profile['top'] = top_functions(profiler, sort, top)
+                result['profile'] = profile
+                return fn(module, **result)
+            return exit_with_profile
+        AnsibleModule.exit_json = with_profile(exit_json)
+        AnsibleModule.fail_json = with_profile(fail_json)
+        profiler.enable()
+        try:
+            return main(*args, **kwargs)
+        finally:
+            profiler.disable()
+            AnsibleModule.exit_json = exit_json
+            AnsibleModule.fail_json = fail_json
+    return profiled_main
@@ -0,0 +1,310 @@
+"""
+# Created on Oct 18, 2026
+#
+# Client side rate limiting of the API calls of a session. A token bucket
+# shared by the forks of a playbook run bounds the request rate, an AIMD
+# window adapts the concurrent calls of a process to the load of the
+# controller and calls the controller rejects with 429 or 503 are retried
+# with jittered backoff honoring Retry-After.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # no lock file on windows, the bucket is per process
+    fcntl = None
+
+from ansible.module_utils.avi_api_stats import count_retry
+from ansible.module_utils.six import binary_type, string_types
+
+# requests per second of all the forks sharing AVI_API_RATE_LIMIT_FILE
+RATE_LIMIT_ENV = 'AVI_API_RATE_LIMIT'
+RATE_BURST_ENV = 'AVI_API_RATE_BURST'
+RATE_LIMIT_FILE_ENV = 'AVI_API_RATE_LIMIT_FILE'
+# upper bound of the concurrent API calls of a process
+CONCURRENCY_ENV = 'AVI_API_CONCURRENCY'
+RETRIES_ENV = 'AVI_API_RETRIES'
+RETRY_BACKOFF_ENV = 'AVI_API_RETRY_BACKOFF'
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+# longest Retry-After that is honored
+MAX_RETRY_AFTER = 300.0
+
+OVERLOAD_STATUS = (429, 503)
+# a 429 or 503 does not tell whether the controller applied the request, so
+# only the idempotent methods are sent again.
+IDEMPOTENT_METHODS = ('get', 'put', 'delete', 'head', 'options')
+
+
+def retry_after(rsp):
+    """
+    :return: seconds of the Retry-After header of the response or None
+    """
+    headers = getattr(rsp, 'headers', None) or {}
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(date) - time.time())
+
+
+def resendable(data):
+    """
+    :return: True if the body can be sent again, a MultipartEncoder of a file
+        upload is consumed by the first attempt.
+    """
+    return data is None or isinstance(
+        data, (dict, list, binary_type) + string_types)
+
+
+class TokenBucket(object):
+    """
+    Token bucket of rate requests per second holding up to burst tokens. With
+    a state file the bucket is kept in the file under an flock so that all
+    the processes using the file share it.
+    """
+
+    def __init__(self, rate, burst=None, state_file=None):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst or rate))
+        self.state_file = state_file if fcntl else None
+        self.lock = threading.Lock()
+        self.state = self.initial_state()
+
+    def initial_state(self):
+        return dict(tokens=self.burst, stamp=time.time(), blocked_until=0.0)
+
+    def _take(self, state, now):
+        """
+        :return: seconds to wait for a token, 0 if one was taken
+        """
+        state['tokens'] = min(self.burst, state['tokens'] + max(
+            0.0, now - state['stamp']) * self.rate)
+        state['stamp'] = now
+        if now < state.get('blocked_until', 0.0):
+            return state['blocked_until'] - now
+        if state['tokens'] >= 1.0:
+            state['tokens'] -= 1.0
+            return 0.0
+        return (1.0 - state['tokens']) / self.rate
+
+    def _block(self, state, now, until):
+        state['blocked_until'] = max(state.get('blocked_until', 0.0), until)
+        return 0.0
+
+    def _update(self, fn, *args):
+        with self.lock:
+            now = time.time()
+            if not self.state_file:
+                return fn(self.state, now, *args)
+            with open(self.state_file, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        state = json.load(f)
+                    except ValueError:
+                        state = self.initial_state()
+                    result = fn(state, now, *args)
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(state, f)
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                return result
+
+    def acquire(self):
+        """
+        Waits for a token.
+        """
+        while True:
+            wait = self._update(self._take)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def block(self, seconds):
+        """
+        Holds back the tokens of all the users of the bucket for seconds,
+        like the Retry-After of the controller asks.
+        """
+        self._update(self._block, time.time() + seconds)
+
+
+class AimdWindow(object):
+    """
+    Limit of the concurrent calls of a process. The limit grows by one per
+    window of successful calls and is halved when the controller is
+    overloaded, at most once per window: calls that started before the last
+    decrease do not decrease it again.
+    """
+
+    def __init__(self, max_limit):
+        self.max_limit = max(1, int(max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.issued = 0
+        self.decreased_at = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        """
+        :return: sequence number of the call for release
+        """
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+            self.issued += 1
+            return self.issued
+
+    def release(self, seq, overloaded):
+        with self.cond:
+            self.in_flight -= 1
+            if overloaded:
+                if seq > self.decreased_at:
+                    self.limit = max(1.0, self.limit / 2)
+                    self.decreased_at = self.issued
+            else:
+                self.limit = min(float(self.max_limit),
+                                 self.limit + 1.0 / self.limit)
+            self.cond.notify_all()
+
+
+class AviThrottle(object):
+    """
+    Rate limit, adaptive concurrency and retries of the API calls of the
+    sessions of a process.
+    """
+
+    def __init__(self, rate=None, burst=None, state_file=None,
+                 concurrency=DEFAULT_CONCURRENCY, retries=0,
+                 backoff=DEFAULT_BACKOFF):
+        self.bucket = TokenBucket(rate, burst, state_file) if rate else None
+        self.window = AimdWindow(concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        """
+        :return: AviThrottle if AVI_API_RATE_LIMIT or AVI_API_RETRIES is set
+            else None
+        """
+        rate = float(os.environ.get(RATE_LIMIT_ENV) or 0)
+        retries = int(os.environ.get(RETRIES_ENV) or 0)
+        if rate <= 0 and retries <= 0:
+            return None
+        return cls(rate=rate if rate > 0 else None,
+                   burst=os.environ.get(RATE_BURST_ENV),
+                   state_file=os.environ.get(RATE_LIMIT_FILE_ENV),
+                   concurrency=int(os.environ.get(CONCURRENCY_ENV) or
+                                   DEFAULT_CONCURRENCY),
+                   retries=max(0, retries),
+                   backoff=float(os.environ.get(RETRY_BACKOFF_ENV) or
+                                 DEFAULT_BACKOFF))
+
+    def retry_delay(self, rsp, attempt):
+        """
+        :return: Retry-After of the response or a full jitter backoff
+        """
+        delay = retry_after(rsp)
+        if delay is not None:
+            return min(delay, MAX_RETRY_AFTER) + random.uniform(
+                0, self.backoff)
+        return random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt))
+
+    def call(self, api_fn, api_name, path, *args, **kwargs):
+        """
+        Sends the call of api_fn through the rate limit and the window and
+        sends it again when the controller is overloaded.
+        """
+        # calls the SDK sends within a call, like after a new login, already
+        # hold a token and a slot of the window.
+        if getattr(self.local, 'active', False):
+            return api_fn(api_name, path, *args, **kwargs)
+        data = kwargs.get('data', args[2] if len(args) > 2 else None)
+        retries = self.retries if resendable(data) else 0
+        attempt = 0
+        while True:
+            if self.bucket:
+                self.bucket.acquire()
+            seq = self.window.acquire()
+            self.local.active = True
+            overloaded = False
+            try:
+                rsp = api_fn(api_name, path, *args, **kwargs)
+                overloaded = rsp.status_code in OVERLOAD_STATUS
+            finally:
+                self.local.active = False
+                self.window.release(seq, overloaded)
+            if (not overloaded or attempt >= retries or
+                    api_name.lower() not in IDEMPOTENT_METHODS):
+                return rsp
+            delay = self.retry_delay(rsp, attempt)
+            if self.bucket and retry_after(rsp) is not None:
+                self.bucket.block(delay)
+            count_retry()
+            time.sleep(delay)
+            attempt += 1
+
+
+_throttle = {}
+
+
+def get_throttle():
+    """
+    :return: AviThrottle of the process for the AVI_API_* settings of the
+        environment, None if they are not set.
+    """
+    key = tuple(os.environ.get(env) for env in (
+        RATE_LIMIT_ENV, RATE_BURST_ENV, RATE_LIMIT_FILE_ENV, CONCURRENCY_ENV,
+        RETRIES_ENV, RETRY_BACKOFF_ENV))
+    if key not in _throttle:
+        _throttle[key] = AviThrottle.from_env()
+    return _throttle[key]
+
+
+def throttle_session(api):
+    """
+    Sends the API calls of the session through the throttle of the process.
+    A session reused by a later task follows the settings of that task.
+    :param api: ApiSession or AviConnectionSession
+    :return: api
+    """
+    throttle = get_throttle()
+    if api.__dict__.get('_avi_throttle') is throttle:
+        return api
+    if throttle is None:
+        api.__dict__.pop('_api', None)
+        api.__dict__.pop('_avi_throttle', None)
+        return api
+
+    def throttled_api(api_name, path, *args, **kwargs):
+        # looked up on the class on every call to go through the hooks of
+        # avi_api_stats.
+        return throttle.call(type(api)._api.__get__(api), api_name, path,
+                             *args, **kwargs)
+    api._api = throttled_api
+    api._avi_throttle = throttle
+    return api
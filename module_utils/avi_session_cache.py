@@ -0,0 +1,192 @@
+"""
+# Created on Oct 18, 2026
+#
+# On-disk cache of Avi controller login sessions shared across module
+# invocations of a playbook run.
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+import atexit
+import errno
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+
+from avi.sdk import avi_api
+from avi.sdk.avi_api import ApiSession
+from ansible.module_utils.avi_connection import AviConnectionSession
+from ansible.module_utils.avi_rate_limit import throttle_session
+
+# The cache is disabled unless a directory is configured. Sessions are stored
+# one file per controller/user/tenant/api_version with 0600 permissions.
+# The password or token is only kept as an HMAC with the random salt of the
+# cache directory.
+SESSION_CACHE_DIR_ENV = 'AVI_SESSION_CACHE_DIR'
+SESSION_CACHE_TTL_ENV = 'AVI_SESSION_CACHE_TTL'
+
+
+class AviSessionCache(object):
+    """
+    Stores the sessionid and csrftoken cookies of an authenticated
+    ApiSession so that later tasks can reuse them instead of calling /login.
+    """
+
+    def __init__(self, cache_dir, ttl=None):
+        self.cache_dir = cache_dir
+        self.ttl = int(ttl) if ttl else ApiSession.SESSION_CACHE_EXPIRY
+
+    @classmethod
+    def from_env(cls):
+        """
+        :return: AviSessionCache if AVI_SESSION_CACHE_DIR is set else None
+        """
+        cache_dir = os.environ.get(SESSION_CACHE_DIR_ENV, '')
+        if not cache_dir:
+            return None
+        return cls(os.path.expanduser(cache_dir),
+                   os.environ.get(SESSION_CACHE_TTL_ENV))
+
+    @staticmethod
+    def make_key(api_creds):
+        """
+        The key only names the login, the password and token are checked
+        with the secret of the entry.
+        """
+        key = '%s:%s:%s:%s:%s' % (
+            api_creds.controller, api_creds.port or '', api_creds.username,
+            api_creds.tenant or '', api_creds.api_version or '')
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, '%s.json' % key)
+
+    def _salt(self):
+        """
+        :return: random salt of the cache directory, created by the first
+            task that needs it
+        """
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir, 0o700)
+        salt_path = os.path.join(self.cache_dir, 'salt')
+        try:
+            fd = os.open(salt_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                         0o600)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(os.urandom(32))
+        with open(salt_path, 'rb') as f:
+            return f.read()
+
+    def secret(self, api_creds):
+        """
+        :return: HMAC of the password and token of api_creds with the salt
+            of the cache directory
+        """
+        secret = '%s:%s' % (api_creds.password or '', api_creds.token or '')
+        return hmac.new(self._salt(), secret.encode('utf-8'),
+                        hashlib.sha256).hexdigest()
+
+    def load(self, key, secret=None):
+        """
+        :param secret: secret of the credentials, see secret
+        :return: dict with session_id and csrftoken or None on a miss, if
+            the entry is older than the ttl or of other credentials.
+        """
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if time.time() - entry.get('last_used', 0) > self.ttl:
+            self.invalidate(key)
+            return None
+        if not (entry.get('session_id') and entry.get('csrftoken')):
+            return None
+        if not hmac.compare_digest(str(entry.get('secret')), str(secret)):
+            return None
+        return entry
+
+    def save(self, key, session_id, csrftoken, secret=None):
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir, 0o700)
+        entry = {'session_id': session_id, 'csrftoken': csrftoken,
+                 'secret': secret, 'last_used': time.time()}
+        # write to a temp file and rename so that concurrent forks never read
+        # a partially written entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.chmod(tmp_path, 0o600)
+            os.rename(tmp_path, self._path(key))
+        except (IOError, OSError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def invalidate(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def store_session(self, key, api, secret=None):
+        """
+        Persists the current cookies of the session. The SDK re-authenticates
+        on 401/419, so this also replaces a session that went stale. A session
+        that could not re-authenticate is dropped from the cache.
+        """
+        context = api.get_context()
+        # reset_session marks the session as disconnected until the login
+        # succeeds. Sessions seeded from the cache carry no such flag.
+        session = avi_api.sessionDict.get(getattr(api, 'key', None), {})
+        if (session.get('connected', True) is not False and
+                context.get('session_id') and context.get('csrftoken')):
+            self.save(key, context['session_id'], context['csrftoken'],
+                      secret)
+        else:
+            self.invalidate(key)
+
+
+def get_cached_session(api_creds, socket_path=None, **kwargs):
+    """
+    Drop-in replacement for ApiSession.get_session that reuses the login
+    persisted by an earlier task when AVI_SESSION_CACHE_DIR is set.
+    :param api_creds: AviCredentials
+    :param socket_path: socket of the avi connection of the task. API calls
+        are sent over the connection when it is given.
+    :param kwargs: additional arguments for ApiSession.get_session
+    :return: ApiSession, throttled when AVI_API_RATE_LIMIT or AVI_API_RETRIES
+        is set
+    """
+    if socket_path:
+        return throttle_session(AviConnectionSession(
+            socket_path, api_creds, verify=kwargs.get('verify', False)))
+    session_args = dict(
+        password=api_creds.password, timeout=api_creds.timeout,
+        tenant=api_creds.tenant, tenant_uuid=api_creds.tenant_uuid,
+        token=api_creds.token, port=api_creds.port)
+    session_args.update(kwargs)
+    cache = AviSessionCache.from_env()
+    if (cache is None or getattr(api_creds, 'idp_class', None) or
+            getattr(api_creds, 'csp_token', None)):
+        return throttle_session(ApiSession.get_session(
+            api_creds.controller, api_creds.username, **session_args))
+    key = cache.make_key(api_creds)
+    secret = cache.secret(api_creds)
+    entry = cache.load(key, secret)
+    if entry:
+        session_args.update(session_id=entry['session_id'],
+                            csrftoken=entry['csrftoken'])
+    api = ApiSession.get_session(
+        api_creds.controller, api_creds.username, **session_args)
+    # modules exit through sys.exit so persist the cookies on the way out.
+    atexit.register(cache.store_session, key, api, secret)
+    return throttle_session(api)
@@ -0,0 +1,332 @@
+"""
+# Created on Oct 18, 2026
+#
+# Benchmarks of the modules replayed from the cassettes of ansible_tests.py.
+# Every HTTP request is delayed by the injected latency, and the wall time,
+# API calls, bytes sent and received and the RSS growth of every module are
+# measured. Every round runs in a forked process. A forked process starts
+# with the resident memory of this process, so the memory of a module is the
+# growth of its peak RSS over the RSS it had when it was forked.
+#
+#   python benchmarks.py --latency 0.05 --rounds 3 --json results.json
+#   python benchmarks.py --latency 0.05 --compare results.json
+#
+# or with pytest, configured with AVI_BENCHMARK_LATENCY, AVI_BENCHMARK_ROUNDS
+# and AVI_BENCHMARK_JSON:
+#
+#   pytest ./benchmarks.py -m benchmark
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import pytest
+from requests.adapters import HTTPAdapter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CASSETTE_DIR = os.path.join(HERE, 'fixtures', 'cassettes')
+
+# The cassettes were recorded against this controller, see .travis.yml
+for _name, _value in (('AVI_CONTROLLER', '10.79.169.56'),
+                      ('AVI_USERNAME', 'admin'),
+                      ('AVI_PASSWORD', 'password'),
+                      ('API_VERSION', '18.2.8')):
+    os.environ.setdefault(_name, _value)
+
+import ansible_tests  # noqa: E402
+
+
+class ApiStats(object):
+    """
+    Counts the requests sent through requests, and the bytes of their bodies,
+    while it is entered. Every request is delayed by latency seconds before
+    it is replayed.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._send = None
+
+    @property
+    def api_calls(self):
+        return sum(self.calls.values())
+
+    def __enter__(self):
+        self._send = HTTPAdapter.send
+        stats = self
+
+        def send(adapter, request, **kwargs):
+            if stats.latency:
+                time.sleep(stats.latency)
+            rsp = stats._send(adapter, request, **kwargs)
+            stats.calls[request.method] = stats.calls.get(request.method, 0) + 1
+            stats.bytes_sent += len(request.body or b'')
+            if kwargs.get('stream'):
+                stats.bytes_received += int(
+                    rsp.headers.get('content-length') or 0)
+            else:
+                stats.bytes_received += len(rsp.content or b'')
+            return rsp
+
+        HTTPAdapter.send = send
+        return self
+
+    def __exit__(self, *exc_info):
+        HTTPAdapter.send = self._send
+
+
+def benchmark_names():
+    """
+    :return: names of the tests of ansible_tests.py that have a cassette
+    """
+    return sorted(name for name in dir(ansible_tests.test_ansible_modules)
+                  if name.startswith('test_') and
+                  os.path.isfile(os.path.join(CASSETTE_DIR, name)))
+
+
+def peak_rss_kb():
+    """
+    :return: peak RSS of this process. In a forked process it includes the
+        memory of the parent at the time of the fork.
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run_round(name, latency):
+    """
+    Runs the test name of ansible_tests.py once.
+    :return: dict of the measurements of the round. rss_growth_kb is how
+        much the peak RSS grew over the peak RSS at the start of the round.
+    """
+    baseline_rss_kb = peak_rss_kb()
+    case = ansible_tests.test_ansible_modules(name)
+    cwd = os.getcwd()
+    # the cassette library of ansible_tests.py is relative to this directory
+    os.chdir(HERE)
+    try:
+        case.setUp()
+        with ApiStats(latency) as stats:
+            start = time.time()
+            getattr(case, name)()
+            wall_time = time.time() - start
+    finally:
+        case.doCleanups()
+        os.chdir(cwd)
+    return dict(wall_time=wall_time, api_calls=stats.api_calls,
+                calls_by_method=stats.calls, bytes_sent=stats.bytes_sent,
+                bytes_received=stats.bytes_received,
+                rss_growth_kb=peak_rss_kb() - baseline_rss_kb)
+
+
+def run_isolated(func, *args):
+    """
+    Calls func in a forked process with stdout discarded, where there is no
+    fork it is called in this process. The forked process starts with the
+    memory of this process, so its peak RSS is not that of func alone.
+    :return: the return value of func, it has to be serializable to JSON
+    """
+    if not hasattr(os, 'fork'):
+        return func(*args)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        status = 0
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            result = dict(result=func(*args))
+        except BaseException as e:
+            result = dict(error='%s: %s' % (type(e).__name__, e))
+            status = 1
+        with os.fdopen(write_fd, 'w') as f:
+            json.dump(result, f)
+        os._exit(status)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        data = f.read()
+    os.waitpid(pid, 0)
+    result = json.loads(data) if data else dict(error='no result')
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result['result']
+
+
+def time_stats(times):
+    times = sorted(times)
+    n = len(times)
+    mean = sum(times) / n
+    median = (times[(n - 1) // 2] + times[n // 2]) / 2
+    stddev = (sum((t - mean) ** 2 for t in times) / (n - 1)) ** 0.5 \
+        if n > 1 else 0.0
+    return dict(min=times[0], max=times[-1], mean=mean, median=median,
+                stddev=stddev, rounds=n, total=sum(times))
+
+
+def benchmark(name, latency=0.0, rounds=1):
+    """
+    :return: dict of the benchmark of the test name. stats has the wall
+        times of the rounds and extra_info the API calls of the last round
+        and the highest RSS growth.
+    """
+    measured = [run_isolated(run_round, name, latency)
+                for _ in range(rounds)]
+    last = measured[-1]
+    return dict(
+        name=name, fullname='benchmarks.py::%s[%s]' % (name, latency),
+        group='latency=%s' % latency, params=dict(latency=latency),
+        stats=time_stats([m['wall_time'] for m in measured]),
+        extra_info=dict(
+            api_calls=last['api_calls'],
+            calls_by_method=last['calls_by_method'],
+            bytes_sent=last['bytes_sent'],
+            bytes_received=last['bytes_received'],
+            rss_growth_kb=max(m['rss_growth_kb'] for m in measured)))
+
+
+def versions():
+    result = dict(python=platform.python_version())
+    try:
+        from avi.sdk import __version__ as avisdk_version
+        result['avisdk'] = avisdk_version
+    except ImportError:
+        pass
+    try:
+        from ansible import __version__ as ansible_version
+        result['ansible'] = ansible_version
+    except ImportError:
+        pass
+    return result
+
+
+def results_doc(benchmarks):
+    return dict(
+        machine_info=dict(node=platform.node(), machine=platform.machine(),
+                          system=platform.system(),
+                          release=platform.release(),
+                          python_implementation=(
+                              platform.python_implementation())),
+        versions=versions(), benchmarks=benchmarks,
+        datetime=datetime.datetime.utcnow().isoformat())
+
+
+def write_results(path, benchmarks):
+    with open(path, 'w') as f:
+        json.dump(results_doc(benchmarks), f, indent=2, sort_keys=True)
+
+
+def compare(benchmarks, baseline, threshold=0.1):
+    """
+    :param baseline: results loaded from an earlier run
+    :param threshold: relative increase of the median wall time that is a
+        regression
+    :return: list of the regressions against the benchmarks of baseline with
+        the same name and latency. More API calls or bytes are always a
+        regression.
+    """
+    base = dict(((b['name'], b['params']['latency']), b)
+                for b in baseline.get('benchmarks', []))
+    regressions = []
+    for bench in benchmarks:
+        old = base.get((bench['name'], bench['params']['latency']))
+        if old is None:
+            continue
+        median, old_median = bench['stats']['median'], old['stats']['median']
+        if median > old_median * (1 + threshold):
+            regressions.append('%s: median %.3fs was %.3fs' % (
+                bench['name'], median, old_median))
+        for field in ('api_calls', 'bytes_sent', 'bytes_received'):
+            value = bench['extra_info'][field]
+            old_value = old['extra_info'][field]
+            if value > old_value:
+                regressions.append('%s: %s %d was %d' % (
+                    bench['name'], field, value, old_value))
+    return regressions
+
+
+def print_table(benchmarks, out=sys.stdout):
+    row = '%-36s %10s %10s %6s %12s %12s %10s'
+    print(row % ('name', 'median(s)', 'max(s)', 'calls', 'sent(B)',
+                 'recv(B)', 'rss+(KB)'), file=out)
+    for b in benchmarks:
+        info = b['extra_info']
+        print(row % (b['name'], '%.4f' % b['stats']['median'],
+                     '%.4f' % b['stats']['max'], info['api_calls'],
+                     info['bytes_sent'], info['bytes_received'],
+                     info['rss_growth_kb']), file=out)
+
+
+_results = []
+
+
+@pytest.fixture(scope='module')
+def benchmark_results():
+    yield _results
+    if os.environ.get('AVI_BENCHMARK_JSON') and _results:
+        write_results(os.environ['AVI_BENCHMARK_JSON'], _results)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('name', benchmark_names())
+def test_benchmark(name, benchmark_results):
+    result = benchmark(
+        name, latency=float(os.environ.get('AVI_BENCHMARK_LATENCY', 0)),
+        rounds=int(os.environ.get('AVI_BENCHMARK_ROUNDS', 1)))
+    benchmark_results.append(result)
+    assert result['extra_info']['api_calls'] > 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the modules replayed from the cassettes.')
+    parser.add_argument('names', nargs='*',
+                        help='tests of ansible_tests.py, default all')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every API call')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--json', help='file the results are written to')
+    parser.add_argument('--compare', help='results of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative increase of the median that fails '
+                             'the compare')
+    args = parser.parse_args(argv)
+    names = args.names or benchmark_names()
+    benchmarks = []
+    failed = []
+    for name in names:
+        try:
+            benchmarks.append(benchmark(name, args.latency, args.rounds))
+        except RuntimeError as e:
+            failed.append('%s: %s' % (name, e))
+    print_table(benchmarks)
+    if args.json:
+        write_results(args.json, benchmarks)
+    for msg in failed:
+        print('FAILED %s' % msg, file=sys.stderr)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(benchmarks, json.load(f), args.threshold)
+        for msg in regressions:
+            print('REGRESSION %s' % msg, file=sys.stderr)
+    return 1 if failed or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import json
+import os
+import sys
+
+import ansible.module_utils
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Role level module_utils are only added to ansible.module_utils by ansible
+# when the role is in play. Make them importable for the unit tests as well.
+ansible.module_utils.__path__.append(
+    os.path.join(HERE, '..', '..', 'module_utils'))
+# library/ of the role
+sys.path.insert(0, os.path.join(HERE, '..', '..'))
+
+
+class AnsibleExitJson(Exception):
+    """Exception class to be raised by module.exit_json and caught by the test case"""
+    pass
+
+
+class AnsibleFailJson(Exception):
+    """Exception class to be raised by module.fail_json and caught by the test case"""
+    pass
+
+
+class AnsibleModules:
+    """
+    Same as baseModules.AnsibleModules for the tests that run on python 3.
+    """
+
+    def exit_json(*args, **kwargs):
+        """function to patch over exit_json; package return data into an exception"""
+        if 'changed' not in kwargs:
+            kwargs['changed'] = False
+        raise AnsibleExitJson(kwargs)
+
+    def fail_json(*args, **kwargs):
+        """function to patch over fail_json; package return data into an exception"""
+        kwargs['failed'] = True
+        raise AnsibleFailJson(kwargs)
+
+
+def set_module_args(args):
+    """prepare arguments so that they will be picked up during module creation"""
+    from ansible.module_utils import basic
+    from ansible.module_utils._text import to_bytes
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps({'ANSIBLE_MODULE_ARGS': args}))
+    # newer ansible only reads _ANSIBLE_ARGS with the legacy profile
+    basic._ANSIBLE_PROFILE = 'legacy'
@@ -0,0 +1,842 @@
+"""
+# Created on Oct 18, 2026
+#
+# In-memory stand-in of an Avi controller for load and scale tests of the
+# modules without a controller. It serves the REST API the modules use:
+# login and CSRF, collections with name, include_name, fields and paging,
+# CRUD by uuid, PATCH add, replace and delete, fileservice uploads and
+# downloads and cluster/runtime. Every request can be delayed and errors can
+# be injected at random, by rule or when too many requests are in flight.
+#
+#   python local_controller.py --port 8080 --latency 0.02 \
+#       --populate pool:100000 --error-rate 0.01
+#
+# and point the modules at it with controller: http://127.0.0.1:8080. From
+# Python:
+#
+#   controller = AviController(latency=0.02).start()
+#   controller.populate('pool', 10000)
+#   ... controller.url ...
+#   controller.stop()
+#
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+"""
+
+from __future__ import print_function
+
+import argparse
+import copy
+import hashlib
+import json
+import random
+import re
+import ssl
+import threading
+import time
+import uuid as uuid_mod
+from collections import OrderedDict
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from http.cookies import SimpleCookie
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from Cookie import SimpleCookie
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+# Objects that are a single object instead of a collection.
+SINGLETON_OBJ_TYPES = ['cluster', 'controllerproperties', 'seproperties',
+                       'systemconfiguration']
+
+# Objects that do not belong to a tenant.
+NO_TENANT_OBJ_TYPES = ['tenant'] + SINGLETON_OBJ_TYPES
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+REF_RE = re.compile(
+    r'^(?:https?://[^/]+)?/api/(\w+)(?:/([^?#/]+))?(?:\?([^#]*))?(?:#.*)?$')
+FILE_URI_RE = re.compile(r'^controller://(.+)$')
+
+
+class ApiError(Exception):
+    def __init__(self, status, msg, headers=None):
+        super(ApiError, self).__init__(msg)
+        self.status = status
+        self.msg = msg
+        self.headers = headers or []
+
+
+def is_ref_field(key):
+    return key.endswith('_ref') or key.endswith('_refs')
+
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def matches(element, member):
+    """
+    :return: True if member has every field of element with the same value
+    """
+    if isinstance(element, dict) and isinstance(member, dict):
+        return all(k in member and matches(v, member[k])
+                   for k, v in element.items())
+    return element == member
+
+
+def patch_add(obj, data):
+    for key, value in data.items():
+        current = obj.get(key)
+        if isinstance(value, list) and isinstance(current, list):
+            present = set(canonical(m) for m in current)
+            obj[key] = current + [e for e in value
+                                  if canonical(e) not in present]
+        elif isinstance(value, dict) and isinstance(current, dict):
+            patch_add(current, value)
+        else:
+            obj[key] = value
+
+
+def patch_delete(obj, data):
+    for key, value in data.items():
+        current = obj.get(key)
+        if isinstance(value, list) and isinstance(current, list):
+            exact = set(canonical(e) for e in value)
+            kept = [m for m in current if canonical(m) not in exact]
+            # elements that are not equal to a member delete the members
+            # that have all of their fields
+            partial = [e for e in value if isinstance(e, dict)]
+            if partial and len(current) - len(kept) < len(value):
+                kept = [m for m in kept
+                        if not any(matches(e, m) for e in partial)]
+            obj[key] = kept
+        elif isinstance(value, dict) and isinstance(current, dict) and value:
+            patch_delete(current, value)
+        else:
+            obj.pop(key, None)
+
+
+def json_patch(obj, ops):
+    """
+    Applies the add, replace and remove operations of a JSON patch.
+    """
+    for op in ops:
+        parts = [p.replace('~1', '/').replace('~0', '~')
+                 for p in op['path'].split('/')[1:]]
+        parent = obj
+        try:
+            for part in parts[:-1]:
+                parent = parent[int(part) if isinstance(parent, list)
+                                else part]
+            last = parts[-1]
+            if isinstance(parent, list):
+                index = len(parent) if last == '-' else int(last)
+                if op['op'] == 'add':
+                    parent.insert(index, op['value'])
+                elif op['op'] == 'replace':
+                    parent[index] = op['value']
+                elif op['op'] == 'remove':
+                    del parent[index]
+            elif op['op'] in ('add', 'replace'):
+                parent[last] = op['value']
+            elif op['op'] == 'remove':
+                del parent[last]
+            else:
+                raise ApiError(400, 'Unsupported json_patch op %s' % op['op'])
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise ApiError(400, 'Invalid json_patch path %s' % op['path'])
+
+
+class AviController(object):
+    """
+    The objects are held per object type in insertion order, with an index
+    of the names per tenant, so that lookups by name and uuid do not depend
+    on the number of objects.
+    :param latency: seconds every request is delayed
+    :param jitter: up to this many seconds are added to latency at random
+    :param error_rate: share of the API requests that fail with
+        error_status
+    :param retry_after: Retry-After header of injected errors
+    :param max_concurrent: API requests in flight above which requests fail
+        with 429
+    :param session_timeout: seconds after which an idle session is rejected
+        with 401
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, username='admin',
+                 password='password', api_version='18.2.8', latency=0.0,
+                 jitter=0.0, error_rate=0.0, error_status=503,
+                 retry_after=None, max_concurrent=None, session_timeout=None,
+                 certfile=None, keyfile=None):
+        self.host = host
+        self.port = port
+        self.users = {username: password}
+        self.api_version = api_version
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.max_concurrent = max_concurrent
+        self.session_timeout = session_timeout
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.cluster_state = 'CLUSTER_UP_NO_HA'
+        self.lock = threading.RLock()
+        self.objs = {}
+        self.names = {}
+        self.files = {}
+        self.sessions = {}
+        self.stats = {}
+        self.error_rules = []
+        self.in_flight = 0
+        self.last_modified = 0
+        self.server = None
+        self.seed()
+
+    @property
+    def url(self):
+        scheme = 'https' if self.certfile else 'http'
+        return '%s://%s:%d' % (scheme, self.host, self.port)
+
+    def start(self):
+        """
+        Serves the API from a thread.
+        :return: self
+        """
+        self.server = ControllerServer((self.host, self.port), Handler)
+        self.server.controller = self
+        if self.certfile:
+            ctx = ssl.SSLContext(getattr(ssl, 'PROTOCOL_TLS_SERVER',
+                                         ssl.PROTOCOL_SSLv23))
+            ctx.load_cert_chain(self.certfile, self.keyfile)
+            self.server.socket = ctx.wrap_socket(self.server.socket,
+                                                 server_side=True)
+        self.port = self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def inject_error(self, status=503, count=1, method=None, path=None,
+                     retry_after=None, msg='Injected error'):
+        """
+        Fails the next count requests of method whose path starts with path.
+        """
+        with self.lock:
+            self.error_rules.append(dict(
+                status=status, count=count, method=method, path=path,
+                retry_after=retry_after, msg=msg))
+
+    def before_request(self, method, path):
+        """
+        Delays the request and raises the injected errors.
+        """
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        with self.lock:
+            for rule in self.error_rules:
+                if ((rule['method'] is None or rule['method'] == method) and
+                        (rule['path'] is None or
+                         path.startswith(rule['path']))):
+                    rule['count'] -= 1
+                    if rule['count'] <= 0:
+                        self.error_rules.remove(rule)
+                    raise ApiError(rule['status'], rule['msg'],
+                                   self.retry_headers(rule['retry_after']))
+        if self.error_rate and path.startswith('/api/') and (
+                random.random() < self.error_rate):
+            raise ApiError(self.error_status, 'Injected error',
+                           self.retry_headers(self.retry_after))
+
+    @staticmethod
+    def retry_headers(retry_after):
+        if retry_after is None:
+            return []
+        return [('Retry-After', str(retry_after))]
+
+    # objects
+
+    def next_last_modified(self):
+        with self.lock:
+            self.last_modified = max(int(time.time() * 1000000),
+                                     self.last_modified + 1)
+            return str(self.last_modified)
+
+    def seed(self):
+        self.create('tenant', {'name': 'admin', 'local': True},
+                    uuid='admin')
+        for obj_type in SINGLETON_OBJ_TYPES:
+            self.create(obj_type, {'name': obj_type}, uuid='%s-0' % obj_type)
+        self.create('cloud', {'name': 'Default-Cloud',
+                              'vtype': 'CLOUD_NONE'}, tenant='admin')
+        self.create('vrfcontext', {'name': 'global'}, tenant='admin')
+        self.create('serviceenginegroup', {'name': 'Default-Group'},
+                    tenant='admin')
+
+    def tenant_uuid(self, tenant_name=None, tenant_uuid=None):
+        if tenant_uuid:
+            return tenant_uuid
+        if not tenant_name or tenant_name == '*':
+            return tenant_name or 'admin'
+        uuid = self.names.get(('tenant', None, tenant_name))
+        if uuid is None:
+            raise ApiError(400, 'Tenant %s does not exist' % tenant_name)
+        return uuid
+
+    def obj_tenant(self, obj_type, obj):
+        if obj_type in NO_TENANT_OBJ_TYPES:
+            return None
+        return obj['tenant_ref'].rsplit('/', 1)[-1]
+
+    def find(self, obj_type, name, tenant):
+        """
+        :return: object of the tenant named name, or of the admin tenant
+        """
+        for t in (tenant, 'admin'):
+            uuid = self.names.get((obj_type, None if obj_type in
+                                   NO_TENANT_OBJ_TYPES else t, name))
+            if uuid is not None:
+                return self.objs[obj_type][uuid]
+        return None
+
+    def resolve_refs(self, value, tenant, key=''):
+        """
+        :return: value with references by name or URL replaced by the path
+            of the object
+        """
+        if isinstance(value, dict):
+            return dict((k, self.resolve_refs(v, tenant, k))
+                        for k, v in value.items())
+        if isinstance(value, list):
+            return [self.resolve_refs(v, tenant, key) for v in value]
+        if not (is_ref_field(key) and isinstance(value, string_types)):
+            return value
+        m = REF_RE.match(value)
+        if not m:
+            raise ApiError(400, 'Invalid reference %s in %s' % (value, key))
+        obj_type, uuid, query = m.groups()
+        if uuid is None:
+            name = (parse_qs(query or '').get('name') or [None])[-1]
+            obj = self.find(obj_type, name, tenant)
+            if obj is None:
+                raise ApiError(400, 'Cannot find object of type %s with '
+                                    'name %s' % (obj_type, name))
+            uuid = obj['uuid']
+        elif uuid not in self.objs.get(obj_type, {}):
+            raise ApiError(400, 'Cannot find object of type %s with uuid '
+                                '%s' % (obj_type, uuid))
+        return '/api/%s/%s' % (obj_type, uuid)
+
+    def render(self, value, base, include_name, key=''):
+        """
+        :return: value with the paths of references as URLs of base,
+            followed by #name of the object with include_name
+        """
+        if isinstance(value, dict):
+            return dict((k, self.render(v, base, include_name, k))
+                        for k, v in value.items())
+        if isinstance(value, list):
+            return [self.render(v, base, include_name, key) for v in value]
+        if ((key == 'url' or is_ref_field(key)) and
+                isinstance(value, string_types) and
+                value.startswith('/api/')):
+            ref = base + value
+            if include_name:
+                obj_type, _, uuid = value[len('/api/'):].partition('/')
+                obj = self.objs.get(obj_type, {}).get(uuid)
+                if obj is not None and 'name' in obj:
+                    ref += '#' + obj['name']
+            return ref
+        return value
+
+    def create(self, obj_type, data, tenant='admin', uuid=None):
+        with self.lock:
+            obj = self.resolve_refs(data, tenant)
+            if obj_type not in NO_TENANT_OBJ_TYPES:
+                obj.setdefault('tenant_ref', '/api/tenant/%s' % tenant)
+            key = (obj_type, self.obj_tenant(obj_type, obj), obj.get('name'))
+            if obj.get('name') is not None and key in self.names:
+                raise ApiError(409, '%s object with this Tenant ref and Name '
+                                    'already exist.' % obj_type)
+            obj['uuid'] = uuid or '%s-%s' % (obj_type, uuid_mod.uuid4())
+            obj['url'] = '/api/%s/%s' % (obj_type, obj['uuid'])
+            obj['_last_modified'] = self.next_last_modified()
+            self.objs.setdefault(obj_type, OrderedDict())[obj['uuid']] = obj
+            if obj.get('name') is not None:
+                self.names[key] = obj['uuid']
+            return obj
+
+    def get(self, obj_type, uuid):
+        obj = self.objs.get(obj_type, {}).get(uuid)
+        if obj is None:
+            raise ApiError(404, 'Object of type %s with uuid %s not found' % (
+                obj_type, uuid))
+        return obj
+
+    def replace(self, obj_type, uuid, obj):
+        """
+        Stores obj as the object uuid. _last_modified only changes with the
+        content of the object.
+        """
+        with self.lock:
+            existing = self.get(obj_type, uuid)
+            obj['uuid'] = uuid
+            obj['url'] = existing['url']
+            if obj_type not in NO_TENANT_OBJ_TYPES:
+                obj.setdefault('tenant_ref', existing['tenant_ref'])
+            obj['_last_modified'] = existing['_last_modified']
+            if obj == existing:
+                return existing
+            old_key = (obj_type, self.obj_tenant(obj_type, existing),
+                       existing.get('name'))
+            new_key = (obj_type, self.obj_tenant(obj_type, obj),
+                       obj.get('name'))
+            if new_key != old_key:
+                if obj.get('name') is not None and new_key in self.names:
+                    raise ApiError(409, '%s object with this Tenant ref and '
+                                        'Name already exist.' % obj_type)
+                self.names.pop(old_key, None)
+                if obj.get('name') is not None:
+                    self.names[new_key] = uuid
+            obj['_last_modified'] = self.next_last_modified()
+            self.objs[obj_type][uuid] = obj
+            return obj
+
+    def update(self, obj_type, uuid, data, tenant):
+        with self.lock:
+            self.get(obj_type, uuid)
+            return self.replace(obj_type, uuid,
+                                self.resolve_refs(data, tenant))
+
+    def patch(self, obj_type, uuid, data, tenant):
+        with self.lock:
+            obj = copy.deepcopy(self.get(obj_type, uuid))
+            data = self.resolve_refs(data, tenant)
+            for op, value in data.items():
+                if op == 'add':
+                    patch_add(obj, value)
+                elif op == 'replace':
+                    obj.update(value)
+                elif op == 'delete':
+                    patch_delete(obj, value)
+                elif op == 'json_patch':
+                    json_patch(obj, value)
+                else:
+                    raise ApiError(400, 'Unsupported patch operation %s' % op)
+            return self.replace(obj_type, uuid, obj)
+
+    def delete(self, obj_type, uuid):
+        with self.lock:
+            if obj_type in SINGLETON_OBJ_TYPES:
+                raise ApiError(405, 'Method DELETE not allowed')
+            obj = self.get(obj_type, uuid)
+            del self.objs[obj_type][uuid]
+            self.names.pop((obj_type, self.obj_tenant(obj_type, obj),
+                            obj.get('name')), None)
+
+    def collection(self, obj_type, tenant, query):
+        """
+        :return: tuple of the objects of the page and the number of objects
+        """
+        name = query.get('name')
+        if name is not None:
+            if tenant == '*':
+                objs = [o for o in self.objs.get(obj_type, {}).values()
+                        if o.get('name') == name]
+            else:
+                obj = self.find(obj_type, name, tenant)
+                objs = [obj] if obj is not None else []
+        else:
+            objs = list(self.objs.get(obj_type, {}).values())
+            if tenant != '*' and obj_type not in NO_TENANT_OBJ_TYPES:
+                objs = [o for o in objs
+                        if self.obj_tenant(obj_type, o) in (tenant, 'admin')]
+        page_size = min(int(query.get('page_size') or DEFAULT_PAGE_SIZE),
+                        MAX_PAGE_SIZE)
+        page = int(query.get('page') or 1)
+        return objs[(page - 1) * page_size:page * page_size], len(objs)
+
+    def populate(self, obj_type, count, template=None, tenant='admin',
+                 name_format='%(obj_type)s-%(index)d'):
+        """
+        Creates count objects of obj_type from template, named with
+        name_format.
+        :return: list of the uuids of the objects
+        """
+        with self.lock:
+            template = self.resolve_refs(template or {}, tenant)
+            uuids = []
+            for index in range(count):
+                obj = copy.deepcopy(template)
+                obj['name'] = name_format % dict(obj_type=obj_type,
+                                                 index=index)
+                uuids.append(self.create(obj_type, obj, tenant)['uuid'])
+            return uuids
+
+    # sessions
+
+    def login(self, data):
+        if self.users.get(data.get('username')) != data.get('password'):
+            raise ApiError(401, 'Invalid credentials')
+        session_id = uuid_mod.uuid4().hex
+        csrftoken = uuid_mod.uuid4().hex
+        with self.lock:
+            self.sessions[session_id] = dict(
+                csrftoken=csrftoken, username=data['username'],
+                last_used=time.time())
+        self.count('login')
+        return session_id, csrftoken
+
+    def authenticate(self, method, cookies, headers):
+        session_id = cookies.get('sessionid') or cookies.get('avi-sessionid')
+        session = self.sessions.get(session_id)
+        now = time.time()
+        if session is None or (self.session_timeout and now - session[
+                'last_used'] > self.session_timeout):
+            self.sessions.pop(session_id, None)
+            raise ApiError(401, 'Authentication credentials were not '
+                                'provided.')
+        if method != 'GET' and headers.get('X-CSRFToken') != session[
+                'csrftoken']:
+            raise ApiError(403, 'CSRF Failed: CSRF token missing or '
+                                'incorrect.')
+        session['last_used'] = now
+
+    # files
+
+    def list_files(self, uri):
+        prefix = uri.rstrip('/') + '/'
+        with self.lock:
+            return [dict(name=path[len(prefix):], size=len(data),
+                         checksum=hashlib.sha256(data).hexdigest())
+                    for path, data in sorted(self.files.items())
+                    if path.startswith(prefix) and
+                    '/' not in path[len(prefix):]]
+
+    def write_file(self, path, data, offset=0):
+        with self.lock:
+            content = self.files.get(path, b'')[:offset] if offset else b''
+            if len(content) != offset:
+                raise ApiError(400, 'Upload of %s at offset %d but %d bytes '
+                                    'were uploaded' % (path, offset,
+                                                       len(content)))
+            self.files[path] = content + data
+
+
+class ControllerServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def controller(self):
+        return self.server.controller
+
+    def send(self, status, body=None, headers=None):
+        if body is None:
+            data = b''
+        elif isinstance(body, bytes):
+            data = body
+        else:
+            data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        if not isinstance(body, bytes):
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers or []:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def json_body(self, body):
+        content_type = self.headers.get('Content-Type') or ''
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            return dict((k, v[-1]) for k, v in parse_qs(
+                body.decode('utf-8')).items())
+        try:
+            return json.loads(body.decode('utf-8')) if body else {}
+        except ValueError:
+            raise ApiError(400, 'Invalid JSON body')
+
+    def handle_method(self):
+        controller = self.controller
+        url = urlparse(self.path)
+        query = dict((k, v[-1]) for k, v in parse_qs(
+            url.query, keep_blank_values=True).items())
+        body = self.read_body()
+        limited = url.path.startswith('/api/')
+        if limited:
+            with controller.lock:
+                controller.in_flight += 1
+        try:
+            if limited and controller.max_concurrent and (
+                    controller.in_flight > controller.max_concurrent):
+                raise ApiError(429, 'Too many requests',
+                               controller.retry_headers(
+                                   controller.retry_after or 1))
+            controller.before_request(self.command, url.path)
+            status, rsp, headers = self.dispatch(url.path, query, body)
+        except ApiError as e:
+            status, rsp, headers = e.status, {'error': e.msg}, e.headers
+        finally:
+            if limited:
+                with controller.lock:
+                    controller.in_flight -= 1
+        self.send(status, rsp, headers)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_method
+
+    def dispatch(self, path, query, body):
+        controller = self.controller
+        method = self.command
+        if path == '/login' and method == 'POST':
+            session_id, csrftoken = controller.login(self.json_body(body))
+            return 200, dict(
+                user=dict(username=self.json_body(body)['username']),
+                version=dict(Version=controller.api_version),
+                tenants=[dict(name='admin', uuid='admin')]), [
+                ('Set-Cookie', 'sessionid=%s; Path=/; HttpOnly' % session_id),
+                ('Set-Cookie', 'avi-sessionid=%s; Path=/; HttpOnly' %
+                 session_id),
+                ('Set-Cookie', 'csrftoken=%s; Path=/' % csrftoken)]
+        if path == '/logout':
+            controller.sessions.pop(self.cookies().get('sessionid'), None)
+            return 200, {}, []
+        if not path.startswith('/api/'):
+            raise ApiError(404, 'Not found %s' % path)
+        parts = [p for p in path[len('/api/'):].split('/') if p]
+        if not parts:
+            raise ApiError(404, 'Not found %s' % path)
+        if parts == ['cluster', 'runtime'] and method == 'GET':
+            controller.count('GET cluster/runtime')
+            return 200, dict(
+                cluster_state=dict(state=controller.cluster_state),
+                node_states=[dict(name=controller.host,
+                                  role='CLUSTER_LEADER',
+                                  state='CLUSTER_ACTIVE')]), []
+        if parts == ['initial-data']:
+            return 200, dict(version=dict(Version=controller.api_version)), []
+        controller.authenticate(method, self.cookies(), self.headers)
+        controller.count('%s %s' % (method, parts[0]))
+        tenant = controller.tenant_uuid(
+            self.headers.get('X-Avi-Tenant'),
+            self.headers.get('X-Avi-Tenant-UUID'))
+        if parts[0] == 'fileservice':
+            return self.fileservice(parts[1:], query, body)
+        return self.objects(parts, query, body, tenant)
+
+    def cookies(self):
+        cookie = SimpleCookie()
+        cookie.load(self.headers.get('Cookie') or '')
+        return dict((k, m.value) for k, m in cookie.items())
+
+    def base(self):
+        # the controller returns https URLs also when it is served over http
+        return 'https://%s' % (self.headers.get('Host') or '%s:%d' % (
+            self.controller.host, self.controller.port))
+
+    def objects(self, parts, query, body, tenant):
+        controller = self.controller
+        method = self.command
+        obj_type = parts[0]
+        include_name = 'include_name' in query
+        base = self.base()
+        if obj_type in SINGLETON_OBJ_TYPES and len(parts) == 1:
+            parts = [obj_type, '%s-0' % obj_type]
+        if len(parts) == 1:
+            if method == 'GET':
+                if tenant != '*' and obj_type in NO_TENANT_OBJ_TYPES:
+                    tenant = '*'
+                objs, count = controller.collection(obj_type, tenant, query)
+                fields = query.get('fields')
+                if fields:
+                    names = set(fields.split(',')) | set(['uuid', 'url',
+                                                          'name'])
+                    objs = [dict((k, v) for k, v in o.items() if k in names)
+                            for o in objs]
+                rsp = dict(count=count, results=controller.render(
+                    objs, base, include_name))
+                page = int(query.get('page') or 1)
+                page_size = min(int(query.get('page_size') or
+                                    DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+                if page * page_size < count:
+                    rsp['next'] = '%s/api/%s?page=%d&page_size=%d' % (
+                        base, obj_type, page + 1, page_size)
+                return 200, rsp, []
+            if method == 'POST':
+                obj = controller.create(obj_type, self.json_body(body),
+                                        tenant)
+                return 201, controller.render(obj, base, include_name), []
+            raise ApiError(405, 'Method %s not allowed' % method)
+        uuid = parts[1]
+        if len(parts) > 2:
+            # actions on an object like virtualservice/<uuid>/scaleout
+            controller.get(obj_type, uuid)
+            if method == 'POST':
+                return 200, {}, []
+            raise ApiError(404, 'Not found %s' % '/'.join(parts))
+        if method == 'GET':
+            obj = controller.get(obj_type, uuid)
+        elif method == 'PUT':
+            obj = controller.update(obj_type, uuid, self.json_body(body),
+                                    tenant)
+        elif method == 'PATCH':
+            obj = controller.patch(obj_type, uuid, self.json_body(body),
+                                   tenant)
+        elif method == 'DELETE':
+            controller.delete(obj_type, uuid)
+            return 204, None, []
+        else:
+            raise ApiError(405, 'Method %s not allowed' % method)
+        return 200, controller.render(obj, base, include_name), []
+
+    def fileservice(self, parts, query, body):
+        controller = self.controller
+        method = self.command
+        uri = query.get('uri')
+        if not parts:
+            if uri is None or not FILE_URI_RE.match(uri):
+                raise ApiError(400, 'uri controller://<path> is required')
+            if method == 'GET':
+                return 200, dict(results=controller.list_files(uri)), []
+            if method == 'POST':
+                return 200, {}, []
+            if method == 'DELETE':
+                with controller.lock:
+                    if controller.files.pop(uri, None) is None:
+                        raise ApiError(404, 'File %s not found' % uri)
+                return 204, None, []
+            raise ApiError(405, 'Method %s not allowed' % method)
+        if method == 'POST':
+            return self.upload(body)
+        if method != 'GET':
+            raise ApiError(405, 'Method %s not allowed' % method)
+        path = uri or 'controller://%s' % '/'.join(parts)
+        data = controller.files.get(path)
+        if data is None:
+            raise ApiError(404, 'File %s not found' % path)
+        etag = '"%s"' % hashlib.sha256(data).hexdigest()
+        m = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range') or '')
+        if_range = self.headers.get('If-Range')
+        # the whole file is sent when it is not the version of If-Range
+        if not m or (if_range and if_range != etag):
+            return 200, data, [('ETag', etag)]
+        start = int(m.group(1))
+        end = min(int(m.group(2)) if m.group(2) else len(data) - 1,
+                  len(data) - 1)
+        if start > end:
+            raise ApiError(416, 'Range not satisfiable', [
+                ('Content-Range', 'bytes */%d' % len(data))])
+        return 206, data[start:end + 1], [
+            ('Content-Range', 'bytes %d-%d/%d' % (start, end, len(data))),
+            ('ETag', etag)]
+
+    def upload(self, body):
+        from requests_toolbelt.multipart.decoder import MultipartDecoder
+        fields = {}
+        file_name = file_data = None
+        for part in MultipartDecoder(body,
+                                     self.headers['Content-Type']).parts:
+            disposition = part.headers.get(
+                b'Content-Disposition', b'').decode('utf-8')
+            name = re.search(r'\bname="([^"]*)"', disposition)
+            filename = re.search(r'filename="([^"]*)"', disposition)
+            if filename:
+                file_name, file_data = filename.group(1), part.content
+            elif name:
+                fields[name.group(1)] = part.text
+        uri = fields.get('uri')
+        if file_name is None or not uri or not FILE_URI_RE.match(uri):
+            raise ApiError(400, 'file and uri controller://<path> are '
+                                'required')
+        offset = 0
+        m = re.match(r'bytes (\d+)-\d+/\d+$',
+                     self.headers.get('Content-Range') or '')
+        if m:
+            offset = int(m.group(1))
+        self.controller.write_file('%s/%s' % (uri.rstrip('/'), file_name),
+                                   file_data, offset)
+        return 200, {}, []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='In-memory stand-in of an Avi controller.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--api-version', default='18.2.8')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds every request is delayed')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='share of the API requests that fail')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--retry-after', type=int)
+    parser.add_argument('--max-concurrent', type=int,
+                        help='requests in flight above which requests fail '
+                             'with 429')
+    parser.add_argument('--session-timeout', type=float)
+    parser.add_argument('--certfile')
+    parser.add_argument('--keyfile')
+    parser.add_argument('--populate', action='append', default=[],
+                        metavar='OBJ_TYPE:COUNT',
+                        help='create COUNT objects of OBJ_TYPE')
+    args = parser.parse_args(argv)
+    controller = AviController(
+        host=args.host, port=args.port, username=args.username,
+        password=args.password, api_version=args.api_version,
+        latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, error_status=args.error_status,
+        retry_after=args.retry_after, max_concurrent=args.max_concurrent,
+        session_timeout=args.session_timeout, certfile=args.certfile,
+        keyfile=args.keyfile)
+    for entry in args.populate:
+        obj_type, _, count = entry.partition(':')
+        controller.populate(obj_type, int(count or 1))
+    controller.start()
+    print('Serving %s' % controller.url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from ansible.module_utils import basic
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_pool, avi_user
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+
+def server(addr):
+    return {'ip': {'addr': addr, 'type': 'V4'}}
+
+
+class test_avi_api_update_method_auto(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+
+    def run_module(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8',
+                    avi_api_update_method='auto', name='p1')
+        set_module_args(args)
+        try:
+            avi_pool.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def requests(self, method):
+        return self.controller.stats.get('%s pool' % method, 0)
+
+    def test_patch(self):
+        result = self.run_module(servers=[server('10.10.10.1'),
+                                          server('10.10.10.2')])
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.requests('POST'), 1)
+        result = self.run_module(servers=[server('10.10.10.2'),
+                                          server('10.10.10.1')])
+        self.assertFalse(result['changed'])
+        result = self.run_module(
+            lb_algorithm='LB_ALGORITHM_ROUND_ROBIN',
+            servers=[server('10.10.10.1'), server('10.10.10.3')],
+            _ansible_diff=True)
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(result['diff']['changed_paths'], [
+            'lb_algorithm', 'servers[ip.addr=10.10.10.3]'])
+        # one PATCH with all the operations and no PUT
+        self.assertEqual((self.requests('PATCH'), self.requests('PUT')),
+                         (1, 0))
+        self.assertEqual(result['obj']['lb_algorithm'],
+                         'LB_ALGORITHM_ROUND_ROBIN')
+        self.assertEqual([s['ip']['addr'] for s in result['obj']['servers']],
+                         ['10.10.10.1', '10.10.10.3'])
+        # the session of the SDK still puts
+        api = list(avi_api.sessionDict.values())[0]['api']
+        self.assertNotIn('put', vars(api))
+
+    def test_create(self):
+        result = self.run_module(servers=[server('10.10.10.1')])
+        self.assertTrue(result['changed'], result.get('msg'))
+        # the lookup before the POST is not repeated
+        self.assertEqual((self.requests('GET'), self.requests('POST')),
+                         (1, 1))
+        self.assertEqual(result['obj']['name'], 'p1')
+
+    def test_user(self):
+        args = dict(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8',
+                    avi_api_update_method='auto', name='Test User',
+                    obj_username='testuser', obj_password='test123',
+                    email='test@example.com')
+        for email in ('test@example.com', 'test@example.com',
+                      'other@example.com'):
+            set_module_args(dict(args, email=email))
+            try:
+                avi_user.main()
+            except (AnsibleExitJson, AnsibleFailJson) as e:
+                result = e.args[0]
+            self.assertNotIn('failed', result, result.get('msg'))
+        # the user is found by its username and not created again
+        users = list(self.controller.objs['user'].values())
+        self.assertEqual([(u['username'], u['full_name'], u['email'])
+                          for u in users],
+                         [('testuser', 'Test User', 'other@example.com')])
+        self.assertEqual(self.controller.stats.get('POST user'), 1)
+        self.assertEqual(self.controller.stats.get('PATCH user'), 1)
+
+    def test_check_mode(self):
+        self.run_module(servers=[server('10.10.10.1')])
+        result = self.run_module(servers=[server('10.10.10.2')],
+                                 _ansible_check_mode=True)
+        self.assertTrue(result['changed'])
+        self.assertEqual(self.requests('PATCH'), 0)
+
+    def test_absent(self):
+        self.run_module(servers=[server('10.10.10.1')])
+        result = self.run_module(state='absent')
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.requests('DELETE'), 1)
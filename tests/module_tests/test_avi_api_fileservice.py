@@ -0,0 +1,191 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import requests
+from mock import patch
+
+from ansible.module_utils import basic
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_api_fileservice
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+MB = 1024 * 1024
+
+
+def interrupted_iter_content(after):
+    """
+    :return: iter_content of requests that fails after the first chunks
+    """
+    iter_content = requests.models.Response.iter_content
+
+    def interrupted(rsp, *args, **kwargs):
+        for i, chunk in enumerate(iter_content(rsp, *args, **kwargs)):
+            if i == after:
+                raise IOError('Connection reset by peer')
+            yield chunk
+    return interrupted
+
+
+class test_avi_api_fileservice(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        # the upload state is kept in the home of the user
+        env = patch.dict(os.environ, {'HOME': self.tmp_dir})
+        env.start()
+        self.addCleanup(env.stop)
+        self.file_path = os.path.join(self.tmp_dir, 'image.bin')
+        with open(self.file_path, 'wb') as f:
+            f.write(os.urandom(3 * 1024 * 1024 + 5))
+
+    def run_module(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8')
+        set_module_args(args)
+        try:
+            avi_api_fileservice.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def upload(self, **args):
+        return self.run_module(upload=True, path='uploads',
+                               file_path=self.file_path, **args)
+
+    def remote_file(self):
+        return self.controller.files['controller://uploads/image.bin']
+
+    def test_skip_uploaded_file(self):
+        result = self.upload(chunk_size=1, force_mode=False)
+        self.assertTrue(result['changed'], result.get('msg'))
+        with open(self.file_path, 'rb') as f:
+            self.assertEqual(self.remote_file(), f.read())
+        result = self.upload(chunk_size=1, force_mode=False)
+        self.assertFalse(result['changed'])
+        self.assertEqual(result['msg'], 'File already uploaded')
+        # the file is always uploaded by default
+        result = self.upload()
+        self.assertTrue(result['changed'])
+        self.assertEqual(result['uploaded'], os.path.getsize(self.file_path))
+
+    def test_listing_without_checksum(self):
+        self.upload()
+        list_files = self.controller.list_files
+
+        def without_checksum(uri):
+            return [dict(name=f['name'], size=f['size'])
+                    for f in list_files(uri)]
+        self.controller.list_files = without_checksum
+        gets = self.controller.stats.get('GET fileservice', 0)
+        # the file is uploaded again instead of read back for its checksum
+        result = self.upload(force_mode=False)
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(result['uploaded'], os.path.getsize(self.file_path))
+        # the listings before and after the upload
+        self.assertEqual(self.controller.stats['GET fileservice'] - gets, 2)
+
+    def test_upload_state_is_private(self):
+        creds = type('creds', (), {'controller': self.controller.url})
+        state_path = avi_api_fileservice.upload_state_path(
+            creds, 'controller://uploads', self.file_path)
+        self.assertTrue(state_path.startswith(
+            os.path.join(self.tmp_dir, '.ansible', 'avi_uploads')))
+        os.makedirs(os.path.dirname(state_path))
+        # a link planted at the state path is replaced, not written through
+        victim = os.path.join(self.tmp_dir, 'victim')
+        with open(victim, 'w') as f:
+            f.write('unchanged')
+        os.symlink(victim, state_path)
+        result = self.upload(chunk_size=1)
+        self.assertTrue(result['changed'], result.get('msg'))
+        with open(victim) as f:
+            self.assertEqual(f.read(), 'unchanged')
+        self.assertFalse(os.path.islink(state_path))
+        self.assertEqual(stat.S_IMODE(os.stat(state_path).st_mode), 0o600)
+
+    def download(self, **args):
+        args.setdefault('params', {'uri': 'controller://uploads/image.bin'})
+        return self.run_module(upload=False, path='uploads',
+                               file_path=self.download_path, **args)
+
+    def interrupted_download(self):
+        with patch.object(requests.models.Response, 'iter_content',
+                          interrupted_iter_content(1)):
+            result = self.download(chunk_size=1)
+        self.assertTrue(result['failed'])
+        self.assertEqual(os.path.getsize(self.download_path + '.part'), MB)
+
+    def set_remote_file(self, data):
+        self.controller.files['controller://uploads/image.bin'] = data
+        self.download_path = os.path.join(self.tmp_dir, 'download.bin')
+
+    def assert_downloaded(self, data):
+        with open(self.download_path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertFalse(os.path.exists(self.download_path + '.part'))
+        self.assertFalse(os.path.exists(self.download_path + '.part.json'))
+
+    def test_resume_download(self):
+        data = os.urandom(3 * MB + 5)
+        self.set_remote_file(data)
+        self.interrupted_download()
+        result = self.download(chunk_size=1)
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual((result['resumed_from'], result['downloaded']),
+                         (MB, len(data) - MB))
+        self.assert_downloaded(data)
+
+    def test_remote_file_changed(self):
+        self.set_remote_file(os.urandom(3 * MB + 5))
+        self.interrupted_download()
+        data = os.urandom(3 * MB + 5)
+        self.set_remote_file(data)
+        result = self.download(chunk_size=1)
+        self.assertEqual(result['resumed_from'], 0, result.get('msg'))
+        self.assert_downloaded(data)
+
+    def test_unrelated_part_file(self):
+        data = os.urandom(2 * MB)
+        self.set_remote_file(data)
+        # a whole .part file of another download is not taken as complete
+        with open(self.download_path + '.part', 'wb') as f:
+            f.write(os.urandom(2 * MB))
+        result = self.download()
+        self.assertEqual(result['resumed_from'], 0, result.get('msg'))
+        self.assert_downloaded(data)
+        self.set_remote_file(data)
+        self.interrupted_download()
+        result = self.download(params={'uri': 'controller://uploads/other'})
+        self.assertTrue(result['failed'])
+        # the .part file of image.bin is dropped for the other file
+        self.assertFalse(os.path.exists(self.download_path + '.part'))
+
+    def test_segmented_download(self):
+        data = os.urandom(3 * MB + 5)
+        self.set_remote_file(data)
+        result = self.download(chunk_size=1, segments=3)
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assert_downloaded(data)
+
+    def test_keep_existing_file(self):
+        self.set_remote_file(b'data')
+        with open(self.download_path, 'wb') as f:
+            f.write(b'local')
+        result = self.download(force_mode=False)
+        self.assertFalse(result['changed'])
+        result = self.download()
+        self.assertTrue(result['changed'])
+        self.assert_downloaded(b'data')
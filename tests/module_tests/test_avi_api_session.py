@@ -0,0 +1,197 @@
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from ansible.module_utils import basic
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_api_session
+from local_controller import AviController, Handler
+
+modules = AnsibleModules()
+
+
+class test_avi_api_session_patch(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.uuid = self.controller.create(
+            'pool', {'name': 'p1', 'lb_algorithm':
+                     'LB_ALGORITHM_LEAST_CONNECTIONS'})['uuid']
+
+    def run_module(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8')
+        set_module_args(args)
+        try:
+            avi_api_session.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def patch_pool(self, lb_algorithm):
+        return self.run_module(
+            http_method='patch', path='pool/%s' % self.uuid,
+            data={'replace': {'lb_algorithm': lb_algorithm}})
+
+    def test_no_readback(self):
+        result = self.patch_pool('LB_ALGORITHM_ROUND_ROBIN')
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(result['obj']['lb_algorithm'],
+                         'LB_ALGORITHM_ROUND_ROBIN')
+        # only the GET of the object before the PATCH
+        self.assertEqual(self.controller.stats.get('GET pool'), 1)
+        result = self.patch_pool('LB_ALGORITHM_ROUND_ROBIN')
+        self.assertFalse(result['changed'])
+        self.assertEqual(self.controller.stats.get('GET pool'), 2)
+
+    def test_patch_ref_hostname(self):
+        # The controller names another host in the references of the PATCH
+        # than in the ones of the GET and updates _last_modified on every
+        # PATCH.
+        base = Handler.base
+        patch_obj = AviController.patch
+
+        def patch_base(handler):
+            if handler.command == 'PATCH':
+                return 'https://avi.example.com'
+            return base(handler)
+
+        def patch_touch(controller, obj_type, uuid, data, tenant):
+            obj = patch_obj(controller, obj_type, uuid, data, tenant)
+            obj['_last_modified'] = controller.next_last_modified()
+            return obj
+        with patch.object(Handler, 'base', patch_base), \
+                patch.object(AviController, 'patch', patch_touch):
+            result = self.patch_pool('LB_ALGORITHM_LEAST_CONNECTIONS')
+        self.assertFalse(result['changed'], result.get('msg'))
+        self.assertTrue(result['obj']['tenant_ref'].startswith(
+            'https://avi.example.com/api/tenant/'))
+        self.assertEqual(self.controller.stats.get('GET pool'), 1)
+
+    def test_readback(self):
+        # a PATCH that does not return the object is read back
+        objects = Handler.objects
+
+        def patch_objects(handler, *args):
+            status, rsp, headers = objects(handler, *args)
+            if handler.command == 'PATCH':
+                rsp = {}
+            return status, rsp, headers
+        with patch.object(Handler, 'objects', patch_objects):
+            result = self.patch_pool('LB_ALGORITHM_ROUND_ROBIN')
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(result['obj']['lb_algorithm'],
+                         'LB_ALGORITHM_ROUND_ROBIN')
+        # without _last_modified it is read until two reads are the same
+        self.assertEqual(self.controller.stats.get('GET pool'), 3)
+
+
+class test_avi_api_session_batch(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.uuids = dict(
+            (name, self.controller.create('pool', {'name': name})['uuid'])
+            for name in ('p1', 'p2', 'p3'))
+
+    def run_module(self, requests, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8',
+                    requests=requests)
+        set_module_args(args)
+        try:
+            avi_api_session.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def pool_names(self):
+        return sorted(p['name'] for p in self.controller.objs['pool'].values())
+
+    def test_mixed_methods(self):
+        result = self.run_module([
+            dict(http_method='post', path='pool', data={'name': 'p4'}),
+            dict(http_method='put', path='pool',
+                 data={'name': 'p1', 'description': 'batch'}),
+            dict(http_method='patch', path='pool/%s' % self.uuids['p2'],
+                 data={'replace': {'description': 'patched'}}),
+            dict(http_method='delete', path='pool/%s' % self.uuids['p3']),
+            dict(http_method='get', path='pool',
+                 params={'name': 'p2'}, timeout=10)], concurrency=3)
+        self.assertFalse(result.get('failed'), result.get('msg'))
+        self.assertTrue(result['changed'])
+        results = result['results']
+        # the results are in the order of the requests
+        self.assertEqual([(r['http_method'], r['status_code'], r['changed'])
+                          for r in results],
+                         [('post', 201, True), ('put', 200, True),
+                          ('patch', 200, True), ('delete', 204, True),
+                          ('get', 200, False)])
+        self.assertEqual(results[0]['obj']['name'], 'p4')
+        self.assertEqual(results[1]['obj']['description'], 'batch')
+        self.assertEqual(self.pool_names(), ['p1', 'p2', 'p4'])
+        self.assertEqual(self.controller.get(
+            'pool', self.uuids['p2'])['description'], 'patched')
+
+    def test_unchanged(self):
+        # a POST of an existing unchanged object is not sent again
+        result = self.run_module([
+            dict(http_method='post', path='pool', data={'name': 'p1'}),
+            dict(http_method='get', path='pool/%s' % self.uuids['p2'])])
+        self.assertFalse(result['changed'], result.get('msg'))
+        self.assertEqual([r['status_code'] for r in result['results']],
+                         [200, 200])
+        self.assertEqual(result['results'][0]['obj']['uuid'],
+                         self.uuids['p1'])
+        self.assertNotIn('POST pool', self.controller.stats)
+        self.assertNotIn('PUT pool', self.controller.stats)
+
+    def test_one_failed(self):
+        result = self.run_module([
+            dict(http_method='post', path='pool', data={'name': 'p4'}),
+            dict(http_method='get', path='pool/pool-missing'),
+            dict(http_method='delete', path='pool/%s' % self.uuids['p3'])])
+        self.assertTrue(result['failed'])
+        self.assertEqual(result['msg'], '1 of 3 requests failed')
+        # the other requests are made and reported
+        self.assertTrue(result['changed'])
+        results = result['results']
+        self.assertEqual([r['failed'] for r in results],
+                         [False, True, False])
+        self.assertEqual(results[1]['status_code'], 404)
+        self.assertTrue(results[1]['msg'])
+        self.assertEqual(self.pool_names(), ['p1', 'p2', 'p4'])
+
+    def test_invalid_request(self):
+        result = self.run_module([
+            dict(http_method='post', path='pool', data={'name': 'p4'}),
+            dict(http_method='head', path='pool')])
+        self.assertTrue(result['failed'])
+        self.assertIn('http_method', result['msg'])
+        # no request is made when one of them is invalid
+        self.assertNotIn('POST pool', self.controller.stats)
+
+    def test_check_mode(self):
+        result = self.run_module([
+            dict(http_method='post', path='pool', data={'name': 'p4'}),
+            dict(http_method='delete', path='pool/%s' % self.uuids['p3'])],
+            _ansible_check_mode=True)
+        # the module does not support check mode so nothing is sent
+        self.assertTrue(result['skipped'])
+        self.assertFalse(result['changed'])
+        self.assertEqual(self.controller.stats.get('login', 0), 0)
+        self.assertEqual(self.pool_names(), ['p1', 'p2', 'p3'])
@@ -0,0 +1,174 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import Mock, patch
+
+from avi.sdk import avi_api
+from avi.sdk.avi_api import ApiSession
+from ansible.module_utils import basic
+from ansible.plugins.loader import callback_loader
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_pool
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+callback_loader.add_directory(
+    os.path.join(HERE, '..', '..', 'callback_plugins'))
+
+
+def task_result(result, host='localhost', action='avi_pool', args=None):
+    """
+    :return: TaskResult of the callbacks with the result of a task
+    """
+    task = Mock(action=action, args=args or {})
+    host_obj = Mock()
+    host_obj.get_name.return_value = host
+    return Mock(_host=host_obj, _task=task, _result=result)
+
+
+def api_stats(latency, requests, calls=None, **counters):
+    stats = dict(latency=latency, requests=requests,
+                 total_requests=sum(requests.values()), logins=0,
+                 bytes_sent=0, bytes_received=0, retries=0,
+                 calls=calls or [])
+    stats.update(counters)
+    return stats
+
+
+class test_track_api_stats(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+
+    def run_module(self, env, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8', name='p1')
+        set_module_args(args)
+        with patch.dict(os.environ, env):
+            if 'AVI_API_STATS' not in env:
+                os.environ.pop('AVI_API_STATS', None)
+            try:
+                avi_pool.main()
+            except (AnsibleExitJson, AnsibleFailJson) as e:
+                return e.args[0]
+
+    def test_api_stats(self):
+        api = ApiSession.__dict__['_api']
+        result = self.run_module({'AVI_API_STATS': '1'})
+        self.assertTrue(result['changed'], result.get('msg'))
+        stats = result['api_stats']
+        self.assertEqual(stats['requests'], {'GET': 1, 'POST': 1})
+        self.assertEqual(stats['total_requests'], 2)
+        self.assertEqual(stats['logins'], 1)
+        self.assertEqual(stats['retries'], 0)
+        self.assertEqual(sorted(c['method'] for c in stats['calls']),
+                         ['GET', 'POST'])
+        self.assertGreater(stats['bytes_sent'], 0)
+        self.assertGreater(stats['bytes_received'], 0)
+        # the SDK is restored when the module exits
+        self.assertIs(ApiSession.__dict__['_api'], api)
+
+    def test_relogin(self):
+        self.run_module({})
+        # the session expires so the SDK logs in and sends the GET again
+        self.controller.sessions.clear()
+        result = self.run_module({'AVI_API_STATS': '1'},
+                                 description='changed')
+        stats = result['api_stats']
+        self.assertEqual(stats['requests'], {'GET': 2, 'PUT': 1})
+        self.assertEqual((stats['logins'], stats['retries']), (1, 1))
+
+    def test_disabled(self):
+        for value in ('0', 'false'):
+            result = self.run_module({'AVI_API_STATS': value})
+            self.assertNotIn('api_stats', result)
+        result = self.run_module({})
+        self.assertNotIn('api_stats', result)
+
+
+class test_avi_api_stats_callback(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.callback = callback_loader.get('avi_api_stats')
+        self.callback.set_options()
+        self.callback._display = Mock()
+
+    def test_per_object(self):
+        call = dict(method='PUT', path='pool/pool-1', status=200,
+                    latency=0.5)
+        self.callback.v2_runner_on_ok(task_result(
+            dict(api_stats=api_stats(0.75, {'GET': 1, 'PUT': 1}, [call],
+                                     logins=1)),
+            args={'name': 'p1'}))
+        self.callback.v2_runner_on_failed(task_result(
+            dict(obj={'name': 'p1'},
+                 api_stats=api_stats(0.25, {'GET': 1}, retries=1))))
+        self.callback.v2_runner_on_ok(task_result(
+            dict(api_stats=api_stats(0.1, {'GET': 1})), host='other',
+            args={'name': 'p1'}))
+        # a task without api_stats is left out
+        self.callback.v2_runner_on_ok(task_result(dict(changed=False)))
+        report = self.callback.report()
+        totals = report['totals']
+        self.assertEqual(totals['tasks'], 3)
+        self.assertEqual(totals['requests'], {'GET': 3, 'PUT': 1})
+        self.assertEqual((totals['total_requests'], totals['logins'],
+                          totals['retries']), (4, 1, 1))
+        self.assertAlmostEqual(totals['latency'], 1.1)
+        entry = report['objects'][0]
+        self.assertEqual((entry['host'], entry['module'], entry['object']),
+                         ('localhost', 'avi_pool', 'p1'))
+        self.assertEqual((entry['tasks'], entry['total_requests']), (2, 3))
+        self.assertAlmostEqual(entry['latency'], 1.0)
+        self.assertEqual(entry['slowest_call'], call)
+        self.assertEqual(report['objects'][1]['host'], 'other')
+
+    def test_loop_results(self):
+        self.callback.v2_runner_on_ok(task_result(
+            dict(results=[
+                dict(obj={'name': 'p1'},
+                     api_stats=api_stats(0.2, {'GET': 1})),
+                dict(obj={'name': 'p2'},
+                     api_stats=api_stats(0.3, {'POST': 1})),
+                dict(skipped=True)])))
+        report = self.callback.report()
+        self.assertEqual(report['totals']['tasks'], 2)
+        self.assertEqual([e['object'] for e in report['objects']],
+                         ['p2', 'p1'])
+
+    def test_report_file(self):
+        report_file = os.path.join(self.tmp_dir, 'report.json')
+        self.callback.set_options(direct={'top': 1,
+                                          'report_file': report_file})
+        for name, latency in (('p1', 0.1), ('p2', 0.2)):
+            self.callback.v2_runner_on_ok(task_result(
+                dict(api_stats=api_stats(latency, {'GET': 1})),
+                args={'name': name}))
+        self.callback.v2_playbook_on_stats(None)
+        self.assertEqual(self.callback._display.display.call_count, 2)
+        with open(report_file) as f:
+            report = json.load(f)
+        # the file has all the objects, the display only the top ones
+        self.assertEqual([e['object'] for e in report['objects']],
+                         ['p2', 'p1'])
+        self.assertEqual(report['totals']['total_requests'], 2)
+
+    def test_no_stats(self):
+        self.callback.v2_runner_on_ok(task_result(dict(changed=True)))
+        self.callback.v2_playbook_on_stats(None)
+        self.assertFalse(self.callback._display.banner.called)
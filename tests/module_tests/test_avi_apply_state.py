@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from ansible.module_utils import basic
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_pool
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+
+class test_avi_apply_state(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        env = patch.dict(os.environ, {'AVI_APPLY_STATE_DIR': state_dir})
+        env.start()
+        self.addCleanup(env.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.gets = []
+        get = avi_api.ApiSession.get
+        gets = self.gets
+
+        def record_get(api, path, *args, **kwargs):
+            gets.append(dict(kwargs.get('params') or {}))
+            return get(api, path, *args, **kwargs)
+        get_patch = patch.object(avi_api.ApiSession, 'get', record_get)
+        get_patch.start()
+        self.addCleanup(get_patch.stop)
+
+    def run_module(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8', name='p1')
+        set_module_args(args)
+        del self.gets[:]
+        try:
+            avi_pool.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def full_gets(self):
+        return [p for p in self.gets if 'fields' not in p]
+
+    def requests(self, method):
+        return self.controller.stats.get('%s pool' % method, 0)
+
+    def test_unchanged(self):
+        result = self.run_module(description='first')
+        self.assertTrue(result['changed'], result.get('msg'))
+        result = self.run_module(description='first')
+        self.assertFalse(result['changed'], result.get('msg'))
+        self.assertEqual(self.full_gets(), [])
+        self.assertEqual(len(self.gets), 1)
+        self.assertEqual(self.requests('PUT'), 0)
+        uuid = self.controller.names[('pool', 'admin', 'p1')]
+        self.assertEqual(result['obj']['_last_modified'],
+                         self.controller.get('pool', uuid)['_last_modified'])
+
+    def test_changed_last_modified(self):
+        self.run_module(description='first')
+        uuid = self.controller.names[('pool', 'admin', 'p1')]
+        self.controller.patch('pool', uuid,
+                              {'replace': {'lb_algorithm':
+                                           'LB_ALGORITHM_ROUND_ROBIN'}},
+                              'admin')
+        # the object is compared again and the new _last_modified recorded
+        result = self.run_module(description='first')
+        self.assertFalse(result['changed'], result.get('msg'))
+        self.assertTrue(self.full_gets())
+        self.run_module(description='first')
+        self.assertEqual(self.full_gets(), [])
+
+    def test_changed_spec(self):
+        self.run_module(description='first')
+        result = self.run_module(description='second')
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertTrue(self.full_gets())
+        self.assertEqual(self.requests('PUT'), 1)
+        uuid = self.controller.names[('pool', 'admin', 'p1')]
+        self.assertEqual(self.controller.get('pool', uuid)['description'],
+                         'second')
+        result = self.run_module(description='second')
+        self.assertFalse(result['changed'], result.get('msg'))
+        self.assertEqual(self.full_gets(), [])
@@ -0,0 +1,106 @@
+import unittest
+
+from mock import Mock, patch
+
+from library import avi_bootstrap_controller
+from library.avi_bootstrap_controller import controller_wait
+
+
+class FakeClock(object):
+    """
+    Clock of the polls that only moves when the poll sleeps.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def cluster_rsp(state):
+    rsp = Mock()
+    rsp.json.return_value = {'cluster_state': {'state': state}}
+    return rsp
+
+
+class test_controller_wait(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.polls = []
+        self.states = []
+        get = patch.object(avi_bootstrap_controller.requests, 'get',
+                           self.get)
+        get.start()
+        self.addCleanup(get.stop)
+
+    def get(self, path, **kwargs):
+        self.polls.append(path)
+        state = self.states.pop(0) if self.states else 'CLUSTER_STARTING'
+        if isinstance(state, Exception):
+            raise state
+        return cluster_rsp(state)
+
+    def wait(self, jitter=None, **kwargs):
+        kwargs.setdefault('round_wait', 10)
+        kwargs.setdefault('max_round_wait', 60)
+        kwargs.setdefault('wait_time', 3600)
+        uniform = patch.object(avi_bootstrap_controller.random, 'uniform',
+                               jitter or (lambda a, b: b))
+        with uniform:
+            return controller_wait('10.10.1.11', clock=self.clock,
+                                   sleep=self.clock.sleep, **kwargs)
+
+    def test_up(self):
+        self.states = ['CLUSTER_UP_NO_HA']
+        self.assertEqual(self.wait(port=8080),
+                         (True, 0, 1, 'CLUSTER_UP_NO_HA'))
+        self.assertEqual(self.clock.sleeps, [])
+        self.assertEqual(self.polls,
+                         ['http://10.10.1.11:8080/api/cluster/runtime'])
+
+    def test_backoff(self):
+        self.states = ['CLUSTER_STARTING'] * 6 + ['CLUSTER_UP_HA_ACTIVE']
+        up, waited, polls, state = self.wait(
+            cluster_states=['CLUSTER_UP_HA_ACTIVE'])
+        self.assertEqual((up, polls, state),
+                         (True, 7, 'CLUSTER_UP_HA_ACTIVE'))
+        # the delay doubles up to max_round_wait
+        self.assertEqual(self.clock.sleeps, [10, 20, 40, 60, 60, 60])
+        self.assertEqual(waited, 250)
+
+    def test_jitter(self):
+        self.states = ['CLUSTER_STARTING'] * 3 + ['CLUSTER_UP_NO_HA']
+        self.wait(jitter=lambda a, b: a)
+        # the sleep is between half of the delay and the delay
+        self.assertEqual(self.clock.sleeps, [5, 10, 20])
+
+    def test_deadline(self):
+        up, waited, polls, state = self.wait(wait_time=25)
+        self.assertEqual((up, polls, state), (False, 3, 'CLUSTER_STARTING'))
+        # the last sleep ends at the deadline
+        self.assertEqual(self.clock.sleeps, [10, 15])
+        self.assertEqual(waited, 25)
+
+    def test_no_wait_time(self):
+        up, waited, polls, state = self.wait(wait_time=0)
+        self.assertEqual((up, waited, polls), (False, 0, 1))
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_poll_errors(self):
+        self.states = [ValueError('not json'), IOError('refused'),
+                       'CLUSTER_UP_NO_HA']
+        up, waited, polls, state = self.wait()
+        self.assertEqual((up, polls, state), (True, 3, 'CLUSTER_UP_NO_HA'))
+        self.assertEqual(self.clock.sleeps, [10, 20])
+
+    def test_max_round_wait_below_round_wait(self):
+        self.states = ['CLUSTER_STARTING'] * 3 + ['CLUSTER_UP_NO_HA']
+        self.wait(round_wait=30, max_round_wait=10)
+        self.assertEqual(self.clock.sleeps, [30, 30, 30])
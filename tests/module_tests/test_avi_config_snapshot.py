@@ -0,0 +1,85 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import patch
+
+from ansible.module_utils import basic
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_config_snapshot
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+
+class test_avi_config_snapshot(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.manifest_path = os.path.join(self.tmp_dir, 'latest.json')
+
+    def run_module(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8',
+                    obj_types=['pool'], manifest_path=self.manifest_path)
+        set_module_args(args)
+        try:
+            avi_config_snapshot.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def snapshot(self, name, **args):
+        file_path = os.path.join(self.tmp_dir, name)
+        if os.path.exists(self.manifest_path):
+            args.update(mode='incremental',
+                        previous_manifest=self.manifest_path)
+        result = self.run_module(file_path=file_path, **args)
+        self.assertFalse(result.get('failed'), result.get('msg'))
+        with gzip.open(file_path, 'rb') as f:
+            records = [json.loads(line) for line in
+                       f.read().decode('utf-8').splitlines()]
+        return result, records
+
+    def test_watermark(self):
+        self.controller.populate('pool', 3)
+        started = time.time()
+        result, records = self.snapshot('full.ndjson.gz', watermark_margin=60)
+        self.assertEqual(result['mode'], 'full')
+        self.assertEqual(len(records), 3)
+        watermark = int(result['manifest']['watermark'])
+        self.assertTrue(
+            (started - 61) * 1000000 < watermark < (started - 59) * 1000000)
+        pools = self.controller.objs['pool'].values()
+        for pool in pools:
+            pool['_last_modified'] = str(watermark - 1)
+        # committed while the snapshot ran, older than the exported objects
+        pool = list(pools)[1]
+        pool['description'] = 'changed'
+        pool['_last_modified'] = str(watermark + 1)
+        self.assertLess(int(pool['_last_modified']), int(
+            result['manifest']['obj_types']['pool']['last_modified']))
+        result, records = self.snapshot('delta.ndjson.gz')
+        self.assertEqual(result['mode'], 'incremental')
+        self.assertEqual([r['obj']['name'] for r in records], ['pool-1'])
+        self.assertEqual(result['manifest']['obj_types']['pool']['changed'], 1)
+
+    def test_unchanged(self):
+        self.controller.populate('pool', 2)
+        self.snapshot('full.ndjson.gz', watermark_margin=0)
+        time.sleep(0.01)
+        result, records = self.snapshot('delta.ndjson.gz')
+        self.assertEqual(records, [])
+        self.assertEqual(result['manifest']['obj_types']['pool']['count'], 2)
@@ -0,0 +1,143 @@
+import os
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from avi.sdk.avi_api import APIError, AviCredentials
+from ansible.errors import AnsibleConnectionFailure
+from ansible.module_utils import basic
+from ansible.module_utils.avi_connection import AviConnectionSession
+from ansible.playbook.play_context import PlayContext
+from ansible.plugins.loader import connection_loader
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_pool
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+connection_loader.add_directory(
+    os.path.join(HERE, '..', '..', 'connection_plugins'))
+
+
+class AviConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.connection = self.new_connection()
+        self.addCleanup(self.connection.close)
+
+    def new_connection(self, **options):
+        connection = connection_loader.get('avi', PlayContext(), '/dev/null')
+        direct = dict(host=self.controller.url, remote_user='admin',
+                      password='password', api_version='18.2.8')
+        direct.update(options)
+        connection.set_options(direct=direct)
+        return connection
+
+    def logins(self):
+        return self.controller.stats.get('login', 0)
+
+
+class test_avi_connection_plugin(AviConnectionTest):
+
+    def test_context(self):
+        context = self.connection.get_context()
+        self.assertTrue(context['session_id'])
+        self.assertTrue(context['csrftoken'])
+        self.assertEqual((context['controller'], context['username'],
+                          context['tenant'], context['api_version']),
+                         (self.controller.url, 'admin', 'admin', '18.2.8'))
+        # the connection logs in once
+        self.connection.get_context()
+        self.assertEqual(self.logins(), 1)
+
+    def test_send_request(self):
+        rsp = self.connection.send_request(
+            'post', 'pool', data={'name': 'p1'})
+        self.assertEqual(rsp['status_code'], 201, rsp['text'])
+        rsp = self.connection.send_request('get', 'pool',
+                                           params={'name': 'p1'})
+        self.assertEqual(rsp['status_code'], 200)
+        self.assertIn('"p1"', rsp['text'])
+        self.assertEqual(self.logins(), 1)
+        with self.assertRaises(AnsibleConnectionFailure):
+            self.connection.send_request('head', 'pool')
+
+    def test_relogin(self):
+        self.connection.get_context()
+        self.controller.sessions.clear()
+        rsp = self.connection.send_request('get', 'pool')
+        self.assertEqual(rsp['status_code'], 200)
+        self.assertEqual(self.logins(), 2)
+
+    def test_login_failure(self):
+        connection = self.new_connection(password='other')
+        with self.assertRaises(AnsibleConnectionFailure):
+            connection.get_context()
+
+
+class test_avi_connection_session(AviConnectionTest):
+
+    def setUp(self):
+        super(test_avi_connection_session, self).setUp()
+        # the socket of the connection calls the plugin
+        socket = patch('ansible.module_utils.avi_connection.Connection',
+                       lambda socket_path: self.connection)
+        socket.start()
+        self.addCleanup(socket.stop)
+
+    def session(self, **creds):
+        return AviConnectionSession('/socket', AviCredentials(**creds))
+
+    def test_fills_login(self):
+        api = self.session(api_version='18.2.8')
+        creds = api.avi_credentials
+        self.assertEqual((creds.controller, creds.username),
+                         (self.controller.url, 'admin'))
+        self.assertEqual(api.get('pool').status_code, 200)
+        rsp = api.post('pool', data={'name': 'p1'})
+        self.assertEqual(rsp.status_code, 201, rsp.text)
+        # the calls go over the login of the connection
+        self.assertEqual(self.logins(), 1)
+        self.assertEqual(self.controller.stats['POST pool'], 1)
+
+    def test_same_login(self):
+        api = self.session(controller=self.controller.url, username='admin')
+        self.assertEqual(api.get('pool').status_code, 200)
+
+    def test_other_login(self):
+        for creds in (dict(controller='10.10.10.1'),
+                      dict(username='other')):
+            with self.assertRaises(APIError) as e:
+                self.session(**creds)
+            self.assertIn('avi connection', str(e.exception))
+
+    def test_stream(self):
+        api = self.session()
+        with self.assertRaises(APIError):
+            api.get('fileservice/uploads', stream=True)
+
+    def run_module(self, **args):
+        args.update(name='p1', _ansible_socket='/socket')
+        set_module_args(args)
+        with patch.multiple(basic.AnsibleModule,
+                            exit_json=modules.exit_json,
+                            fail_json=modules.fail_json):
+            try:
+                avi_pool.main()
+            except (AnsibleExitJson, AnsibleFailJson) as e:
+                return e.args[0]
+
+    def test_module(self):
+        result = self.run_module(api_version='18.2.8')
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.controller.stats['POST pool'], 1)
+        self.assertEqual(self.logins(), 1)
+        result = self.run_module(username='other')
+        self.assertTrue(result['failed'])
+        self.assertIn('username other', result['msg'])
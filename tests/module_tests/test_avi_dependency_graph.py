@@ -0,0 +1,122 @@
+import unittest
+
+from mock import patch
+
+from ansible.module_utils import basic
+from ansible.module_utils.avi_dependency_graph import (
+    DependencyCycleError, dependency_waves, iter_refs, parse_ref)
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_bulk_apply
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+
+class test_avi_dependency_graph(unittest.TestCase):
+
+    def test_parse_ref(self):
+        self.assertEqual(parse_ref('/api/pool?name=p1'), ('pool', 'p1'))
+        self.assertEqual(parse_ref('/api/tenant/?name=admin'),
+                         ('tenant', 'admin'))
+        self.assertEqual(parse_ref('/api/pool?cloud=c1&name=p1'),
+                         ('pool', 'p1'))
+        self.assertEqual(parse_ref(
+            'https://10.10.25.42/api/pool/pool-0e7f1d42#p1'), ('pool', 'p1'))
+        self.assertIsNone(parse_ref('/api/pool/pool-0e7f1d42'))
+        self.assertIsNone(parse_ref('p1'))
+
+    def test_iter_refs(self):
+        vs = {
+            'name': 'vs1',
+            'pool_ref': '/api/pool?name=p1',
+            'vsvip_ref': '/api/vsvip/vsvip-1',
+            'http_policies': [{
+                'index': 11,
+                'http_policy_set_ref': '/api/httppolicyset?name=hps1'}],
+            'vh_domain_name': ['/api/pool?name=not-a-ref'],
+        }
+        self.assertEqual(sorted(iter_refs(vs)), [
+            ('httppolicyset', 'hps1'), ('pool', 'p1')])
+        self.assertEqual(list(iter_refs({'health_monitor_refs': [
+            '/api/healthmonitor?name=hm1', '/api/healthmonitor?name=hm2']})),
+            [('healthmonitor', 'hm1'), ('healthmonitor', 'hm2')])
+
+    def test_waves(self):
+        # vs -> pool -> hm, vs -> vsvip, hm2 is independent
+        deps = {'vs': {'pool', 'vsvip'}, 'pool': {'hm'}}
+        waves = dependency_waves(['vs', 'pool', 'hm', 'vsvip', 'hm2'], deps)
+        self.assertEqual(waves, [['hm', 'vsvip', 'hm2'], ['pool'], ['vs']])
+
+    def test_waves_ignore_unknown_and_self(self):
+        deps = {'a': {'a', 'not-applied'}, 'b': {'a'}}
+        self.assertEqual(dependency_waves(['b', 'a'], deps), [['a'], ['b']])
+        self.assertEqual(dependency_waves([], {}), [])
+
+    def test_cycle(self):
+        deps = {'a': {'b'}, 'b': {'c'}, 'c': {'a'}, 'd': set()}
+        with self.assertRaises(DependencyCycleError) as e:
+            dependency_waves(['a', 'b', 'c', 'd'], deps)
+        self.assertIn("['a', 'b', 'c']", str(e.exception))
+
+
+class test_avi_bulk_apply(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+
+    def run_module(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8')
+        set_module_args(args)
+        try:
+            avi_bulk_apply.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def test_dependency_order(self):
+        # given in the reverse of the order they have to be created in
+        config = {
+            'virtualservice': [{
+                'name': 'vs1', 'pool_ref': '/api/pool?name=p1',
+                'services': [{'port': 80}]}],
+            'pool': [{
+                'name': 'p1',
+                'health_monitor_refs': ['/api/healthmonitor?name=hm1']}],
+            'healthmonitor': [{'name': 'hm1', 'type': 'HEALTH_MONITOR_HTTP'}],
+        }
+        result = self.run_module(config=config, concurrency=4)
+        self.assertFalse(result.get('failed'), result.get('msg'))
+        self.assertEqual(sorted((r['obj_type'], r['action'])
+                                for r in result['obj']), [
+            ('healthmonitor', 'create'), ('pool', 'create'),
+            ('virtualservice', 'create')])
+        result = self.run_module(config=config, concurrency=4)
+        self.assertFalse(result['changed'])
+        # absent objects are deleted before the objects they refer to
+        objects = [dict(obj_type='healthmonitor', name='hm1', state='absent'),
+                   dict(obj_type='pool', name='p1', state='absent'),
+                   dict(obj_type='virtualservice', name='vs1',
+                        state='absent')]
+        result = self.run_module(objects=objects)
+        self.assertEqual([r['action'] for r in result['obj']],
+                         ['delete'] * 3)
+        self.assertEqual(self.controller.stats.get('DELETE healthmonitor'), 1)
+
+    def test_cycle(self):
+        objects = [
+            dict(obj_type='pool', name='p1',
+                 spec={'pool_group_ref': '/api/poolgroup?name=pg1'}),
+            dict(obj_type='poolgroup', name='pg1',
+                 spec={'members': [{'pool_ref': '/api/pool?name=p1'}]}),
+        ]
+        result = self.run_module(objects=objects)
+        self.assertTrue(result['failed'])
+        self.assertIn('Dependency cycle', result['msg'])
+        self.assertFalse(self.controller.stats.get('POST pool'))
@@ -0,0 +1,200 @@
+import copy
+import unittest
+
+from avi.sdk.utils.ansible_utils import avi_obj_cmp as sdk_obj_cmp
+from ansible.module_utils.avi_diff import (
+    avi_obj_cmp, avi_obj_diff, avi_obj_patch, list_patch)
+
+POOL_URL = 'https://10.10.25.42/api/pool/pool-1'
+
+
+def server(addr, **fields):
+    server = {'ip': {'addr': addr, 'type': 'V4'}}
+    server.update(fields)
+    return server
+
+
+def rule(index, name):
+    return {'index': index, 'name': name, 'enable': True,
+            'match': {'path': {'match_criteria': 'BEGINS_WITH',
+                               'match_str': ['/%s' % name]}}}
+
+
+def existing_pool(**fields):
+    pool = {
+        'uuid': 'pool-1', 'url': POOL_URL, 'name': 'p1',
+        '_last_modified': '1541023893574613',
+        'tenant_ref': 'https://10.10.25.42/api/tenant/admin#admin',
+        'lb_algorithm': 'LB_ALGORITHM_LEAST_CONNECTIONS',
+        'default_server_port': 80,
+        'health_monitor_refs': [
+            'https://10.10.25.42/api/healthmonitor/hm-1#hm1',
+            'https://10.10.25.42/api/healthmonitor/hm-2#hm2'],
+        'servers': [server('10.10.10.1', ratio=1, enabled=True),
+                    server('10.10.10.2', ratio=1, enabled=True)],
+    }
+    pool.update(fields)
+    return pool
+
+
+class test_avi_diff(unittest.TestCase):
+
+    def compare(self, x, y, sensitive_fields=None):
+        """
+        :return: result of avi_obj_cmp of avi_diff after checking that the
+            SDK comes to the same result
+        """
+        same = avi_obj_cmp(copy.deepcopy(x), copy.deepcopy(y),
+                           sensitive_fields)
+        self.assertEqual(same, sdk_obj_cmp(copy.deepcopy(x), copy.deepcopy(y),
+                                           sensitive_fields))
+        return same
+
+    def test_contained(self):
+        pool = {'name': 'p1', 'tenant': 'admin', 'api_version': '18.2.8',
+                'health_monitor_refs': ['/api/healthmonitor?name=hm1',
+                                        '/api/healthmonitor?name=hm2'],
+                'servers': [server('10.10.10.1'), server('10.10.10.2')],
+                'description': None, 'pki_profile_ref': {'state': 'absent'},
+                'placement_networks': []}
+        self.assertTrue(self.compare(pool, existing_pool()))
+
+    def test_changed_field(self):
+        pool = {'name': 'p1',
+                'lb_algorithm': 'LB_ALGORITHM_ROUND_ROBIN',
+                'servers': [server('10.10.10.1'),
+                            server('10.10.10.2', ratio=2)]}
+        self.assertFalse(self.compare(pool, existing_pool()))
+        self.assertEqual(avi_obj_diff(pool, existing_pool()), [
+            'lb_algorithm', 'servers[ip.addr=10.10.10.2].ratio'])
+
+    def test_absent_field(self):
+        pool = {'name': 'p1', 'default_server_port': {'state': 'absent'}}
+        self.assertFalse(self.compare(pool, existing_pool()))
+        self.assertEqual(avi_obj_diff(pool, existing_pool()),
+                         ['default_server_port'])
+
+    def test_sensitive_field(self):
+        pool = {'name': 'p1', 'lb_algorithm': 'LB_ALGORITHM_LEAST_CONNECTIONS'}
+        self.assertFalse(self.compare(pool, existing_pool(),
+                                      sensitive_fields=['lb_algorithm']))
+
+    def test_list_length(self):
+        pool = {'name': 'p1', 'servers': [server('10.10.10.1')]}
+        self.assertFalse(self.compare(pool, existing_pool()))
+        self.assertEqual(avi_obj_diff(pool, existing_pool()), ['servers'])
+
+    def test_ordered_lists(self):
+        # the order of monitors, rules and policies is a change
+        pool = {'name': 'p1',
+                'health_monitor_refs': ['/api/healthmonitor?name=hm2',
+                                        '/api/healthmonitor?name=hm1']}
+        self.assertFalse(self.compare(pool, existing_pool()))
+        policy = {'name': 'hps1', 'http_request_policy': {
+            'rules': [rule(2, 'b'), rule(1, 'a')]}}
+        existing = {'uuid': 'httppolicyset-1', 'name': 'hps1',
+                    'http_request_policy': {
+                        'rules': [rule(1, 'a'), rule(2, 'b')]}}
+        self.assertFalse(self.compare(policy, existing))
+        self.assertEqual(avi_obj_diff(copy.deepcopy(policy), existing), [
+            'http_request_policy.rules[0].index',
+            'http_request_policy.rules[0].name',
+            'http_request_policy.rules[0].match.path.match_str[0]',
+            'http_request_policy.rules[1].index',
+            'http_request_policy.rules[1].name',
+            'http_request_policy.rules[1].match.path.match_str[0]'])
+        vs = {'name': 'vs1', 'http_policies': [
+            {'index': 12, 'http_policy_set_ref': '/api/httppolicyset?name=b'},
+            {'index': 11, 'http_policy_set_ref': '/api/httppolicyset?name=a'}]}
+        existing = {'uuid': 'vs-1', 'name': 'vs1', 'http_policies': [
+            {'index': 11, 'http_policy_set_ref':
+                'https://10.10.25.42/api/httppolicyset/hps-a#a'},
+            {'index': 12, 'http_policy_set_ref':
+                'https://10.10.25.42/api/httppolicyset/hps-b#b'}]}
+        self.assertFalse(self.compare(vs, existing))
+
+    def test_unordered_lists(self):
+        # unlike the SDK the servers of a pool are matched by their address
+        pool = {'name': 'p1',
+                'servers': [server('10.10.10.2'), server('10.10.10.1')]}
+        self.assertTrue(avi_obj_cmp(copy.deepcopy(pool), existing_pool()))
+        self.assertFalse(sdk_obj_cmp(copy.deepcopy(pool), existing_pool()))
+        group = {'name': 'g1',
+                 'addrs': [{'addr': '10.1.1.2', 'type': 'V4'},
+                           {'addr': '10.1.1.1', 'type': 'V4'}],
+                 'prefixes': [{'ip_addr': {'addr': '10.2.0.0', 'type': 'V4'},
+                               'mask': 16}]}
+        existing = {'uuid': 'ipaddrgroup-1', 'name': 'g1',
+                    'addrs': [{'addr': '10.1.1.1', 'type': 'V4'},
+                              {'addr': '10.1.1.2', 'type': 'V4'}],
+                    'prefixes': [{'ip_addr': {'addr': '10.2.0.0',
+                                              'type': 'V4'}, 'mask': 24}]}
+        self.assertEqual(avi_obj_diff(group, existing),
+                         ['prefixes[ip_addr.addr=10.2.0.0].mask'])
+
+    def test_duplicate_keys(self):
+        # servers on the same address but another port are matched by
+        # position like the SDK does
+        pool = {'name': 'p1', 'servers': [server('10.10.10.1', port=8080),
+                                          server('10.10.10.1', port=8443)]}
+        existing = existing_pool(servers=[
+            server('10.10.10.1', port=8443), server('10.10.10.1', port=8080)])
+        self.assertFalse(self.compare(pool, existing))
+        self.assertEqual(avi_obj_diff(pool, existing),
+                         ['servers[0].port', 'servers[1].port'])
+
+
+class test_avi_obj_patch(unittest.TestCase):
+
+    def test_list_patch(self):
+        existing = [server('10.10.10.1', ratio=1), server('10.10.10.2')]
+        self.assertEqual(list_patch(
+            'servers', [server('10.10.10.1', ratio=1), server('10.10.10.3')],
+            copy.deepcopy(existing), None),
+            ([server('10.10.10.3')], [server('10.10.10.2')]))
+        # an element in both lists changed
+        self.assertIsNone(list_patch(
+            'servers', [server('10.10.10.1', ratio=2)],
+            copy.deepcopy(existing), None))
+        # ordered lists and lists without unique keys are replaced
+        self.assertIsNone(list_patch(
+            'rules', [rule(1, 'a')], [rule(1, 'a'), rule(2, 'b')], None))
+        self.assertIsNone(list_patch(
+            'servers', [server('10.10.10.1', port=80),
+                        server('10.10.10.1', port=81)],
+            copy.deepcopy(existing), None))
+        self.assertIsNone(list_patch('servers', [server('10.10.10.1')],
+                                     None, None))
+
+    def test_unchanged(self):
+        pool = {'name': 'p1', 'servers': [server('10.10.10.2'),
+                                          server('10.10.10.1')]}
+        self.assertEqual(avi_obj_patch(pool, existing_pool()), ([], {}))
+
+    def test_patch(self):
+        pool = {'name': 'p1',
+                'lb_algorithm': 'LB_ALGORITHM_ROUND_ROBIN',
+                'default_server_port': {'state': 'absent'},
+                'health_monitor_refs': ['/api/healthmonitor?name=hm2'],
+                'servers': [server('10.10.10.1'), server('10.10.10.3')]}
+        changed, patch = avi_obj_patch(pool, existing_pool())
+        self.assertEqual(changed, [
+            'lb_algorithm', 'default_server_port', 'health_monitor_refs',
+            'servers[ip.addr=10.10.10.3]'])
+        self.assertEqual(patch, {
+            'replace': {'lb_algorithm': 'LB_ALGORITHM_ROUND_ROBIN',
+                        'health_monitor_refs': [
+                            '/api/healthmonitor?name=hm2']},
+            'delete': {'default_server_port': 80,
+                       'servers': [server('10.10.10.2', ratio=1,
+                                          enabled=True)]},
+            'add': {'servers': [server('10.10.10.3')]}})
+
+    def test_changed_element_replaces_list(self):
+        pool = {'name': 'p1', 'servers': [
+            server('10.10.10.1', ratio=2, description={'state': 'absent'}),
+            server('10.10.10.2')]}
+        changed, patch = avi_obj_patch(pool, existing_pool())
+        self.assertEqual(changed, ['servers[ip.addr=10.10.10.1].ratio'])
+        self.assertEqual(patch, {'replace': {'servers': [
+            server('10.10.10.1', ratio=2), server('10.10.10.2')]}})
@@ -0,0 +1,177 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from ansible.module_utils import basic
+from ansible.module_utils.avi_file_set import (
+    chunks, load_member_keys, member_delta)
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_ipaddrgroup, avi_stringgroup
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+
+def addr(value):
+    return {'addr': value, 'type': 'V4'}
+
+
+class test_avi_file_set_members(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def write(self, name, lines):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def test_load_member_keys(self):
+        path = self.write('addrs.txt', [
+            '# blocklist', '10.1.1.1', '', ' 10.1.1.2 ', '10.1.1.1',
+            '2001:DB8:0:0::1'])
+        self.assertEqual(load_member_keys(path, 'addrs'), set([
+            '10.1.1.1', '10.1.1.2', '2001:db8::1']))
+        path = self.write('prefixes.txt', ['10.2.0.0/16', '10.3.0.0/24'])
+        self.assertEqual(load_member_keys(path, 'prefixes'), set([
+            ('10.2.0.0', 16), ('10.3.0.0', 24)]))
+        path = self.write('kv.txt', ['/admin\tdeny', '/login'])
+        self.assertEqual(load_member_keys(path, 'kv'), set([
+            ('/admin', 'deny'), ('/login', None)]))
+
+    def test_invalid_line(self):
+        path = self.write('addrs.txt', ['10.1.1.1', '10.1.1.300'])
+        with self.assertRaises(ValueError) as e:
+            load_member_keys(path, 'addrs')
+        self.assertIn('line 2: 10.1.1.300', str(e.exception))
+
+    def test_member_delta(self):
+        existing_obj = {'addrs': [addr('10.1.1.1'), addr('10.1.1.2')],
+                        'prefixes': [{'ip_addr': addr('10.2.0.0'),
+                                      'mask': 16}]}
+        added, deleted = member_delta(
+            'addrs', set(['10.1.1.2', '10.1.1.3']), existing_obj)
+        self.assertEqual((added, deleted),
+                         ([addr('10.1.1.3')], [addr('10.1.1.1')]))
+        # the same prefix with another mask is another member
+        added, deleted = member_delta(
+            'prefixes', set([('10.2.0.0', 24)]), existing_obj)
+        self.assertEqual(added, [{'ip_addr': addr('10.2.0.0'), 'mask': 24}])
+        self.assertEqual(deleted, existing_obj['prefixes'])
+        self.assertEqual(member_delta('ranges', set(), existing_obj), ([], []))
+        added, deleted = member_delta(
+            'kv', set([('k1', 'v2')]),
+            {'kv': [{'key': 'k1', 'value': 'v1'}]})
+        self.assertEqual((added, deleted), ([{'key': 'k1', 'value': 'v2'}],
+                                            [{'key': 'k1', 'value': 'v1'}]))
+
+    def test_chunks(self):
+        self.assertEqual(list(chunks(list(range(5)), 2)),
+                         [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunks([], 2)), [])
+
+
+class test_avi_file_set_api(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def run_module(self, module, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8')
+        set_module_args(args)
+        try:
+            module.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def write(self, name, lines):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def requests(self, method, obj_type='ipaddrgroup'):
+        return self.controller.stats.get('%s %s' % (method, obj_type), 0)
+
+    def addrs(self, name='g1'):
+        obj = self.controller.objs['ipaddrgroup'][self.controller.names[
+            ('ipaddrgroup', 'admin', name)]]
+        return sorted(a['addr'] for a in obj.get('addrs', []))
+
+    def test_create_in_chunks(self):
+        lines = ['10.1.1.%d' % i for i in range(1, 6)]
+        path = self.write('addrs.txt', lines)
+        result = self.run_module(avi_ipaddrgroup, name='g1', addrs_file=path,
+                                 file_chunk_size=2)
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(result['members'],
+                         {'addrs': {'added': 5, 'deleted': 0}})
+        # the first chunk is posted with the object
+        self.assertEqual((self.requests('POST'), self.requests('PATCH')),
+                         (1, 2))
+        self.assertEqual(self.addrs(), sorted(lines))
+        result = self.run_module(avi_ipaddrgroup, name='g1', addrs_file=path,
+                                 file_chunk_size=2)
+        self.assertFalse(result['changed'])
+        self.assertEqual(self.requests('PATCH'), 2)
+
+    def test_member_changes(self):
+        path = self.write('addrs.txt', ['10.1.1.%d' % i for i in range(1, 6)])
+        self.run_module(avi_ipaddrgroup, name='g1', addrs_file=path)
+        lines = ['10.1.1.%d' % i for i in range(3, 9)]
+        path = self.write('addrs.txt', lines)
+        result = self.run_module(avi_ipaddrgroup, name='g1', addrs_file=path,
+                                 file_chunk_size=2, _ansible_check_mode=True)
+        self.assertTrue(result['changed'])
+        self.assertEqual(result['members'],
+                         {'addrs': {'added': 3, 'deleted': 2}})
+        self.assertEqual(self.requests('PATCH'), 0)
+        result = self.run_module(avi_ipaddrgroup, name='g1', addrs_file=path,
+                                 file_chunk_size=2,
+                                 description='blocklist')
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.addrs(), sorted(lines))
+        self.assertEqual(result['obj']['description'], 'blocklist')
+        # description, one chunk of deletes and two of adds
+        self.assertEqual(self.requests('PATCH'), 4)
+
+    def test_invalid_file(self):
+        path = self.write('addrs.txt', ['10.1.1.1', 'not-an-address'])
+        result = self.run_module(avi_ipaddrgroup, name='g1', addrs_file=path)
+        self.assertTrue(result['failed'])
+        self.assertIn('line 2', result['msg'])
+        self.assertEqual(self.requests('POST'), 0)
+
+    def test_stringgroup(self):
+        path = self.write('kv.txt', ['/admin\tdeny', '/login'])
+        result = self.run_module(avi_stringgroup, name='sg1', kv_file=path,
+                                 type='SG_TYPE_STRING')
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(sorted(result['obj']['kv'], key=lambda m: m['key']),
+                         [{'key': '/admin', 'value': 'deny'},
+                          {'key': '/login'}])
+        path = self.write('kv.txt', ['/admin\tallow', '/login'])
+        result = self.run_module(avi_stringgroup, name='sg1', kv_file=path,
+                                 type='SG_TYPE_STRING')
+        self.assertEqual(result['members'],
+                         {'kv': {'added': 1, 'deleted': 1}})
+        self.assertEqual(sorted(result['obj']['kv'], key=lambda m: m['key']),
+                         [{'key': '/admin', 'value': 'allow'},
+                          {'key': '/login'}])
@@ -0,0 +1,178 @@
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from ansible.module_utils import basic
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_gslbservice_patch_member
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+
+def ip_member(addr, ratio=1):
+    return {'ip': {'addr': addr, 'type': 'V4'}, 'ratio': ratio}
+
+
+def fqdn_member(fqdn, ratio=1):
+    return {'fqdn': fqdn, 'ratio': ratio}
+
+
+class test_avi_gslbservice_patch_member(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.controller.create('gslbservice', {'name': 'gs-1', 'groups': [
+            {'name': 'g1', 'priority': 10,
+             'members': [ip_member('10.10.10.1'),
+                         fqdn_member('a.example.com')]},
+            {'name': 'g2', 'priority': 20,
+             'members': [ip_member('10.10.20.1')]}]})
+
+    def run_module(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8')
+        if 'services' not in args:
+            args.setdefault('name', 'gs-1')
+        set_module_args(args)
+        try:
+            avi_gslbservice_patch_member.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def groups(self, name='gs-1'):
+        uuid = self.controller.names[('gslbservice', 'admin', name)]
+        obj = self.controller.get('gslbservice', uuid)
+        return dict((g['name'], g) for g in obj.get('groups', []))
+
+    def members(self, group, name='gs-1'):
+        return [m.get('fqdn') or m['ip']['addr']
+                for m in self.groups(name)[group]['members']]
+
+    def requests(self, method):
+        return self.controller.stats.get('%s gslbservice' % method, 0)
+
+    def test_add_member(self):
+        result = self.run_module(data={'group': {
+            'name': 'g1', 'members': [ip_member('10.10.10.2'),
+                                      fqdn_member('b.example.com')]}})
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.members('g1'), [
+            '10.10.10.1', 'a.example.com', '10.10.10.2', 'b.example.com'])
+        self.assertEqual(self.requests('PUT'), 1)
+        result = self.run_module(data={'group': {
+            'name': 'g1', 'members': [ip_member('10.10.10.2')]}})
+        self.assertFalse(result['changed'])
+        self.assertEqual(self.requests('PUT'), 1)
+
+    def test_replace_member(self):
+        result = self.run_module(data={'group': {
+            'name': 'g1', 'members': [ip_member('10.10.10.1', ratio=5),
+                                      fqdn_member('a.example.com', 7)]}})
+        self.assertTrue(result['changed'], result.get('msg'))
+        members = self.groups()['g1']['members']
+        self.assertEqual([m['ratio'] for m in members], [5, 7])
+        self.assertEqual(self.requests('PUT'), 1)
+
+    def test_fqdn_before_ip(self):
+        # a member with a fqdn is matched by it and not by its address
+        result = self.run_module(data={'group': {
+            'name': 'g1', 'members': [{'fqdn': 'c.example.com',
+                                       'ip': {'addr': '10.10.10.1',
+                                              'type': 'V4'}}]}})
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.members('g1'), [
+            '10.10.10.1', 'a.example.com', 'c.example.com'])
+
+    def test_delete_member(self):
+        result = self.run_module(state='absent', data={'group': {
+            'name': 'g1', 'members': [ip_member('10.10.10.1')]}})
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.members('g1'), ['a.example.com'])
+        result = self.run_module(state='absent', data={'group': {
+            'name': 'g1', 'members': [fqdn_member('a.example.com')]}})
+        self.assertTrue(result['changed'], result.get('msg'))
+        # the group left without members is removed
+        self.assertEqual(sorted(self.groups()), ['g2'])
+        result = self.run_module(state='absent', data={'group': {
+            'name': 'g2', 'members': [ip_member('10.10.20.2')]}})
+        self.assertFalse(result['changed'])
+        self.assertEqual(self.requests('PUT'), 2)
+
+    def test_duplicate_members(self):
+        result = self.run_module(data={'group': {
+            'name': 'g2', 'members': [ip_member('10.10.20.2'),
+                                      ip_member('10.10.20.2', ratio=3)]}})
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.members('g2'), ['10.10.20.1', '10.10.20.2'])
+        self.assertEqual(self.groups()['g2']['members'][1]['ratio'], 3)
+        uuid = self.controller.names[('gslbservice', 'admin', 'gs-1')]
+        obj = self.controller.get('gslbservice', uuid)
+        obj['groups'][1]['members'].append(ip_member('10.10.20.1'))
+        result = self.run_module(state='absent', data={'group': {
+            'name': 'g2', 'members': [ip_member('10.10.20.1')]}})
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.members('g2'), ['10.10.20.2'])
+
+    def test_missing_group(self):
+        result = self.run_module(state='absent', data={'group': {
+            'name': 'g3', 'members': [ip_member('10.10.30.1')]}})
+        self.assertFalse(result['changed'])
+        self.assertEqual(self.requests('PUT'), 0)
+        result = self.run_module(data={'group': {
+            'name': 'g3', 'priority': 30,
+            'members': [ip_member('10.10.30.1')]}})
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.members('g3'), ['10.10.30.1'])
+        self.assertEqual(self.groups()['g3']['priority'], 30)
+
+    def test_missing_service(self):
+        result = self.run_module(state='absent', name='gs-2', data={
+            'group': {'name': 'g1', 'members': [ip_member('10.10.10.1')]}})
+        self.assertFalse(result['changed'])
+        result = self.run_module(name='gs-2', data={
+            'group': {'name': 'g1', 'members': [ip_member('10.10.10.1')]}})
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.members('g1', name='gs-2'), ['10.10.10.1'])
+        self.assertEqual((self.requests('POST'), self.requests('PUT')),
+                         (1, 0))
+
+    def test_one_put_per_service(self):
+        self.controller.create('gslbservice', {'name': 'gs-2', 'groups': [
+            {'name': 'g1', 'members': [ip_member('10.10.10.1'),
+                                       ip_member('10.10.10.2')]}]})
+        result = self.run_module(services=[
+            {'name': 'gs-1', 'data': {'groups': [
+                {'name': 'g1', 'members': [ip_member('10.10.10.3')]},
+                {'name': 'g2', 'members': [ip_member('10.10.20.3')]}]}},
+            {'name': 'gs-2', 'state': 'absent', 'data': {'groups': [
+                {'name': 'g1', 'members': [ip_member('10.10.10.1')]}]}}])
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual([r['changed'] for r in result['obj']], [True, True])
+        self.assertEqual(self.requests('PUT'), 2)
+        self.assertEqual(self.members('g1'), [
+            '10.10.10.1', 'a.example.com', '10.10.10.3'])
+        self.assertEqual(self.members('g2'), ['10.10.20.1', '10.10.20.3'])
+        self.assertEqual(self.members('g1', name='gs-2'), ['10.10.10.2'])
+
+    def test_check_mode(self):
+        result = self.run_module(_ansible_check_mode=True, data={'group': {
+            'name': 'g1', 'members': [ip_member('10.10.10.2')]}})
+        self.assertTrue(result['changed'])
+        self.assertEqual(self.requests('PUT'), 0)
+
+    def test_params_rejected(self):
+        result = self.run_module(params={'skip_default': True}, data={
+            'group': {'name': 'g1', 'members': [ip_member('10.10.10.2')]}})
+        self.assertTrue(result.get('failed'))
+        self.assertIn('params', result['msg'])
+        self.assertEqual(self.requests('PUT'), 0)
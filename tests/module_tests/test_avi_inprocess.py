@@ -0,0 +1,152 @@
+import atexit
+import os
+import sys
+import types
+import unittest
+
+from mock import Mock, patch
+
+from avi.sdk import avi_api
+from ansible.module_utils import basic
+from ansible.parsing.dataloader import DataLoader
+from ansible.playbook.play_context import PlayContext
+from ansible.playbook.task import Task
+from ansible.plugins.loader import connection_loader
+from ansible.template import Templar
+from action_plugins import avi_inprocess
+from local_controller import AviController
+
+
+class test_avi_inprocess(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.module = avi_inprocess.load_module('avi_pool')
+
+    def module_args(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8')
+        return args
+
+    def test_load_module(self):
+        self.assertEqual(self.module.__name__,
+                         'ansible.modules.avi_inprocess.avi_pool')
+        self.assertIs(avi_inprocess.load_module('avi_pool'), self.module)
+        self.assertIsNone(avi_inprocess.load_module('avi_missing'))
+
+    def test_run_module(self):
+        ansible_args, stdout = basic._ANSIBLE_ARGS, sys.stdout
+        result = avi_inprocess.run_module(
+            self.module, self.module_args(name='p1'))
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(result['obj']['name'], 'p1')
+        self.assertEqual(self.controller.stats['POST pool'], 1)
+        # the state of the process is restored once the module exits
+        self.assertIs(basic._ANSIBLE_ARGS, ansible_args)
+        self.assertIs(sys.stdout, stdout)
+        result = avi_inprocess.run_module(
+            self.module, self.module_args(name='p1'))
+        self.assertFalse(result['changed'], result.get('msg'))
+
+    def test_fail_json(self):
+        result = avi_inprocess.run_module(
+            self.module, self.module_args(name='p1', unknown_option=True))
+        self.assertTrue(result['failed'])
+        self.assertIn('unknown_option', result['msg'])
+        self.assertNotIn('POST pool', self.controller.stats)
+
+    def test_exception(self):
+        module = types.ModuleType('avi_broken')
+
+        def main():
+            raise ValueError('broken module')
+        module.main = main
+        stdout = sys.stdout
+        result = avi_inprocess.run_module(module, {})
+        self.assertTrue(result['failed'])
+        self.assertEqual(result['msg'],
+                         'Module avi_broken failed: broken module')
+        self.assertIn('ValueError', result['exception'])
+        self.assertIs(sys.stdout, stdout)
+
+    def test_no_result(self):
+        module = types.ModuleType('avi_silent')
+        module.main = lambda: None
+        result = avi_inprocess.run_module(module, {})
+        self.assertTrue(result['failed'])
+        self.assertEqual(result['msg'], 'Module did not return a result')
+
+    def test_atexit_environment(self):
+        module = types.ModuleType('avi_exit')
+        calls = []
+        register = atexit.register
+
+        def main():
+            atexit.register(calls.append, os.environ.get('AVI_TEST_VAR'))
+            basic.AnsibleModule(argument_spec={}).exit_json(changed=False)
+        module.main = main
+        os.environ.pop('AVI_TEST_VAR', None)
+        result = avi_inprocess.run_module(module, {},
+                                          environment={'AVI_TEST_VAR': 1})
+        self.assertFalse(result['changed'])
+        # the functions are run when the module exits and not by the worker
+        self.assertEqual(calls, ['1'])
+        self.assertIs(atexit.register, register)
+        self.assertNotIn('AVI_TEST_VAR', os.environ)
+
+
+class test_avi_inprocess_action(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.execute_module = Mock(return_value={'changed': True,
+                                                 'module': 'executed'})
+        execute = patch.object(avi_inprocess.ActionModule, '_execute_module',
+                               self.execute_module)
+        execute.start()
+        self.addCleanup(execute.stop)
+
+    def action(self, transport='local', async_val=0, action='avi_pool'):
+        task = Task.load(dict(action=action, args=dict(
+            name='p1', controller=self.controller.url, username='admin',
+            password='password', api_version='18.2.8')))
+        task.async_val = async_val
+        play_context = PlayContext()
+        connection = connection_loader.get('local', play_context)
+        connection.transport = transport
+        loader = DataLoader()
+        return avi_inprocess.ActionModule(
+            task, connection, play_context, loader, Templar(loader=loader),
+            None)
+
+    def test_inprocess(self):
+        results = [self.action(transport).run(
+            task_vars={'avi_inprocess': 'yes'}) for transport in ('local',
+                                                                 'avi')]
+        self.assertEqual([r.get('changed') for r in results], [True, False],
+                         results[0].get('msg'))
+        self.assertEqual(self.controller.stats['POST pool'], 1)
+        self.assertFalse(self.execute_module.called)
+
+    def test_fallback(self):
+        cases = [('local', 0, 'avi_pool', {}),
+                 ('local', 0, 'avi_pool', {'avi_inprocess': False}),
+                 ('ssh', 0, 'avi_pool', {'avi_inprocess': True}),
+                 ('local', 0, 'avi_missing', {'avi_inprocess': True})]
+        for transport, async_val, action, task_vars in cases:
+            result = self.action(transport, async_val, action).run(
+                task_vars=task_vars)
+            self.assertEqual(result['module'], 'executed')
+        self.assertEqual(self.execute_module.call_count, len(cases))
+        self.assertNotIn('POST pool', self.controller.stats)
+
+    def test_async_fallback(self):
+        action = self.action(async_val=10)
+        self.assertFalse(action.use_inprocess({'avi_inprocess': True}))
+        with patch.object(avi_inprocess, 'HAS_AVI', False):
+            self.assertFalse(self.action().use_inprocess(
+                {'avi_inprocess': True}))
@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+from avi.sdk import avi_api
+from ansible.errors import AnsibleError
+from ansible.inventory.data import InventoryData
+from ansible.parsing.dataloader import DataLoader
+from ansible.plugins.loader import inventory_loader
+from local_controller import AviController
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+inventory_loader.add_directory(
+    os.path.join(HERE, '..', '..', 'inventory_plugins'))
+
+
+def se_obj(name, addr):
+    return {'name': name, 'cloud_ref': '/api/cloud?name=Default-Cloud',
+            'se_group_ref': '/api/serviceenginegroup?name=Default-Group',
+            'enable_state': 'SE_STATE_ENABLED',
+            'mgmt_vnic': {'vnic_networks': [
+                {'ip': {'ip_addr': {'addr': addr, 'type': 'V4'}}}]}}
+
+
+def pool_obj(name, *addrs):
+    return {'name': name, 'servers': [
+        {'ip': {'addr': addr, 'type': 'V4'}} for addr in addrs]}
+
+
+class test_avi_inventory(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        create = self.controller.create
+        create('tenant', {'name': 't1'}, uuid='t1')
+        create('serviceengine', se_obj('web', '10.10.1.1'))
+        create('serviceengine', se_obj('se-2', '10.10.1.2'))
+        create('pool', pool_obj('p1', '10.10.2.1', '10.10.2.2'))
+        create('pool', pool_obj('p2', '10.10.3.1'))
+        create('pool', pool_obj('p3', '10.10.4.1'))
+        create('poolgroup', {'name': 'pg1', 'members': [
+            {'pool_ref': '/api/pool?name=p2', 'ratio': 1},
+            {'pool_ref': '/api/pool?name=p3', 'ratio': 1}]})
+        # the service engine and the virtual service have the same name
+        create('virtualservice', {
+            'name': 'web', 'pool_ref': '/api/pool?name=p1',
+            'cloud_ref': '/api/cloud?name=Default-Cloud',
+            'services': [{'port': 80}]})
+        create('virtualservice', {
+            'name': 'vs-pg', 'pool_group_ref': '/api/poolgroup?name=pg1'})
+        create('virtualservice', {'name': 'web'}, tenant='t1')
+
+    def parse(self, use_cache=True, **options):
+        config = dict(plugin='avi', controller=self.controller.url,
+                      username='admin', password='password',
+                      api_version='18.2.8')
+        config.update(options)
+        path = os.path.join(self.tmp_dir, 'avi.yml')
+        with open(path, 'w') as f:
+            yaml.safe_dump(config, f)
+        plugin = inventory_loader.get('avi')
+        self.assertTrue(plugin.verify_file(path))
+        inventory = InventoryData()
+        plugin.parse(inventory, DataLoader(), path, cache=use_cache)
+        # as the inventory manager does once a source is parsed
+        if getattr(plugin, '_cache', None):
+            plugin.update_cache_if_changed()
+        return inventory
+
+    def host_vars(self, inventory, name):
+        return inventory.get_host(name).get_vars()
+
+    def group_hosts(self, inventory, group):
+        return sorted(h.name for h in inventory.groups[group].get_hosts())
+
+    def test_hosts(self):
+        inventory = self.parse()
+        self.assertEqual(self.group_hosts(inventory, 'avi_serviceengines'),
+                         ['se_se-2', 'se_web'])
+        self.assertEqual(self.group_hosts(inventory, 'avi_virtualservices'),
+                         ['vs_vs-pg', 'vs_web', 'vs_web@t1'])
+        se = self.host_vars(inventory, 'se_web')
+        self.assertEqual((se['avi_type'], se['avi_name'], se['ansible_host'],
+                          se['avi_se_group']),
+                         ('serviceengine', 'web', '10.10.1.1',
+                          'Default-Group'))
+        vs = self.host_vars(inventory, 'vs_web')
+        self.assertEqual((vs['avi_type'], vs['avi_name'], vs['avi_cloud'],
+                          vs['avi_services']),
+                         ('virtualservice', 'web', 'Default-Cloud',
+                          [{'port': 80}]))
+        self.assertEqual(self.host_vars(inventory, 'vs_web@t1')['avi_tenant'],
+                         't1')
+        self.assertEqual(self.group_hosts(inventory, 'cloud_Default_Cloud'),
+                         ['se_se-2', 'se_web', 'vs_web'])
+        self.assertEqual(self.group_hosts(inventory, 'tenant_t1'),
+                         ['vs_web@t1'])
+
+    def test_pools(self):
+        inventory = self.parse()
+        pools = self.host_vars(inventory, 'vs_web')['avi_pools']
+        self.assertEqual([(p['name'], p['servers']) for p in pools],
+                         [('p1', ['10.10.2.1', '10.10.2.2'])])
+        # the pools of the members of the pool group
+        vs = self.host_vars(inventory, 'vs_vs-pg')
+        self.assertEqual(vs['avi_pool_group'], 'pg1')
+        self.assertEqual([p['name'] for p in vs['avi_pools']], ['p2', 'p3'])
+        self.assertNotIn('avi_pools', self.host_vars(inventory, 'vs_web@t1'))
+
+    def test_without_pools(self):
+        inventory = self.parse(include_pools=False)
+        self.assertNotIn('avi_pools', self.host_vars(inventory, 'vs_web'))
+        self.assertNotIn('GET pool', self.controller.stats)
+        self.assertNotIn('GET poolgroup', self.controller.stats)
+
+    def test_prefixes(self):
+        inventory = self.parse(serviceengine_prefix='',
+                               virtualservice_prefix='avi-vs-')
+        self.assertEqual(self.group_hosts(inventory, 'avi_serviceengines'),
+                         ['se-2', 'web'])
+        self.assertEqual(self.group_hosts(inventory, 'avi_virtualservices'),
+                         ['avi-vs-vs-pg', 'avi-vs-web', 'avi-vs-web@t1'])
+
+    def test_keyed_groups(self):
+        inventory = self.parse(keyed_groups=[{'key': 'avi_type',
+                                              'prefix': 'type'}])
+        self.assertEqual(self.group_hosts(inventory,
+                                          'type_serviceengine'),
+                         ['se_se-2', 'se_web'])
+
+    def test_paging(self):
+        inventory = self.parse(page_size=1, concurrency=2)
+        self.assertEqual(len(inventory.hosts), 5)
+        self.assertEqual(self.controller.stats['GET serviceengine'], 2)
+        self.assertEqual(self.controller.stats['GET virtualservice'], 3)
+
+    def test_cache(self):
+        options = dict(cache=True, cache_plugin='jsonfile',
+                       cache_connection=os.path.join(self.tmp_dir, 'cache'))
+        self.parse(use_cache=False, **options)
+        self.assertEqual(self.controller.stats['GET serviceengine'], 1)
+        inventory = self.parse(**options)
+        self.assertEqual(self.controller.stats['GET serviceengine'], 1)
+        self.assertEqual(len(inventory.hosts), 5)
+
+    def test_login_failure(self):
+        with self.assertRaises(AnsibleError) as e:
+            self.parse(password='other')
+        self.assertIn('Login to Avi controller', str(e.exception))
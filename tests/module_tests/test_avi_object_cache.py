@@ -0,0 +1,215 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from avi.sdk.avi_api import ApiSession
+from ansible.module_utils import avi_object_cache
+from ansible.module_utils import basic
+from ansible.module_utils.avi_object_cache import (AviObjectCache,
+                                                   STATIC_OBJ_TYPES)
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_wafpolicy
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+
+class ObjectCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.api = ApiSession.get_session(
+            self.controller.url, 'admin', password='password',
+            api_version='18.2.8')
+        self.uuids = dict(
+            (name, self.controller.create('pool', {'name': name})['uuid'])
+            for name in ('p1', 'p2', 'p3'))
+        self.gets = []
+        get = ApiSession.get
+        gets = self.gets
+
+        def record_get(api, path, *args, **kwargs):
+            gets.append((path, dict(kwargs.get('params') or {})))
+            return get(api, path, *args, **kwargs)
+        get_patch = patch.object(ApiSession, 'get', record_get)
+        get_patch.start()
+        self.addCleanup(get_patch.stop)
+
+    def full_gets(self):
+        return [path for path, params in self.gets if 'fields' not in params]
+
+    def validations(self):
+        return [path for path, params in self.gets
+                if params.get('fields') == '_last_modified']
+
+
+class test_avi_object_cache(ObjectCacheTest):
+
+    def test_lru_eviction(self):
+        cache = AviObjectCache(max_size=2)
+        for name in ('p1', 'p2'):
+            cache.get_object_by_name(self.api, 'pool', name)
+        # p1 is used again so p2 is the least recently used
+        cache.get_object_by_name(self.api, 'pool', 'p1')
+        cache.get_object_by_name(self.api, 'pool', 'p3')
+        self.assertEqual(len(cache._objs), 2)
+        self.assertEqual(sorted(e['obj']['name']
+                                for e in cache._objs.values()), ['p1', 'p3'])
+        del self.gets[:]
+        cache.get_object_by_name(self.api, 'pool', 'p1')
+        self.assertEqual(self.full_gets(), [])
+        cache.get_object_by_name(self.api, 'pool', 'p2')
+        self.assertEqual(self.full_gets(), ['pool'])
+        # p3 is evicted for p2
+        self.assertEqual(sorted(e['obj']['name']
+                                for e in cache._objs.values()), ['p1', 'p2'])
+
+    def test_revalidation(self):
+        cache = AviObjectCache()
+        obj = cache.get_object_by_name(self.api, 'pool', 'p1')
+        self.assertEqual(obj['uuid'], self.uuids['p1'])
+        del self.gets[:]
+        self.assertEqual(cache.get_object_by_name(self.api, 'pool', 'p1'),
+                         obj)
+        # only _last_modified is fetched for an unchanged object
+        self.assertEqual(self.validations(), ['pool'])
+        self.assertEqual(self.full_gets(), [])
+        self.controller.patch('pool', self.uuids['p1'],
+                              {'replace': {'description': 'changed'}},
+                              'admin')
+        del self.gets[:]
+        obj = cache.get_object_by_name(self.api, 'pool', 'p1')
+        self.assertEqual(obj['description'], 'changed')
+        self.assertEqual((self.validations(), self.full_gets()),
+                         (['pool'], ['pool']))
+
+    def test_copy(self):
+        cache = AviObjectCache()
+        obj = cache.get_object_by_name(self.api, 'pool', 'p1')
+        obj['description'] = 'local'
+        obj = cache.get_object_by_name(self.api, 'pool', 'p1')
+        self.assertNotIn('description', obj)
+
+    def test_deleted(self):
+        cache = AviObjectCache()
+        cache.get_object_by_name(self.api, 'pool', 'p1')
+        self.controller.delete('pool', self.uuids['p1'])
+        self.assertIsNone(cache.get_object_by_name(self.api, 'pool', 'p1'))
+        self.assertEqual(cache._objs, {})
+
+    def test_invalidate(self):
+        cache = AviObjectCache()
+        for name in ('p1', 'p2'):
+            cache.get_object_by_name(self.api, 'pool', name)
+        cache.get_object_by_name(self.api, 'cloud', 'Default-Cloud')
+        cache.invalidate('pool', name='p1')
+        self.assertEqual(sorted(e['obj']['name']
+                                for e in cache._objs.values()),
+                         ['Default-Cloud', 'p2'])
+        cache.invalidate('pool', uuid=self.uuids['p2'])
+        self.assertEqual(len(cache._objs), 1)
+        cache.get_object_by_name(self.api, 'pool', 'p1')
+        cache.invalidate('pool')
+        self.assertEqual([e['obj']['name'] for e in cache._objs.values()],
+                         ['Default-Cloud'])
+
+    def test_invalidate_file(self):
+        cache_file = os.path.join(self.tmp_dir, 'objects.json')
+        cache = AviObjectCache(cache_file)
+        for name in ('p1', 'p2'):
+            cache.get_object_by_name(self.api, 'pool', name)
+        cache.save()
+        # another task invalidates p1 after a write
+        other = AviObjectCache(cache_file)
+        self.assertEqual(len(other._objs), 2)
+        other.invalidate('pool', name='p1')
+        other.save()
+        with open(cache_file) as f:
+            entries = json.load(f)
+        self.assertEqual([e['obj']['name'] for k, e in entries], ['p2'])
+
+    def test_static_obj_types(self):
+        self.assertIn('cloud', STATIC_OBJ_TYPES)
+        cache = AviObjectCache()
+        cloud = cache.get_object_by_name(self.api, 'cloud', 'Default-Cloud')
+        self.controller.patch('cloud', cloud['uuid'],
+                              {'replace': {'description': 'changed'}},
+                              'admin')
+        del self.gets[:]
+        # served without a call to the controller until the ttl
+        obj = cache.get_object_by_name(self.api, 'cloud', 'Default-Cloud')
+        self.assertEqual(self.gets, [])
+        self.assertNotIn('description', obj)
+        obj = cache.get_object_by_name(self.api, 'cloud', 'Default-Cloud',
+                                       validate=True)
+        self.assertEqual(obj['description'], 'changed')
+        for entry in cache._objs.values():
+            entry['fetched'] -= cache.ttl + 1
+        del self.gets[:]
+        cache.get_object_by_name(self.api, 'cloud', 'Default-Cloud')
+        self.assertEqual(self.full_gets(), ['cloud'])
+
+    def test_get_obj_uuid(self):
+        cache = AviObjectCache()
+        self.assertEqual(cache.get_obj_uuid(self.api, 'pool', 'p1'),
+                         self.uuids['p1'])
+        del self.gets[:]
+        self.assertEqual(cache.get_obj_uuid(self.api, 'pool', 'p1'),
+                         self.uuids['p1'])
+        self.assertEqual(self.gets, [])
+        self.assertIsNone(cache.get_obj_uuid(self.api, 'pool', 'p4'))
+
+
+class test_avi_wafpolicy_object_cache(ObjectCacheTest):
+
+    def setUp(self):
+        super(test_avi_wafpolicy_object_cache, self).setUp()
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        # the caches of the other tests of this process
+        avi_object_cache._caches.clear()
+        self.addCleanup(avi_object_cache._caches.clear)
+        self.controller.create('wafpolicy', {'name': 'waf-1'})
+        self.patch_file = os.path.join(self.tmp_dir, 'patch.json')
+        with open(self.patch_file, 'w') as f:
+            json.dump({}, f)
+
+    def run_module(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8', name='waf-1',
+                    base_waf_policy='waf-base', patch_file=self.patch_file)
+        set_module_args(args)
+        try:
+            avi_wafpolicy.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def cached_names(self):
+        names = []
+        for cache in avi_object_cache._caches.values():
+            names.extend(e['obj'].get('name') for e in cache._objs.values())
+        return names
+
+    def test_invalidate_after_delete(self):
+        result = self.run_module(state='absent', _ansible_check_mode=True)
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(self.cached_names(), ['waf-1'])
+        result = self.run_module(state='absent')
+        self.assertTrue(result['changed'], result.get('msg'))
+        # the deleted policy is not served from the cache
+        self.assertEqual(self.cached_names(), [])
+        result = self.run_module(state='absent')
+        self.assertFalse(result['changed'], result.get('msg'))
@@ -0,0 +1,197 @@
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from ansible.module_utils import basic
+from ansible.module_utils.avi_pool_servers import (
+    server_delta, server_key, server_patch)
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_pool
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+
+def server(addr, **fields):
+    server = {'ip': {'addr': addr, 'type': 'V4'}}
+    server.update(fields)
+    return server
+
+
+class test_server_delta(unittest.TestCase):
+
+    def test_server_key(self):
+        self.assertEqual(server_key(server('10.1.1.1')), '10.1.1.1:')
+        self.assertEqual(server_key(server('10.1.1.1', port=8080)),
+                         '10.1.1.1:8080')
+        # servers without a port are on the default port of the pool
+        self.assertEqual(server_key(server('10.1.1.1'), 80), '10.1.1.1:80')
+        self.assertEqual(server_key(server('10.1.1.1', port=80), 80),
+                         server_key(server('10.1.1.1'), 80))
+
+    def test_present(self):
+        existing = [server('10.1.1.1'), server('10.1.1.2', ratio=1)]
+        added, deleted, updated = server_delta(
+            [server('10.1.1.2', ratio=2), server('10.1.1.3')], existing,
+            'present')
+        self.assertEqual((added, deleted, updated), (
+            [server('10.1.1.3')], [], [server('10.1.1.2', ratio=2)]))
+
+    def test_absent(self):
+        existing = [server('10.1.1.1'), server('10.1.1.2')]
+        self.assertEqual(server_delta(
+            [server('10.1.1.2'), server('10.1.1.3')], existing, 'absent'),
+            ([], [server('10.1.1.2')], []))
+
+    def test_reconcile(self):
+        existing = [server('10.1.1.1'), server('10.1.1.2'),
+                    server('10.1.1.2', port=8080)]
+        self.assertEqual(server_delta(
+            [server('10.1.1.2'), server('10.1.1.3')], existing, 'reconcile'),
+            ([server('10.1.1.3')],
+             [server('10.1.1.1'), server('10.1.1.2', port=8080)], []))
+
+    def test_default_port(self):
+        existing = [server('10.1.1.1'), server('10.1.1.2', port=8080)]
+        servers = [server('10.1.1.1', port=80), server('10.1.1.2')]
+        # the ports differ once the default port is applied
+        self.assertEqual(server_delta(servers, existing, 'reconcile'), (
+            servers, existing, []))
+        self.assertEqual(server_delta(servers, existing, 'reconcile', 80, 80),
+                         ([server('10.1.1.2')],
+                          [server('10.1.1.2', port=8080)], []))
+        # the default port of the pool changes
+        self.assertEqual(server_delta([server('10.1.1.1')], existing[:1],
+                                      'reconcile', 8080, 80),
+                         ([server('10.1.1.1')], [server('10.1.1.1')], []))
+
+    def test_server_patch(self):
+        existing = [server('10.1.1.1'), server('10.1.1.2')]
+        patch, counts = server_patch(
+            [server('10.1.1.2'), server('10.1.1.3')], existing, 'reconcile')
+        self.assertEqual(patch, {'delete': {'servers': [server('10.1.1.1')]},
+                                 'add': {'servers': [server('10.1.1.3')]}})
+        self.assertEqual(counts, dict(added=1, deleted=1, updated=0))
+        self.assertEqual(server_patch(existing, existing, 'present'),
+                         ({}, dict(added=0, deleted=0, updated=0)))
+
+    def test_update_replaces_list(self):
+        existing = [server('10.1.1.1'), server('10.1.1.2'),
+                    server('10.1.1.4')]
+        patch, counts = server_patch(
+            [server('10.1.1.2', port=80, ratio=3), server('10.1.1.3'),
+             server('10.1.1.4')],
+            existing, 'reconcile', 80, 80)
+        self.assertEqual(patch, {'replace': {'servers': [
+            server('10.1.1.2', port=80, ratio=3), server('10.1.1.4'),
+            server('10.1.1.3')]}})
+        self.assertEqual(counts, dict(added=1, deleted=1, updated=1))
+
+
+class test_avi_pool_servers(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+
+    def run_module(self, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8')
+        set_module_args(args)
+        try:
+            avi_pool.main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return e.args[0]
+
+    def pool_servers(self, name='p1'):
+        obj = self.controller.objs['pool'][self.controller.names[
+            ('pool', 'admin', name)]]
+        return sorted((s['ip']['addr'], s.get('port'), s.get('ratio'))
+                      for s in obj.get('servers', []))
+
+    def patches(self):
+        return self.controller.stats.get('PATCH pool', 0)
+
+    def test_servers_state(self):
+        result = self.run_module(
+            name='p1', servers_state='present', default_server_port=80,
+            servers=[server('10.1.1.1'), server('10.1.1.2')])
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(result['servers'],
+                         dict(added=2, deleted=0, updated=0))
+        # the explicit default port is the same server
+        result = self.run_module(
+            name='p1', servers_state='present',
+            servers=[server('10.1.1.1', port=80), server('10.1.1.3')])
+        self.assertEqual(result['servers'],
+                         dict(added=1, deleted=0, updated=0))
+        self.assertEqual(self.pool_servers(), [
+            ('10.1.1.1', None, None), ('10.1.1.2', None, None),
+            ('10.1.1.3', None, None)])
+        result = self.run_module(name='p1', servers_state='absent',
+                                 servers=[server('10.1.1.3')])
+        self.assertEqual(result['servers'],
+                         dict(added=0, deleted=1, updated=0))
+        result = self.run_module(
+            name='p1', servers_state='reconcile',
+            lb_algorithm='LB_ALGORITHM_ROUND_ROBIN',
+            servers=[server('10.1.1.2'), server('10.1.1.4')])
+        self.assertEqual(result['servers'],
+                         dict(added=1, deleted=1, updated=0))
+        self.assertEqual(result['obj']['lb_algorithm'],
+                         'LB_ALGORITHM_ROUND_ROBIN')
+        self.assertEqual(self.pool_servers(), [
+            ('10.1.1.2', None, None), ('10.1.1.4', None, None)])
+        # the pool fields and the servers were sent in one PATCH each time
+        self.assertEqual(self.patches(), 3)
+        result = self.run_module(
+            name='p1', servers_state='reconcile',
+            servers=[server('10.1.1.2'), server('10.1.1.4')])
+        self.assertFalse(result['changed'])
+        self.assertEqual(self.patches(), 3)
+
+    def test_update_replaces_list(self):
+        self.run_module(name='p1', servers_state='present',
+                        servers=[server('10.1.1.1'), server('10.1.1.2')])
+        result = self.run_module(
+            name='p1', servers_state='present',
+            servers=[server('10.1.1.2', ratio=5), server('10.1.1.3')])
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual(result['servers'],
+                         dict(added=1, deleted=0, updated=1))
+        self.assertEqual(self.pool_servers(), [
+            ('10.1.1.1', None, None), ('10.1.1.2', None, 5),
+            ('10.1.1.3', None, None)])
+        self.assertEqual(self.patches(), 1)
+
+    def test_pools(self):
+        self.run_module(name='p1', servers_state='present',
+                        servers=[server('10.1.1.1')])
+        result = self.run_module(servers_state='reconcile', concurrency=2,
+                                 pools=[
+            dict(name='p1', servers=[server('10.1.1.2')]),
+            dict(name='p2', servers=[server('10.2.1.1', port=8443)]),
+            dict(name='p3', servers_state='present', servers=[])])
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertEqual([(r['name'], r['changed'], r['servers'])
+                          for r in result['obj']], [
+            ('p1', True, dict(added=1, deleted=1, updated=0)),
+            ('p2', True, dict(added=1, deleted=0, updated=0)),
+            ('p3', True, dict(added=0, deleted=0, updated=0))])
+        self.assertTrue(all(r['uuid'] for r in result['obj']))
+        self.assertEqual(self.pool_servers('p1'), [('10.1.1.2', None, None)])
+        self.assertEqual(self.pool_servers('p2'), [('10.2.1.1', 8443, None)])
+
+    def test_pools_without_name(self):
+        result = self.run_module(servers_state='present',
+                                 pools=[dict(servers=[server('10.1.1.1')])])
+        self.assertTrue(result['failed'])
+        self.assertIn('requires name', result['msg'])
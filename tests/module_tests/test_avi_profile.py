@@ -0,0 +1,75 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from ansible.module_utils import basic
+from ansible.module_utils.avi_profile import profile_main
+from conftest import (AnsibleExitJson, AnsibleFailJson, AnsibleModules,
+                      set_module_args)
+from library import avi_pool
+from local_controller import AviController
+
+modules = AnsibleModules()
+
+
+class test_avi_profile(unittest.TestCase):
+
+    def setUp(self):
+        helper = patch.multiple(basic.AnsibleModule,
+                                exit_json=modules.exit_json,
+                                fail_json=modules.fail_json)
+        helper.start()
+        self.addCleanup(helper.stop)
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+
+    def run_module(self, env, **args):
+        args.update(controller=self.controller.url, username='admin',
+                    password='password', api_version='18.2.8', name='p1')
+        set_module_args(args)
+        with patch.dict(os.environ, env):
+            for key in ('AVI_PROFILE_DIR', 'AVI_PROFILE_TOP'):
+                if key not in env:
+                    os.environ.pop(key, None)
+            main = profile_main(avi_pool.main)
+        try:
+            main()
+        except (AnsibleExitJson, AnsibleFailJson) as e:
+            return main, e.args[0]
+
+    def test_profile_dir(self):
+        main, result = self.run_module({'AVI_PROFILE_DIR': self.profile_dir})
+        self.assertTrue(result['changed'], result.get('msg'))
+        profile = result['profile']
+        self.assertTrue(profile['file'].startswith(self.profile_dir))
+        self.assertTrue(profile['file'].endswith('.prof'))
+        self.assertEqual(os.listdir(self.profile_dir),
+                         [os.path.basename(profile['file'])])
+        self.assertIn('avi_pool-p1-', profile['file'])
+        self.assertIn('cpu_time', profile)
+        stats = pstats.Stats(profile['file'])
+        self.assertTrue(any(func[2] == 'main' for func in stats.stats))
+        # exit_json is restored once the module exits
+        self.assertEqual(basic.AnsibleModule.exit_json, modules.exit_json)
+
+    def test_failed_task(self):
+        # the argument spec fails before the module has its params
+        main, result = self.run_module({'AVI_PROFILE_DIR': self.profile_dir},
+                                       unknown_option=True)
+        self.assertTrue(result['failed'])
+        self.assertTrue(os.path.exists(result['profile']['file']))
+
+    def test_unset(self):
+        main, result = self.run_module({})
+        self.assertIs(main, avi_pool.main)
+        self.assertTrue(result['changed'], result.get('msg'))
+        self.assertNotIn('profile', result)
+        self.assertEqual(os.listdir(self.profile_dir), [])
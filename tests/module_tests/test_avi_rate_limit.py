@@ -0,0 +1,170 @@
+import email.utils
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from avi.sdk.avi_api import AviCredentials
+from ansible.module_utils import avi_rate_limit
+from ansible.module_utils.avi_rate_limit import (
+    AimdWindow, AviThrottle, TokenBucket, retry_after)
+from ansible.module_utils.avi_session_cache import get_cached_session
+from local_controller import AviController
+
+
+class test_token_bucket(unittest.TestCase):
+
+    def test_take(self):
+        bucket = TokenBucket(10, burst=2)
+        state = dict(tokens=2.0, stamp=100.0, blocked_until=0.0)
+        self.assertEqual(bucket._take(state, 100.0), 0.0)
+        self.assertEqual(bucket._take(state, 100.0), 0.0)
+        # the next token comes after 1 / rate seconds
+        self.assertAlmostEqual(bucket._take(state, 100.0), 0.1)
+        self.assertAlmostEqual(bucket._take(state, 100.05), 0.05)
+        self.assertEqual(bucket._take(state, 100.11), 0.0)
+        # no more than burst tokens are saved up
+        bucket._take(state, 200.0)
+        self.assertAlmostEqual(state['tokens'], 1.0)
+
+    def test_block(self):
+        bucket = TokenBucket(10)
+        state = bucket.initial_state()
+        bucket._block(state, 100.0, 102.0)
+        bucket._block(state, 100.0, 101.0)
+        self.assertEqual(bucket._take(state, 100.5), 1.5)
+        self.assertEqual(bucket._take(state, 102.0), 0.0)
+
+    def test_shared_state_file(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        state_file = os.path.join(tmp_dir, 'rate_limit.json')
+        first = TokenBucket(1, burst=2, state_file=state_file)
+        second = TokenBucket(1, burst=2, state_file=state_file)
+        self.assertEqual(first._update(first._take), 0.0)
+        self.assertEqual(second._update(second._take), 0.0)
+        # both buckets took from the same two tokens
+        self.assertGreater(first._update(first._take), 0.9)
+        second.block(5)
+        self.assertGreater(first._update(first._take), 4.9)
+
+
+class test_aimd_window(unittest.TestCase):
+
+    def test_decrease_once_per_window(self):
+        window = AimdWindow(8)
+        seqs = [window.acquire() for _ in range(4)]
+        window.release(seqs[0], True)
+        self.assertEqual(window.limit, 4.0)
+        # calls issued before the decrease do not decrease it again
+        window.release(seqs[1], True)
+        self.assertEqual(window.limit, 4.0)
+        seq = window.acquire()
+        window.release(seq, True)
+        self.assertEqual(window.limit, 2.0)
+        window.release(seqs[2], False)
+        self.assertEqual(window.limit, 2.5)
+        window.release(seqs[3], False)
+        self.assertEqual(window.limit, 2.9)
+
+    def test_limits(self):
+        window = AimdWindow(2)
+        for _ in range(5):
+            window.release(window.acquire(), False)
+        self.assertEqual(window.limit, 2.0)
+        for _ in range(5):
+            seq = window.acquire()
+            window.release(seq, True)
+        self.assertEqual(window.limit, 1.0)
+        self.assertEqual(window.in_flight, 0)
+
+
+class test_retry_after(unittest.TestCase):
+
+    def test_retry_after(self):
+        rsp = type('rsp', (), {})()
+        rsp.headers = {}
+        self.assertIsNone(retry_after(rsp))
+        rsp.headers = {'Retry-After': '2'}
+        self.assertEqual(retry_after(rsp), 2.0)
+        rsp.headers = {'Retry-After': email.utils.formatdate(
+            time.time() + 30, usegmt=True)}
+        self.assertTrue(28 < retry_after(rsp) <= 30)
+        rsp.headers = {'Retry-After': 'soon'}
+        self.assertIsNone(retry_after(rsp))
+
+
+class test_avi_throttle(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        env = patch.dict(os.environ, {'AVI_API_RETRIES': '2',
+                                      'AVI_API_RETRY_BACKOFF': '0.01',
+                                      'AVI_SESSION_CACHE_DIR': ''})
+        env.start()
+        self.addCleanup(env.stop)
+        throttles = patch.dict(avi_rate_limit._throttle, clear=True)
+        throttles.start()
+        self.addCleanup(throttles.stop)
+        self.api = get_cached_session(AviCredentials(
+            controller=self.controller.url, username='admin',
+            password='password', api_version='18.2.8'))
+        self.uuid = self.controller.create('pool', {'name': 'p1'})['uuid']
+
+    def test_from_env(self):
+        with patch.dict(os.environ, {'AVI_API_RETRIES': ''}):
+            self.assertIsNone(AviThrottle.from_env())
+        with patch.dict(os.environ, {'AVI_API_RETRIES': '',
+                                     'AVI_API_RATE_LIMIT': '50',
+                                     'AVI_API_CONCURRENCY': '4'}):
+            throttle = AviThrottle.from_env()
+        self.assertEqual((throttle.bucket.rate, throttle.retries,
+                          throttle.window.max_limit), (50.0, 0, 4))
+
+    def test_retry_idempotent(self):
+        for status in (429, 503):
+            self.controller.inject_error(status, count=2, method='GET',
+                                         path='/api/pool')
+            self.assertEqual(self.api.get('pool').status_code, 200)
+            self.controller.inject_error(status, method='PUT',
+                                         path='/api/pool')
+            rsp = self.api.put('pool/%s' % self.uuid,
+                               data={'name': 'p1', 'description': status})
+            self.assertEqual(rsp.status_code, 200)
+        self.assertEqual(self.controller.stats.get('GET pool'), 2)
+        # the limit of the window was halved by the errors
+        throttle = self.api._avi_throttle
+        self.assertLess(throttle.window.limit, throttle.window.max_limit)
+
+    def test_no_retry_non_idempotent(self):
+        for status in (429, 503):
+            self.controller.inject_error(status, method='POST',
+                                         path='/api/pool')
+            rsp = self.api.post('pool', data={'name': 'p%d' % status})
+            self.assertEqual(rsp.status_code, status)
+            self.controller.inject_error(status, method='PATCH',
+                                         path='/api/pool')
+            rsp = self.api.patch('pool/%s' % self.uuid,
+                                 data={'replace': {'description': 'x'}})
+            self.assertEqual(rsp.status_code, status)
+        self.assertFalse(self.controller.stats.get('POST pool'))
+        self.assertFalse(self.controller.stats.get('PATCH pool'))
+
+    def test_retries_exhausted(self):
+        self.controller.inject_error(503, count=3, method='GET',
+                                     path='/api/pool')
+        self.assertEqual(self.api.get('pool').status_code, 503)
+        self.assertFalse(self.controller.stats.get('GET pool'))
+
+    def test_retry_after(self):
+        self.controller.inject_error(429, method='GET', path='/api/pool',
+                                     retry_after=0.3)
+        start = time.time()
+        self.assertEqual(self.api.get('pool').status_code, 200)
+        self.assertGreaterEqual(time.time() - start, 0.3)
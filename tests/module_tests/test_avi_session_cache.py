@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+
+from mock import patch
+
+from avi.sdk import avi_api
+from avi.sdk.avi_api import AviCredentials
+from ansible.module_utils.avi_session_cache import (
+    AviSessionCache, get_cached_session)
+from local_controller import AviController
+
+
+def credentials(controller, **kwargs):
+    creds = dict(controller=controller, username='admin',
+                 password='password', api_version='18.2.8')
+    creds.update(kwargs)
+    return AviCredentials(**creds)
+
+
+class test_avi_session_cache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.cache = AviSessionCache(os.path.join(self.cache_dir, 'sessions'),
+                                     ttl=60)
+
+    def test_from_env(self):
+        with patch.dict(os.environ, {'AVI_SESSION_CACHE_DIR': ''}):
+            self.assertIsNone(AviSessionCache.from_env())
+        with patch.dict(os.environ, {'AVI_SESSION_CACHE_DIR': '~/sessions',
+                                     'AVI_SESSION_CACHE_TTL': '30'}):
+            cache = AviSessionCache.from_env()
+        self.assertEqual(cache.cache_dir, os.path.expanduser('~/sessions'))
+        self.assertEqual(cache.ttl, 30)
+
+    def test_make_key(self):
+        key = AviSessionCache.make_key(credentials('10.10.10.1'))
+        self.assertEqual(key, AviSessionCache.make_key(
+            credentials('10.10.10.1')))
+        for changed in (dict(controller='10.10.10.2'),
+                        dict(username='other'), dict(tenant='t1'),
+                        dict(api_version='20.1.1'), dict(port=8443)):
+            creds = dict(controller='10.10.10.1')
+            creds.update(changed)
+            self.assertNotEqual(key, AviSessionCache.make_key(
+                credentials(**creds)), changed)
+        # the secrets are not part of the name of the file
+        self.assertEqual(key, AviSessionCache.make_key(
+            credentials('10.10.10.1', password='other', token='token')))
+
+    def test_secret(self):
+        secret = self.cache.secret(credentials('10.10.10.1'))
+        self.assertEqual(secret, self.cache.secret(credentials('10.10.10.1')))
+        self.assertNotIn('password', secret)
+        for changed in (dict(password='other'), dict(token='token')):
+            self.assertNotEqual(secret, self.cache.secret(
+                credentials('10.10.10.1', **changed)), changed)
+        salt_path = os.path.join(self.cache.cache_dir, 'salt')
+        self.assertEqual(stat.S_IMODE(os.stat(salt_path).st_mode), 0o600)
+        # another cache directory has another salt
+        other = AviSessionCache(os.path.join(self.cache_dir, 'other'))
+        self.assertNotEqual(secret, other.secret(credentials('10.10.10.1')))
+        self.cache.save('k1', 'sid', 'csrf', secret)
+        self.assertEqual(self.cache.load('k1', secret)['session_id'], 'sid')
+        self.assertIsNone(self.cache.load('k1', self.cache.secret(
+            credentials('10.10.10.1', password='other'))))
+        self.assertIsNone(self.cache.load('k1'))
+
+    def test_save_and_load(self):
+        self.cache.save('k1', 'sid', 'csrf')
+        entry = self.cache.load('k1')
+        self.assertEqual((entry['session_id'], entry['csrftoken']),
+                         ('sid', 'csrf'))
+        self.assertEqual(stat.S_IMODE(os.stat(
+            self.cache.cache_dir).st_mode), 0o700)
+        self.assertEqual(stat.S_IMODE(os.stat(
+            self.cache._path('k1')).st_mode), 0o600)
+        self.assertIsNone(self.cache.load('k2'))
+
+    def test_expired_entry(self):
+        self.cache.save('k1', 'sid', 'csrf')
+        with open(self.cache._path('k1'), 'w') as f:
+            json.dump(dict(session_id='sid', csrftoken='csrf',
+                           last_used=time.time() - 61), f)
+        self.assertIsNone(self.cache.load('k1'))
+        self.assertFalse(os.path.exists(self.cache._path('k1')))
+
+    def test_incomplete_entry(self):
+        self.cache.save('k1', 'sid', '')
+        self.assertIsNone(self.cache.load('k1'))
+        with open(self.cache._path('k1'), 'w') as f:
+            f.write('{')
+        self.assertIsNone(self.cache.load('k1'))
+
+    def test_invalidate(self):
+        self.cache.save('k1', 'sid', 'csrf')
+        self.cache.invalidate('k1')
+        self.assertIsNone(self.cache.load('k1'))
+        # a missing entry is not an error
+        self.cache.invalidate('k1')
+
+
+class test_get_cached_session(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = AviController().start()
+        self.addCleanup(self.controller.stop)
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        env = patch.dict(os.environ, {'AVI_SESSION_CACHE_DIR': self.cache_dir})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(avi_api.sessionDict.clear)
+        self.creds = credentials(self.controller.url)
+
+    def new_task(self):
+        """
+        :return: session of a new task and the callback that persists it
+        """
+        # every task is a new process with no sessions in the SDK
+        avi_api.sessionDict.clear()
+        with patch('ansible.module_utils.avi_session_cache.atexit') as exit:
+            api = get_cached_session(self.creds)
+        return api, exit.register.call_args[0]
+
+    def logins(self):
+        return self.controller.stats.get('login', 0)
+
+    def test_reuses_login(self):
+        api, store = self.new_task()
+        self.assertEqual(api.get('pool').status_code, 200)
+        store[0](*store[1:])
+        self.assertEqual(self.logins(), 1)
+        api, store = self.new_task()
+        self.assertEqual(api.get('pool').status_code, 200)
+        self.assertEqual(self.logins(), 1)
+
+    def test_stale_session(self):
+        api, store = self.new_task()
+        store[0](*store[1:])
+        self.controller.sessions.clear()
+        api, store = self.new_task()
+        # the SDK logs in again on the 401 and the new login is cached
+        self.assertEqual(api.get('pool').status_code, 200)
+        self.assertEqual(self.logins(), 2)
+        store[0](*store[1:])
+        api, store = self.new_task()
+        self.assertEqual(api.get('pool').status_code, 200)
+        self.assertEqual(self.logins(), 2)
+
+    def test_other_password(self):
+        api, store = self.new_task()
+        store[0](*store[1:])
+        for name in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, name), 'rb') as f:
+                self.assertNotIn(b'password', f.read())
+        # the password changed, the session of the old one is not reused
+        self.controller.users['admin'] = 'other'
+        self.creds = credentials(self.controller.url, password='other')
+        api, store = self.new_task()
+        self.assertEqual(api.get('pool').status_code, 200)
+        self.assertEqual(self.logins(), 2)
+
+    def test_other_credentials(self):
+        api, store = self.new_task()
+        store[0](*store[1:])
+        self.creds = credentials(self.controller.url, tenant='admin',
+                                 api_version='20.1.1')
+        self.new_task()
+        self.assertEqual(self.logins(), 2)